@@ -1,77 +1,219 @@
-from Bio.Seq import Seq
-from Bio import SeqIO
-from Bio.SeqUtils import gc_fraction, molecular_weight  # تحديث هنا
 import numpy as np
 import re
 from collections import Counter
 import io
+import itertools
 import logging
+import multiprocessing
+import os
+import threading
+
+import codon_usage
+import fastq_qc
+import fm_index
+import gc_profile
+import kmers
+import metrics
+import minhash
+import orf_finder
+import physical_properties
+import repeats
+import restriction
+from motif_search import MotifAutomaton
+from encoded_sequence import EncodedSequence, as_encoded
+from indexed_reader import IndexedReader
+from sequence_cleaner import clean_file
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Lengths of the RNA and protein previews returned by translate_sequence
+RNA_PREVIEW_LENGTH = 500
+PROTEIN_PREVIEW_LENGTH = 200
+
+def default_gc_window(length):
+    """Window giving roughly 100 non-overlapping windows over a sequence."""
+    return max(10, length // 100)
+
+# Sections analyze_sequence can compute; 'molecular_weight' (with the melting
+# temperatures) is part of 'statistics'
+ANALYSIS_FIELDS = ('gc_content', 'composition', 'motifs', 'translation', 'statistics', 'molecular_weight',
+                   'gc_profile', 'repeats', 'codon_usage', 'restriction')
+
+def resolve_fields(fields=None, exclude=None):
+    """Turn requested/excluded field names into the set of fields to compute."""
+    selected = set(ANALYSIS_FIELDS if fields is None else fields)
+    if exclude:
+        selected -= set(exclude)
+    unknown = selected - set(ANALYSIS_FIELDS)
+    if unknown:
+        raise ValueError(f"حقول غير معروفة: {', '.join(sorted(unknown))}")
+    return selected
+
+# Compiled motif sets kept per analyzer
+MAX_CACHED_AUTOMATA = 32
+
+# motifs searched when none are given
+COMMON_MOTIFS = ('TATA', 'CAAT', 'GCCGCC', 'ATGC', 'CGCG', 'ATAT')
+
+# first line of a raw sequence file
+_RAW_LINE = re.compile(r'^[ATGCN\s]+$', re.I)
+
+# amino acid index (STOP for stop codons) -> letter; the last entry is for codons with an invalid base
+_PROTEIN_LETTERS = np.frombuffer((codon_usage.AMINO_ACIDS + '*X').encode('ascii'), dtype=np.uint8)
+
+# all-vs-all similarity returns an n x n matrix, so n is capped
+MAX_MATRIX_RECORDS = 500
+
+# Analyzer copy held by each pool worker, set once by the pool initializer
+_worker_analyzer = None
+
+def _init_worker(analyzer):
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+def _analyze_in_worker(item):
+    index, record = item
+    return _worker_analyzer.analyze_record(record, index)
+
+class SequenceSummary:
+    """Running aggregate over many records, kept in constant memory."""
+    
+    # upper bounds of the length histogram bins
+    LENGTH_BINS = (100, 1000, 10000, 100000, 1000000)
+    
+    def __init__(self):
+        self.count = 0
+        self.total_bases = 0
+        self.gc_bases = 0
+        self.min_length = None
+        self.max_length = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.length_histogram = [0] * (len(self.LENGTH_BINS) + 1)
+    
+    def add(self, sequence):
+        """Add one cleaned sequence (string or EncodedSequence) to the summary."""
+        length = len(sequence)
+        self.count += 1
+        self.total_bases += length
+        self.gc_bases += as_encoded(sequence).count('GC')
+        self.min_length = length if self.min_length is None else min(self.min_length, length)
+        self.max_length = max(self.max_length, length)
+        
+        # Welford's online mean/variance
+        delta = length - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (length - self._mean)
+        
+        for i, bound in enumerate(self.LENGTH_BINS):
+            if length < bound:
+                self.length_histogram[i] += 1
+                break
+        else:
+            self.length_histogram[-1] += 1
+    
+    def as_dict(self):
+        labels = []
+        lower = 0
+        for bound in self.LENGTH_BINS:
+            labels.append(f'{lower}-{bound - 1}')
+            lower = bound
+        labels.append(f'>={lower}')
+        
+        return {
+            'record_count': self.count,
+            'total_bases': self.total_bases,
+            'min_length': self.min_length or 0,
+            'max_length': self.max_length,
+            'mean_length': round(self._mean, 2),
+            'std_length': round((self._m2 / self.count) ** 0.5, 2) if self.count else 0,
+            'length_histogram': dict(zip(labels, self.length_histogram)),
+            'gc_content': round(self.gc_bases / self.total_bases * 100, 2) if self.total_bases else 0
+        }
+
 class DNAAnalyzer:
     def __init__(self):
-        self.common_motifs = ['TATA', 'CAAT', 'GCCGCC', 'ATGC', 'CGCG', 'ATAT']
+        self.common_motifs = COMMON_MOTIFS
+        self._motif_automata = {}
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        # pool workers get the compiled automata but build their own lock
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def warm(self):
+        """بناء الجداول المشتركة مسبقاً (محرك المواضع الافتراضي وجدول الشفرة الوراثية)"""
+        self.get_motif_automaton()
+        codon_usage.genetic_code(1)
+        return self
     
     def clean_sequence(self, sequence):
         """تنظيف التسلسل من الرموز غير المرغوبة"""
-        cleaned = re.sub(r'[^ATGC]', '', sequence.upper())
-        return cleaned
+        if isinstance(sequence, EncodedSequence):
+            return sequence.cleaned()
+        return str(EncodedSequence.from_string(sequence).cleaned())
     
     def calculate_gc_content(self, sequence):
         """حساب محتوى GC"""
-        if len(sequence) == 0:
-            return 0
-        # استخدام gc_fraction بدلاً من GC
-        return gc_fraction(Seq(sequence)) * 100
+        return as_encoded(sequence).gc_content()
     
     def get_composition(self, sequence):
         """تحليل تركيب النيوكليوتيدات"""
-        total = len(sequence)
-        if total == 0:
-            return {'A': 0, 'T': 0, 'G': 0, 'C': 0}
-        
-        composition = {
-            'A': (sequence.count('A') / total) * 100,
-            'T': (sequence.count('T') / total) * 100, 
-            'G': (sequence.count('G') / total) * 100,
-            'C': (sequence.count('C') / total) * 100
-        }
-        return composition
-    
-    def find_motifs(self, sequence):
-        """البحث عن المواضع الشائعة"""
-        found_motifs = {}
-        for motif in self.common_motifs:
-            positions = []
-            start = 0
-            while True:
-                pos = sequence.find(motif, start)
-                if pos == -1:
-                    break
-                positions.append(pos)
-                start = pos + 1
-            
-            if positions:
-                found_motifs[motif] = {
-                    'count': len(positions),
-                    'positions': positions[:10]
-                }
-        return found_motifs
+        return as_encoded(sequence).composition()
+    
+    def get_motif_automaton(self, motifs=None, both_strands=True):
+        """إرجاع محرك البحث المُجمَّع لمجموعة المواضع (يُبنى مرة واحدة ويُخزَّن)"""
+        motifs = tuple(self.common_motifs if motifs is None else motifs)
+        key = (motifs, both_strands)
+        automaton = self._motif_automata.get(key)
+        if automaton is None:
+            # built outside the lock; a compiled automaton is only read afterwards
+            automaton = MotifAutomaton(motifs, both_strands=both_strands)
+            with self._lock:
+                if len(self._motif_automata) >= MAX_CACHED_AUTOMATA:
+                    self._motif_automata.clear()
+                automaton = self._motif_automata.setdefault(key, automaton)
+        return automaton
+    
+    def find_motifs(self, sequence, motifs=None, both_strands=True, max_positions=10):
+        """البحث عن المواضع الشائعة على الشريطين"""
+        automaton = self.get_motif_automaton(motifs, both_strands)
+        return automaton.find(sequence, max_positions=max_positions)
+    
+    def get_kmer_spectrum(self, sequence, ks=(6,), canonical=False, top_n=10, min_count=1):
+        """طيف الـ k-mers للتسلسل مع الأكثر تكراراً لكل قيمة k"""
+        # windows spanning an invalid base are skipped, so no cleaning is needed
+        return kmers.kmer_spectrum(
+            as_encoded(sequence),
+            ks=ks,
+            canonical=canonical,
+            top_n=top_n,
+            min_count=min_count
+        )
     
     def translate_sequence(self, sequence):
         """ترجمة DNA إلى RNA وبروتين"""
         try:
-            seq_obj = Seq(sequence)
-            rna = seq_obj.transcribe()
-            protein = seq_obj.translate()
-            orfs = self.find_orfs(sequence)
+            # Only the displayed prefixes are transcribed/translated
+            encoded = as_encoded(sequence)
+            rna = str(encoded[:RNA_PREVIEW_LENGTH]).replace('T', 'U')
+            protein_bases = min(len(encoded), PROTEIN_PREVIEW_LENGTH * 3)
+            amino_acids, _ = codon_usage.genetic_code(1)
+            ids = orf_finder.codon_ids(encoded.codes[:protein_bases - protein_bases % 3])[::3]
+            protein = _PROTEIN_LETTERS[np.where(ids >= 0, amino_acids[ids], len(_PROTEIN_LETTERS) - 1)]
+            orfs = self.find_orfs(encoded)
             
             return {
-                'rna': str(rna)[:500],
-                'protein': str(protein)[:200],
+                'rna': rna,
+                'protein': protein.tobytes().decode('ascii'),
                 'orfs': orfs
             }
         except Exception as e:
@@ -82,61 +224,156 @@ class DNAAnalyzer:
                 'error': str(e)
             }
     
-    def find_orfs(self, sequence):
-        """إيجاد أطر القراءة المفتوحة (ORFs)"""
-        orfs = []
-        start_codon = 'ATG'
-        stop_codons = ['TAA', 'TAG', 'TGA']
-        
-        for frame in range(3):
-            for i in range(frame, len(sequence) - 2, 3):
-                codon = sequence[i:i+3]
-                if len(codon) == 3 and codon == start_codon:
-                    for j in range(i + 3, len(sequence) - 2, 3):
-                        next_codon = sequence[j:j+3]
-                        if len(next_codon) == 3 and next_codon in stop_codons:
-                            orf_length = j - i + 3
-                            if orf_length >= 90:
-                                orfs.append({
-                                    'start': i,
-                                    'end': j + 3,
-                                    'length': orf_length,
-                                    'frame': frame + 1,
-                                    'sequence': sequence[i:j+3][:60] + '...'
-                                })
-                            break
-        
-        return sorted(orfs, key=lambda x: x['length'], reverse=True)[:5]
+    def find_orfs(self, sequence, min_length=90, top_n=5, start_codons=orf_finder.DEFAULT_START_CODONS,
+                  nested=False, both_strands=True):
+        """إيجاد أطر القراءة المفتوحة (ORFs) في الأطر الستة"""
+        return orf_finder.find_orfs(
+            sequence,
+            min_length=min_length,
+            top_n=top_n,
+            start_codons=start_codons,
+            nested=nested,
+            both_strands=both_strands
+        )
     
-    def analyze_sequence(self, sequence):
-        """التحليل الشامل للتسلسل"""
-        cleaned_seq = self.clean_sequence(sequence)
+    def analyze_sequence(self, sequence, motifs=None, fields=None):
+        """التحليل الشامل للتسلسل
         
-        if len(cleaned_seq) == 0:
+        fields limits the sections computed to a subset of ANALYSIS_FIELDS
+        ('molecular_weight' controls that entry of 'statistics'); None means all.
+        """
+        with metrics.stage('clean', len(sequence)):
+            encoded = self.clean_sequence(as_encoded(sequence))
+        return self._analyze_cleaned(encoded, len(sequence), motifs, fields)
+    
+    def _analyze_cleaned(self, encoded, original_length, motifs=None, fields=None):
+        """Sections of analyze_sequence for a sequence that is already cleaned."""
+        fields = resolve_fields(fields)
+        if len(encoded) == 0:
             raise ValueError("التسلسل فارغ أو يحتوي على رموز غير صالحة")
         
+        length = len(encoded)
         results = {
             'sequence_info': {
-                'length': len(cleaned_seq),
-                'original_length': len(sequence),
-                'cleaned_sequence': cleaned_seq[:100] + ('...' if len(cleaned_seq) > 100 else '')
-            },
-            'gc_content': round(self.calculate_gc_content(cleaned_seq), 2),
-            'composition': {k: round(v, 2) for k, v in self.get_composition(cleaned_seq).items()},
-            'motifs': self.find_motifs(cleaned_seq),
-            'translation': self.translate_sequence(cleaned_seq),
-            'statistics': self.get_sequence_statistics(cleaned_seq)
+                'length': length,
+                'original_length': original_length,
+                'cleaned_sequence': str(encoded[:100]) + ('...' if length > 100 else '')
+            }
         }
+        if 'gc_content' in fields:
+            with metrics.stage('gc_content', length):
+                results['gc_content'] = round(self.calculate_gc_content(encoded), 2)
+        if 'composition' in fields:
+            with metrics.stage('composition', length):
+                results['composition'] = {k: round(v, 2) for k, v in self.get_composition(encoded).items()}
+        if 'motifs' in fields:
+            with metrics.stage('motifs', length):
+                results['motifs'] = self.find_motifs(encoded, motifs)
+        if 'translation' in fields:
+            with metrics.stage('translation', length):
+                results['translation'] = self.translate_sequence(encoded)
+        if 'gc_profile' in fields:
+            with metrics.stage('gc_profile', length):
+                results['gc_profile'] = self.get_gc_profile(encoded)
+        if 'repeats' in fields:
+            with metrics.stage('repeats', length):
+                results['repeats'] = self.find_repeats(encoded)
+        if 'codon_usage' in fields:
+            with metrics.stage('codon_usage', length):
+                results['codon_usage'] = self.get_codon_usage(encoded)
+        if 'restriction' in fields:
+            with metrics.stage('restriction', length):
+                results['restriction'] = self.get_restriction_map(encoded)
+        if 'statistics' in fields:
+            with metrics.stage('statistics', length):
+                results['statistics'] = self.get_sequence_statistics(
+                    encoded, include_molecular_weight='molecular_weight' in fields
+                )
         
         return results
     
-    def get_sequence_statistics(self, sequence):
+    def get_codon_usage(self, sequence, reference=None, table=1, min_length=90, top_n=5,
+                        start_codons=orf_finder.DEFAULT_START_CODONS):
+        """استخدام الكودونات وRSCU ومؤشر CAI وخصائص البروتين لأطر القراءة المفتوحة"""
+        return codon_usage.codon_usage(
+            [('Sequence_1', self.clean_sequence(as_encoded(sequence)))],
+            reference=reference, table=table, start_codons=start_codons,
+            min_length=min_length, top_n=top_n
+        )
+    
+    def get_codon_usage_from_file(self, filepath, reference=None, table=1, min_length=90, top_n=5,
+                                  start_codons=orf_finder.DEFAULT_START_CODONS):
+        """استخدام الكودونات لجميع سجلات الملف في تمريرة واحدة على دفعات"""
+        records = ((record['id'], self.clean_sequence(as_encoded(record['sequence'])))
+                   for record in self.iter_records(filepath))
+        return codon_usage.codon_usage(
+            records, reference=reference, table=table, start_codons=start_codons,
+            min_length=min_length, top_n=top_n
+        )
+    
+    def find_repeats(self, sequence, **options):
+        """اكتشاف التكرارات المتتالية (طول الوحدة 1-6) والمناطق منخفضة التعقيد"""
+        return repeats.find_repeats(self.clean_sequence(as_encoded(sequence)), **options)
+    
+    def mask_repeats(self, sequence, hard=False, **options):
+        """إخفاء التكرارات والمناطق منخفضة التعقيد بأحرف صغيرة أو بـ N"""
+        return repeats.mask_sequence(self.clean_sequence(as_encoded(sequence)), hard, **options)
+    
+    def get_restriction_map(self, sequence, enzymes=None, **options):
+        """مواقع إنزيمات القطع وأحجام القطع الناتجة والتسلسلات المتناظرة على الشريطين"""
+        return restriction.restriction_map(restriction.strands(sequence), enzymes, **options)
+    
+    def get_reverse_complement(self, sequence, start=0, end=None):
+        """المتمم العكسي للتسلسل (أو لجزء منه بإحداثيات الشريط العكسي)"""
+        return str(restriction.strands(sequence).reverse_complement()[start:end])
+    
+    def get_gc_profile(self, sequence, windows=None, step=None, max_points=500):
+        """محتوى GC وانحراف GC في نوافذ منزلقة"""
+        encoded = as_encoded(sequence)
+        if windows is None:
+            windows = [default_gc_window(len(encoded))]
+        return gc_profile.gc_profile(encoded, windows=windows, step=step, max_points=max_points)
+    
+    def get_gc_profile_from_file(self, filepath, record=0, windows=None, step=None,
+                                 max_points=500, chunk_size=1 << 20):
+        """حساب ملف GC لسجل من ملف على دفعات دون تحميله كاملاً في الذاكرة"""
+        if self.detect_file_format(filepath) in ('fasta', 'fastq'):
+            with IndexedReader(filepath) as reader:
+                length = reader.entry(record).length
+                if windows is None:
+                    windows = [default_gc_window(length)]
+                
+                def chunks():
+                    for start in range(0, length, chunk_size):
+                        chunk = reader.fetch(record, start, start + chunk_size)
+                        yield EncodedSequence.from_string(chunk)
+                        if isinstance(chunk, memoryview):
+                            chunk.release()
+                
+                return gc_profile.gc_profile_from_chunks(chunks(), windows, step, max_points)
+        
+        # TSV and raw files have no index: read records until the requested one
+        for index, item in enumerate(self.iter_records(filepath)):
+            if index == record or item['id'] == record:
+                return self.get_gc_profile(item['sequence'], windows, step, max_points)
+        raise IndexError(f"Record {record} not found")
+    
+    def get_fastq_qc(self, filepath, adapters=None):
+        """مراقبة جودة ملف FASTQ: الجودة حسب الموضع وأطوال القراءات وGC والمحولات والتكرار"""
+        if self.detect_file_format(filepath) != 'fastq':
+            raise ValueError("الملف ليس بصيغة FASTQ")
+        size = os.path.getsize(filepath)
+        with metrics.stage('fastq_qc', size):
+            return fastq_qc.fastq_qc(filepath, adapters)
+    
+    def get_sequence_statistics(self, sequence, include_molecular_weight=True):
         """إحصائيات إضافية"""
-        seq_len = len(sequence)
-        at_content = round((sequence.count('A') + sequence.count('T')) / seq_len * 100, 2)
-        gc_content = round((sequence.count('G') + sequence.count('C')) / seq_len * 100, 2)
-        purine_content = round((sequence.count('A') + sequence.count('G')) / seq_len * 100, 2)
-        pyrimidine_content = round((sequence.count('C') + sequence.count('T')) / seq_len * 100, 2)
+        encoded = as_encoded(sequence)
+        seq_len = len(encoded)
+        at_content = round(encoded.percent('AT'), 2)
+        gc_content = round(encoded.percent('GC'), 2)
+        purine_content = round(encoded.percent('AG'), 2)
+        pyrimidine_content = round(encoded.percent('CT'), 2)
         
         # Generate sequence summary
         summary = []
@@ -162,14 +399,27 @@ class DNAAnalyzer:
         if at_gc_diff < 10:
             summary.append("توازن جيد بين AT و GC")
         
-        return {
+        statistics = {
             'at_content': at_content,
             'gc_content': gc_content,
             'purine_content': purine_content,
-            'pyrimidine_content': pyrimidine_content,
-            'molecular_weight': round(molecular_weight(Seq(sequence), seq_type='DNA'), 2) if seq_len < 1000 else 'كبير جداً',
-            'summary': ' | '.join(summary)
+            'pyrimidine_content': pyrimidine_content
         }
+        if include_molecular_weight:
+            # exact at any length: both come from one pass of base and dinucleotide counts
+            counts = physical_properties.NucleotideCounts.from_sequence(encoded)
+            statistics['molecular_weight'] = round(counts.molecular_weight(), 2)
+            statistics['melting_temperature'] = counts.melting_temperatures()
+        statistics['summary'] = ' | '.join(summary)
+        return statistics
+    
+    def get_physical_properties(self, sequence, molecule='DNA', double_stranded=False, circular=False,
+                                **conditions):
+        """الوزن الجزيئي ودرجات الانصهار (Wallace وGC وأقرب الجيران) لـ DNA أو RNA بشريط مفرد أو مزدوج"""
+        return physical_properties.physical_properties(
+            self.clean_sequence(as_encoded(sequence)), molecule=molecule,
+            double_stranded=double_stranded, circular=circular, **conditions
+        )
     
     def detect_file_format(self, filepath):
         """Detect the format of the input file"""
@@ -191,139 +441,258 @@ class DNAAnalyzer:
                     return 'tsv'
                 
                 # Check if it's a raw sequence (contains only ATGCN)
-                elif re.match(r'^[ATGCN\s]+$', first_line, re.I):
+                elif _RAW_LINE.match(first_line):
                     return 'raw'
                 
             return 'unknown'
         except:
             return 'unknown'
 
-    def analyze_from_file(self, filepath):
-        """تحليل التسلسل من ملف"""
-        sequences = []
+    def iter_records(self, filepath):
+        """قراءة السجلات من الملف واحداً تلو الآخر دون تحميل الملف كاملاً"""
         file_format = self.detect_file_format(filepath)
         
         try:
-            # Handle based on detected format
+            # Bio.SeqIO pulls in the rest of Biopython's parsers, so it is loaded on first use
             if file_format == 'fasta':
+                from Bio.SeqIO.FastaIO import SimpleFastaParser
                 # Parse FASTA format (including .fna files)
-                for record in SeqIO.parse(filepath, "fasta"):
-                    sequences.append({
-                        'id': record.id,
-                        'description': record.description,
-                        'sequence': str(record.seq)
-                    })
+                with open(filepath, 'r') as f:
+                    for title, sequence in SimpleFastaParser(f):
+                        yield {
+                            'id': title.split(None, 1)[0] if title else '',
+                            'description': title,
+                            'sequence': sequence
+                        }
             
             elif file_format == 'fastq':
-                # Parse FASTQ format
-                for record in SeqIO.parse(filepath, "fastq"):
-                    sequences.append({
-                        'id': record.id,
-                        'description': record.description,
-                        'sequence': str(record.seq)
-                    })
+                from Bio.SeqIO.QualityIO import FastqGeneralIterator
+                with open(filepath, 'r') as f:
+                    for title, sequence, _quality in FastqGeneralIterator(f):
+                        yield {
+                            'id': title.split(None, 1)[0] if title else '',
+                            'description': title,
+                            'sequence': sequence
+                        }
             
             elif file_format == 'tsv':
-                # Parse TSV format
                 with open(filepath, 'r') as f:
-                    content = f.read()
-                    lines = [line.strip() for line in content.split('\n') if line.strip()]
+                    header = [col.lower().strip() for col in f.readline().split('\t')]
+                    seq_index = header.index('sequence')
+                    count = 0
                     
-                    # Parse header
-                    header = lines[0].split('\t')
-                    if 'sequence' in [col.lower().strip() for col in header]:
-                        seq_index = [col.lower().strip() for col in header].index('sequence')
-                        
-                        # Process each line
-                        for line in lines[1:]:
-                            parts = line.split('\t')
-                            if len(parts) > seq_index:
-                                sequence = parts[seq_index].strip().replace(' ', '')
-                                sequence_class = parts[1].strip() if len(parts) > 1 else "unknown"
-                                
-                                if sequence:  # Only add if we have a sequence
-                                    sequences.append({
-                                        'id': f'Sequence_{len(sequences)+1}',
-                                        'description': f'Sequence from TSV file, class: {sequence_class}',
-                                        'sequence': sequence
-                                    })
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        parts = line.split('\t')
+                        if len(parts) > seq_index:
+                            sequence = parts[seq_index].strip().replace(' ', '')
+                            sequence_class = parts[1].strip() if len(parts) > 1 else "unknown"
+                            
+                            if sequence:  # Only yield if we have a sequence
+                                count += 1
+                                yield {
+                                    'id': f'Sequence_{count}',
+                                    'description': f'Sequence from TSV file, class: {sequence_class}',
+                                    'sequence': sequence
+                                }
             else:
-                # Handle raw sequence format
-                with open(filepath, 'r') as f:
-                    content = f.read().strip()
-                    # Join lines and clean the sequence
-                    sequence = ''.join(line.strip() for line in content.split('\n'))
-                    cleaned = self.clean_sequence(sequence)
-                    if cleaned and len(cleaned) >= 10:  # Minimum sequence length
-                        sequences.append({
-                            'id': 'Sequence_1',
-                            'description': 'Raw DNA sequence',
-                            'sequence': cleaned
-                        })
+                # Handle raw sequence format: cleaned in chunks straight into the encoded form
+                cleaned, report = clean_file(filepath)
+                if len(cleaned) >= 10:  # Minimum sequence length
+                    yield {
+                        'id': 'Sequence_1',
+                        'description': 'Raw DNA sequence',
+                        'sequence': cleaned,
+                        'cleaning': report
+                    }
                     
         except Exception as e:
-            print(f"File reading error: {str(e)}")
             logger.error(f"Error reading file {filepath}: {str(e)}")
-        except:
-            # Try as TSV/CSV
-            try:
-                with open(filepath, 'r') as f:
-                    content = f.read()
-                    lines = [line.strip() for line in content.split('\n') if line.strip()]
-                    
-                    # Parse header
-                    header = lines[0].split('\t')
-                    if 'sequence' in [col.lower().strip() for col in header]:
-                        seq_index = [col.lower().strip() for col in header].index('sequence')
-                        
-                        # Join multi-line sequences
-                        current_sequence = ""
-                        current_class = ""
-                        
-                        for line in lines[1:]:
-                            parts = line.split('\t')
-                            if len(parts) > seq_index:
-                                # If we have a complete sequence, add it
-                                if current_sequence:
-                                    sequences.append({
-                                        'id': f'Sequence_{len(sequences)+1}',
-                                        'description': f'Sequence from TSV file, class: {current_class}',
-                                        'sequence': current_sequence.replace(' ', '')
-                                    })
-                                
-                                # Start new sequence
-                                current_sequence = parts[seq_index].strip()
-                                current_class = parts[1].strip() if len(parts) > 1 else "unknown"
-                            else:
-                                # Continuation of previous sequence
-                                current_sequence += line.strip()
-                        
-                        # Add the last sequence
-                        if current_sequence:
-                            sequences.append({
-                                'id': f'Sequence_{len(sequences)+1}',
-                                'description': f'Sequence from TSV file, class: {current_class}',
-                                'sequence': current_sequence.replace(' ', '')
-                            })
-            except:
-                # Try as plain text
-                with open(filepath, 'r') as f:
-                    content = f.read()
-                    sequences.append({
-                        'id': 'Unknown',
-                        'description': 'من ملف نصي',
-                        'sequence': content
-                    })
+    
+    def analyze_record(self, record, index=0):
+        """تحليل سجل واحد (نص أو قاموس) مع إرجاع الخطأ بدلاً من رفعه"""
+        if isinstance(record, str):
+            record = {
+                'id': f'Sequence_{index + 1}',
+                'description': 'Sequence from batch input',
+                'sequence': record
+            }
+        file_info = {
+            'sequence_id': record['id'],
+            'description': record['description'],
+            'record_index': index
+        }
+        try:
+            results = self.analyze_sequence(record['sequence'])
+        except Exception as e:
+            logger.error(f"Error analyzing record {record['id']}: {str(e)}")
+            return {'file_info': file_info, 'error': str(e)}
+        
+        results['file_info'] = file_info
+        return results
+    
+    def iter_analyze_file(self, filepath, summary=None):
+        """تحليل كل سجل في الملف وإرجاع النتائج تباعاً"""
+        for index, record in enumerate(self.iter_records(filepath)):
+            results = self.analyze_record(record, index)
+            if summary is not None and 'error' not in results:
+                summary.add(self.clean_sequence(as_encoded(record['sequence'])))
+            yield results
+    
+    def analyze_many(self, records, workers=None, chunksize=16, ordered=True):
+        """تحليل عدة سجلات بالتوازي على مجموعة من العمليات
+        
+        Results are yielded as they are produced. With ordered=False they come
+        back as workers finish, within windows of workers * chunksize * 4
+        records so the input is never fully queued in memory. A failing
+        record yields a result with an 'error' key instead of stopping the batch.
+        """
+        workers = workers or os.cpu_count() or 1
+        items = enumerate(records)
+        
+        if workers == 1:
+            for index, record in items:
+                yield self.analyze_record(record, index)
+            return
         
-        if not sequences:
+        window = workers * chunksize * 4
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(self,)) as pool:
+            mapper = pool.imap if ordered else pool.imap_unordered
+            while True:
+                batch = list(itertools.islice(items, window))
+                if not batch:
+                    break
+                yield from mapper(_analyze_in_worker, batch, chunksize)
+    
+    def analyze_from_file(self, filepath, progress=None):
+        """تحليل التسلسل الأول من الملف مع ملخص لجميع السجلات
+        
+        Only the first record gets the full analysis; every record (the first
+        included) feeds the file summary. iter_analyze_file analyzes them all.
+        progress, if given, is called with the number of records read so far.
+        """
+        records = self.iter_records(filepath)
+        with metrics.stage('parse') as parse:
+            first_sequence = next(records, None)
+            if first_sequence is not None:
+                parse.bases = len(first_sequence['sequence'])
+        
+        if first_sequence is None:
             raise ValueError("لم يتم العثور على تسلسلات صالحة في الملف")
         
-        first_sequence = sequences[0]
-        results = self.analyze_sequence(first_sequence['sequence'])
+        # the first record is cleaned once, for both the analysis and the summary
+        with metrics.stage('clean', len(first_sequence['sequence'])):
+            first_cleaned = self.clean_sequence(as_encoded(first_sequence['sequence']))
+        results = self._analyze_cleaned(first_cleaned, len(first_sequence['sequence']))
+        
+        # reading and cleaning the remaining records
+        with metrics.stage('summary') as summary_stage:
+            summary = SequenceSummary()
+            summary.add(first_cleaned)
+            if progress:
+                progress(summary.count)
+            for record in records:
+                summary_stage.bases += len(record['sequence'])
+                summary.add(self.clean_sequence(as_encoded(record['sequence'])))
+                if progress:
+                    progress(summary.count)
+        
         results['file_info'] = {
             'sequence_id': first_sequence['id'],
             'description': first_sequence['description'],
-            'total_sequences': len(sequences)
+            'total_sequences': summary.count,
+            'summary': summary.as_dict()
         }
+        if 'cleaning' in first_sequence:
+            results['file_info']['cleaning'] = first_sequence['cleaning']
+        
+        # quality scores of every read, streamed from the file
+        if self.detect_file_format(filepath) == 'fastq':
+            results['fastq_qc'] = self.get_fastq_qc(filepath)
+        
+        return results
+    
+    def analyze_region(self, filepath, record=0, start=0, end=None, fields=None):
+        """تحليل منطقة من سجل محدد باستخدام فهرس .fai دون قراءة الملف كاملاً"""
+        with IndexedReader(filepath) as reader:
+            entry = reader.entry(record)
+            region = reader.fetch(record, start, end)
+            encoded = EncodedSequence.from_string(region)
+            if isinstance(region, memoryview):
+                region.release()
         
+        results = self.analyze_sequence(encoded, fields=fields)
+        results['file_info'] = {
+            'sequence_id': entry.name,
+            'description': f'Region {max(0, start)}-{min(entry.length, end) if end is not None else entry.length} of {entry.name}',
+            'record_length': entry.length,
+            'total_sequences': len(reader)
+        }
         return results
+
+    def get_sketch_index(self, filepath, k=minhash.DEFAULT_K, num_hashes=minhash.DEFAULT_NUM_HASHES):
+        """بصمات MinHash لجميع سجلات الملف، محفوظة بجانبه لإعادة استخدامها"""
+        def records():
+            for record in self.iter_records(filepath):
+                yield record['id'], record['sequence']
+        return minhash.load_or_build(filepath, records, k, num_hashes)
+
+    def find_similar(self, filepath, sequence=None, record=None, top_k=10,
+                     k=minhash.DEFAULT_K, num_hashes=minhash.DEFAULT_NUM_HASHES):
+        """إيجاد أكثر سجلات الملف تشابهاً مع تسلسل أو مع سجل من الملف نفسه"""
+        index = self.get_sketch_index(filepath, k, num_hashes)
+        return {
+            'k': index.k,
+            'num_hashes': index.num_hashes,
+            'total_sequences': len(index),
+            'matches': index.query(sequence=sequence, record=record, top_k=top_k)
+        }
+
+    def similarity_matrix(self, sequences=None, filepath=None,
+                          k=minhash.DEFAULT_K, num_hashes=minhash.DEFAULT_NUM_HASHES):
+        """مصفوفة التشابه (Jaccard ومسافة Mash) بين جميع التسلسلات أو سجلات الملف"""
+        if filepath is not None:
+            index = self.get_sketch_index(filepath, k, num_hashes)
+        else:
+            index = minhash.build_index(
+                ((f'Sequence_{i + 1}', seq) for i, seq in enumerate(sequences or [])), k, num_hashes)
+        if len(index) > MAX_MATRIX_RECORDS:
+            raise ValueError(f"Similarity matrix is limited to {MAX_MATRIX_RECORDS} sequences")
+        jaccard, distance = index.pairwise()
+        return {
+            'k': index.k,
+            'num_hashes': index.num_hashes,
+            'names': index.names,
+            'jaccard': np.round(jaccard, 4).tolist(),
+            'mash_distance': np.round(distance, 6).tolist()
+        }
+
+    def get_search_index(self, filepath):
+        """فهرس FM لجميع سجلات الملف، يُبنى مرة واحدة ويُحفظ بجانبه"""
+        def records():
+            for record in self.iter_records(filepath):
+                yield record['id'], record['sequence']
+        return fm_index.load_or_build(filepath, records)
+
+    def search_patterns(self, filepath, patterns, both_strands=False, max_positions=100):
+        """عدّ وتحديد مواقع أنماط دقيقة في الملف باستخدام فهرس FM"""
+        index = self.get_search_index(filepath)
+        return {
+            'total_sequences': len(index.names),
+            'results': [index.search(p, both_strands, max_positions) for p in patterns]
+        }
+
+# One analyzer per process, shared by every request; its caches are lock-protected
+_shared_analyzer = None
+_shared_analyzer_lock = threading.Lock()
+
+def get_analyzer():
+    """The process-wide DNAAnalyzer, built and warmed on first use."""
+    global _shared_analyzer
+    if _shared_analyzer is None:
+        with _shared_analyzer_lock:
+            if _shared_analyzer is None:
+                _shared_analyzer = DNAAnalyzer().warm()
+    return _shared_analyzer
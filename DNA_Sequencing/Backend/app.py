@@ -1,15 +1,22 @@
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, Response
+from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, Response, stream_with_context, g
+import cProfile
 import io
-import csv
-from reportlab.pdfgen import canvas
 import os
 from werkzeug.utils import secure_filename
-from analyzer import DNAAnalyzer
+from analyzer import get_analyzer, resolve_fields
+import exporter
+import expression
+import metrics
+import restriction
+from jobs import DONE, FAILED, JobManager, JobQueueFull
+from result_cache import ResultCache, file_key, sequence_key
+from sequence_cleaner import count_invalid
 import json
 from datetime import datetime
 import logging
-import re
+import pstats
 import secrets
+import time
 
 # إعداد logging
 logging.basicConfig(level=logging.INFO)
@@ -20,13 +27,29 @@ app = Flask(__name__,
                 static_folder='../static')
 app.secret_key = secrets.token_hex(16)  # مفتاح آمن
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'static/uploads')
+app.config['DATA_FOLDER'] = os.path.join(os.path.dirname(__file__), '..', 'Data')  # مصفوفات التعبير الجيني (CSV)
 app.config['RESULTS_FOLDER'] = 'static/results'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['RESULT_CACHE_SIZE'] = 256  # عدد النتائج في الذاكرة
+app.config['RESULT_CACHE_TTL'] = 3600  # ثوانٍ
+app.config['RESULT_CACHE_PATH'] = os.environ.get('DNA_RESULT_CACHE_PATH')  # ملف sqlite اختياري
+app.config['JOB_WORKERS'] = 2  # عدد التحليلات المتزامنة
+app.config['JOB_MAX_PENDING'] = 16  # الحد الأقصى للمهام المنتظرة والجارية
+app.config['JOB_RETENTION'] = 3600  # ثوانٍ قبل حذف المهام المنتهية وملفاتها
+app.config['PROFILING_ENABLED'] = os.environ.get('DNA_PROFILING_ENABLED') == '1'  # السماح بـ ?profile=1 أو X-Profile: 1
+app.config['PROFILE_FOLDER'] = os.path.join(os.path.dirname(__file__), 'static/profiles')
 
 # إنشاء المجلدات المطلوبة
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
 
+# ذاكرة تخزين مؤقت للنتائج
+result_cache = ResultCache(
+    max_entries=app.config['RESULT_CACHE_SIZE'],
+    ttl=app.config['RESULT_CACHE_TTL'],
+    path=app.config['RESULT_CACHE_PATH']
+)
+
 # الصيغ المسموحة للملفات
 ALLOWED_EXTENSIONS = {'fasta', 'fa', 'fna', 'fastq', 'fq', 'txt', 'seq', 'ffn', 'faa'}
 
@@ -38,11 +61,91 @@ def validate_dna_sequence(sequence):
     if len(sequence) < 10:
         return False, "التسلسل قصير جداً (الحد الأدنى 10 نيوكليوتيد)"
     
-    if not re.match(r'^[ATGCN]+$', sequence.upper()):
+    # فحص واحد بجدول bytes.translate بدلاً من نسخة upper() وتعبير نمطي
+    if count_invalid(sequence):
         return False, "التسلسل يحتوي على رموز غير صالحة (يُسمح فقط بـ A, T, G, C, N)"
     
     return True, ""
 
+def analyze_sequence_cached(analyzer, sequence, motifs=None, fields=None):
+    """تحليل التسلسل مع استخدام النتائج المخزنة إن وجدت"""
+    options = {'motifs': motifs}
+    if fields is not None:
+        options['fields'] = sorted(fields)
+    key = sequence_key(sequence, options)
+    results = result_cache.get(key)
+    if results is None:
+        results = analyzer.analyze_sequence(sequence, motifs=motifs, fields=fields)
+        result_cache.set(key, results)
+    return results
+
+def analyze_file_cached(analyzer, filepath, progress=None):
+    """تحليل الملف مع استخدام النتائج المخزنة إن وجدت"""
+    key = file_key(filepath)
+    results = result_cache.get(key)
+    if results is None:
+        results = analyzer.analyze_from_file(filepath, progress=progress)
+        result_cache.set(key, results)
+    return results
+
+# المحلل المشترك بين جميع الطلبات، يُبنى ويُهيَّأ مرة واحدة عند بدء التطبيق
+get_analyzer()
+
+# مهام تحليل الملفات في الخلفية
+job_manager = JobManager(
+    lambda filepath, progress: analyze_file_cached(get_analyzer(), filepath, progress),
+    max_workers=app.config['JOB_WORKERS'],
+    max_pending=app.config['JOB_MAX_PENDING'],
+    retention=app.config['JOB_RETENTION']
+)
+
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
+def parse_list_option(value):
+    """قبول قائمة أو نص مفصول بفواصل"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    raise ValueError('الخيارات يجب أن تكون قائمة من النصوص')
+
+def iter_ndjson(stream):
+    """قراءة سطور NDJSON من الطلب تدريجياً"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield {'error': 'سطر JSON غير صالح'}
+
+def analyze_batch_item(analyzer, index, item, motifs, fields):
+    """تحليل عنصر واحد من الدفعة مع إرجاع الخطأ بدلاً من رفعه"""
+    if isinstance(item, str):
+        item = {'sequence': item}
+    if not isinstance(item, dict):
+        return {'index': index, 'error': 'كل عنصر يجب أن يكون نصاً أو كائناً يحتوي على sequence'}
+    
+    item_id = item.get('id', f'Sequence_{index + 1}')
+    if 'error' in item:
+        return {'index': index, 'id': item_id, 'error': item['error']}
+    
+    sequence = str(item.get('sequence', '')).strip()
+    is_valid, error_msg = validate_dna_sequence(sequence)
+    if not is_valid:
+        return {'index': index, 'id': item_id, 'error': error_msg}
+    
+    try:
+        results = analyze_sequence_cached(analyzer, sequence, motifs, fields)
+    except Exception as e:
+        logger.error(f"Error in batch item {index}: {str(e)}")
+        return {'index': index, 'id': item_id, 'error': str(e)}
+    return {'index': index, 'id': item_id, 'result': results}
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -50,7 +153,7 @@ def index():
 @app.route('/upload', methods=['GET', 'POST'])
 def upload_file():
     if request.method == 'POST':
-        analyzer = DNAAnalyzer()
+        analyzer = get_analyzer()
         
         try:
             # فحص إذا كان هناك ملف مرفوع
@@ -59,21 +162,35 @@ def upload_file():
                 if file.filename != '' and allowed_file(file.filename):
                     # إنشاء اسم ملف فريد
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"{timestamp}_{secure_filename(file.filename)}"
+                    filename = f"{timestamp}_{secrets.token_hex(4)}_{secure_filename(file.filename)}"
                     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                     
                     file.save(filepath)
                     logger.info(f"File uploaded: {filename}")
                     
-                    results = analyzer.analyze_from_file(filepath)
-                    return render_template('result.html', results=results, filename=filename)
+                    # التحليل يتم في الخلفية ويُعاد رقم المهمة فوراً
+                    try:
+                        job = job_manager.submit(filepath, filename)
+                    except JobQueueFull:
+                        os.remove(filepath)
+                        if wants_json():
+                            return jsonify({'error': 'الخادم مشغول، حاول لاحقاً'}), 503, {'Retry-After': '30'}
+                        flash('الخادم مشغول حالياً، يرجى المحاولة لاحقاً')
+                        return redirect(url_for('index'))
+                    
+                    if wants_json():
+                        return jsonify({
+                            'job_id': job.id,
+                            'status_url': url_for('api_job_status', job_id=job.id)
+                        }), 202
+                    return redirect(url_for('job_page', job_id=job.id))
                 else:
                     flash('يرجى اختيار ملف بصيغة صحيحة (FASTA, FASTQ, TXT)')
                     return redirect(url_for('index'))
             
             # أو إذا كان النص مُدخل مباشرة
             elif 'sequence_text' in request.form:
-                sequence = request.form['sequence_text'].strip().upper()
+                sequence = request.form['sequence_text'].strip()
                 
                 # التحقق من صحة التسلسل
                 is_valid, error_msg = validate_dna_sequence(sequence)
@@ -81,7 +198,7 @@ def upload_file():
                     flash(error_msg)
                     return redirect(url_for('index'))
                 
-                results = analyzer.analyze_sequence(sequence)
+                results = analyze_sequence_cached(analyzer, sequence)
                 return render_template('result.html', results=results, filename="إدخال مباشر")
             
             else:
@@ -96,6 +213,54 @@ def upload_file():
     # GET request - redirect to index
     return redirect(url_for('index'))
 
+@app.route('/jobs/<job_id>')
+def job_page(job_id):
+    """صفحة متابعة مهمة التحليل"""
+    job = job_manager.get(job_id)
+    if job is None:
+        flash('المهمة غير موجودة أو انتهت صلاحيتها')
+        return redirect(url_for('index'))
+    
+    if job.status == DONE:
+        return render_template('result.html', results=job.result, filename=job.filename)
+    if job.status == FAILED:
+        flash(f'حدث خطأ أثناء المعالجة: {job.error}')
+        return redirect(url_for('index'))
+    return render_template('job.html', job=job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """حالة مهمة التحليل ونتيجتها عند الانتهاء"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'المهمة غير موجودة'}), 404
+    return jsonify(job.to_dict(include_result=True))
+
+@app.route('/api/uploads/<filename>/region', methods=['GET'])
+def api_upload_region(filename):
+    """تحليل منطقة من ملف مرفوع مسبقاً: ?record=500&start=1000000&end=2000000"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.isfile(filepath):
+        return jsonify({'error': 'الملف غير موجود'}), 404
+    
+    try:
+        record = request.args.get('record', '0')
+        record = int(record) if record.isdigit() else record
+        start = int(request.args.get('start', 0))
+        end = request.args.get('end')
+        end = int(end) if end is not None else None
+        fields = resolve_fields(parse_list_option(request.args.get('fields')),
+                                parse_list_option(request.args.get('exclude')))
+        
+        results = get_analyzer().analyze_region(filepath, record, start, end, fields=fields)
+        return jsonify(results)
+    
+    except (ValueError, KeyError, IndexError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in region analysis: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
 @app.route('/api/analyze', methods=['POST'])
 def api_analyze():
     """API endpoint للتحليل السريع"""
@@ -104,112 +269,631 @@ def api_analyze():
             return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
         
         data = request.get_json()
-        sequence = data.get('sequence', '').strip().upper()
+        sequence = data.get('sequence', '').strip()
         
         # التحقق من صحة التسلسل
         is_valid, error_msg = validate_dna_sequence(sequence)
         if not is_valid:
             return jsonify({'error': error_msg}), 400
         
-        analyzer = DNAAnalyzer()
-        results = analyzer.analyze_sequence(sequence)
+        motifs = data.get('motifs')
+        if motifs is not None and not (isinstance(motifs, list) and all(isinstance(m, str) for m in motifs)):
+            return jsonify({'error': 'motifs يجب أن تكون قائمة من النصوص'}), 400
+        
+        # ?fields=gc_content,composition يحسب الأقسام المطلوبة فقط
+        fields = resolve_fields(
+            parse_list_option(request.args.get('fields', data.get('fields'))),
+            parse_list_option(request.args.get('exclude', data.get('exclude')))
+        )
+        
+        analyzer = get_analyzer()
+        results = analyze_sequence_cached(analyzer, sequence, motifs, fields)
         
         logger.info(f"API analysis completed for sequence length: {len(sequence)}")
         return jsonify(results)
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error in API analysis: {str(e)}")
         return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
 
+@app.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """API endpoint لتحليل دفعة من التسلسلات مع إرسال النتائج بصيغة NDJSON"""
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            # الخيارات تُمرَّر في الرابط لأن جسم الطلب يحتوي على التسلسلات فقط
+            options = request.args
+            items = iter_ndjson(request.stream)
+        elif request.is_json:
+            data = request.get_json()
+            if isinstance(data, list):
+                data = {'sequences': data}
+            if not isinstance(data, dict) or not isinstance(data.get('sequences'), list):
+                return jsonify({'error': 'يجب إرسال قائمة sequences'}), 400
+            options = data
+            items = iter(data['sequences'])
+        else:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json أو application/x-ndjson'}), 400
+        
+        motifs = parse_list_option(options.get('motifs'))
+        fields = resolve_fields(parse_list_option(options.get('fields')),
+                                parse_list_option(options.get('exclude')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    analyzer = get_analyzer()
+    
+    def generate():
+        count = 0
+        for index, item in enumerate(items):
+            count += 1
+            yield json.dumps(analyze_batch_item(analyzer, index, item, motifs, fields)) + '\n'
+        logger.info(f"Batch analysis completed for {count} sequences")
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def parse_gc_profile_options(options):
+    """قراءة خيارات ملف GC (window/windows و step و max_points)"""
+    windows = options.get('windows', options.get('window'))
+    if windows is not None:
+        windows = parse_list_option(windows) if isinstance(windows, str) else windows
+        windows = [int(w) for w in (windows if isinstance(windows, list) else [windows])]
+    step = options.get('step')
+    return {
+        'windows': windows,
+        'step': int(step) if step is not None else None,
+        'max_points': int(options.get('max_points', 500))
+    }
+
+@app.route('/api/gc_profile', methods=['POST'])
+def api_gc_profile():
+    """API endpoint لمحتوى GC وانحرافه في نوافذ منزلقة"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        sequence = data.get('sequence', '').strip()
+        
+        # التحقق من صحة التسلسل
+        is_valid, error_msg = validate_dna_sequence(sequence)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+        
+        profile = get_analyzer().get_gc_profile(sequence, **parse_gc_profile_options(data))
+        return jsonify(profile)
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in GC profile: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/uploads/<filename>/gc_profile', methods=['GET'])
+def api_upload_gc_profile(filename):
+    """ملف GC لسجل من ملف مرفوع يُقرأ على دفعات"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.isfile(filepath):
+        return jsonify({'error': 'الملف غير موجود'}), 404
+    
+    try:
+        record = request.args.get('record', '0')
+        record = int(record) if record.isdigit() else record
+        profile = get_analyzer().get_gc_profile_from_file(
+            filepath, record, **parse_gc_profile_options(request.args)
+        )
+        return jsonify(profile)
+    
+    except (TypeError, ValueError, KeyError, IndexError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in GC profile: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/uploads/<filename>/fastq_qc', methods=['GET'])
+def api_upload_fastq_qc(filename):
+    """مراقبة جودة ملف FASTQ مرفوع يُقرأ على دفعات"""
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.isfile(filepath):
+        return jsonify({'error': 'الملف غير موجود'}), 404
+    
+    try:
+        adapters = request.args.get('adapters')
+        if adapters:
+            adapters = {adapter: adapter for adapter in parse_list_option(adapters.upper())}
+        return jsonify(get_analyzer().get_fastq_qc(filepath, adapters or None))
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in FASTQ QC: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/kmers', methods=['POST'])
+def api_kmers():
+    """API endpoint لطيف الـ k-mers"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        sequence = data.get('sequence', '').strip()
+        
+        # التحقق من صحة التسلسل
+        is_valid, error_msg = validate_dna_sequence(sequence)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+        
+        ks = data.get('k', 6)
+        ks = ks if isinstance(ks, list) else [ks]
+        try:
+            ks = [int(k) for k in ks]
+            top_n = int(data.get('top_n', 10))
+            min_count = int(data.get('min_count', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k و top_n و min_count يجب أن تكون أرقاماً صحيحة'}), 400
+        
+        analyzer = get_analyzer()
+        spectrum = analyzer.get_kmer_spectrum(
+            sequence,
+            ks=ks,
+            canonical=bool(data.get('canonical', False)),
+            top_n=top_n,
+            min_count=min_count
+        )
+        
+        logger.info(f"K-mer spectrum completed for sequence length: {len(sequence)}")
+        return jsonify({'kmers': {str(k): v for k, v in spectrum.items()}})
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in k-mer analysis: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/codon_usage', methods=['POST'])
+def api_codon_usage():
+    """API endpoint لاستخدام الكودونات وRSCU وCAI لتسلسل أو لجميع سجلات ملف مرفوع"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        reference = data.get('reference')
+        if reference is not None and not isinstance(reference, dict):
+            return jsonify({'error': 'reference يجب أن يكون قاموساً من الكودونات إلى القيم'}), 400
+        try:
+            options = {
+                'reference': reference,
+                'table': int(data.get('table', 1)),
+                'min_length': int(data.get('min_length', 90)),
+                'top_n': int(data.get('top_n', 5))
+            }
+        except (TypeError, ValueError):
+            return jsonify({'error': 'table و min_length و top_n يجب أن تكون أرقاماً صحيحة'}), 400
+        if options['top_n'] < 0:
+            return jsonify({'error': 'top_n يجب ألا يكون سالباً'}), 400
+        
+        analyzer = get_analyzer()
+        filename = data.get('filename')
+        if filename:
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+            if not os.path.isfile(filepath):
+                return jsonify({'error': 'الملف غير موجود'}), 404
+            result = analyzer.get_codon_usage_from_file(filepath, **options)
+        else:
+            sequence = data.get('sequence', '').strip()
+            
+            # التحقق من صحة التسلسل
+            is_valid, error_msg = validate_dna_sequence(sequence)
+            if not is_valid:
+                return jsonify({'error': error_msg}), 400
+            result = analyzer.get_codon_usage(sequence, **options)
+        
+        logger.info(f"Codon usage completed over {result['orfs_analyzed']} ORFs")
+        return jsonify(result)
+    
+    except (TypeError, ValueError, KeyError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in codon usage: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/repeats', methods=['POST'])
+def api_repeats():
+    """API endpoint للتكرارات المتتالية والمناطق منخفضة التعقيد مع خيار إخفائها"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        sequence = data.get('sequence', '').strip()
+        
+        # التحقق من صحة التسلسل
+        is_valid, error_msg = validate_dna_sequence(sequence)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+        
+        mask = data.get('mask')
+        if mask not in (None, 'soft', 'hard'):
+            return jsonify({'error': 'mask يجب أن يكون soft أو hard'}), 400
+        try:
+            options = {
+                'min_length': int(data.get('min_length', 12)),
+                'min_copies': int(data.get('min_copies', 3)),
+                'entropy_threshold': float(data.get('entropy_threshold', 3.0))
+            }
+        except (TypeError, ValueError):
+            return jsonify({'error': 'min_length و min_copies و entropy_threshold يجب أن تكون أرقاماً'}), 400
+        
+        analyzer = get_analyzer()
+        result = {'repeats': analyzer.find_repeats(sequence, **options)}
+        if mask:
+            result['masked_sequence'] = analyzer.mask_repeats(sequence, hard=mask == 'hard', **options)
+        
+        logger.info(f"Repeat detection completed for sequence length: {len(sequence)}")
+        return jsonify(result)
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in repeat detection: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/restriction', methods=['POST'])
+def api_restriction():
+    """API endpoint لخريطة إنزيمات القطع والتسلسلات المتناظرة مع خيار المتمم العكسي"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        sequence = data.get('sequence', '').strip()
+        
+        # التحقق من صحة التسلسل
+        is_valid, error_msg = validate_dna_sequence(sequence)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+        
+        enzymes = data.get('enzymes')
+        if isinstance(enzymes, str):
+            enzymes = parse_list_option(enzymes)
+        try:
+            options = {
+                'min_palindrome': int(data.get('min_palindrome', 6)),
+                'max_palindrome': int(data.get('max_palindrome', 12)),
+                'max_positions': int(data.get('max_positions', 20))
+            }
+        except (TypeError, ValueError):
+            return jsonify({'error': 'min_palindrome و max_palindrome و max_positions يجب أن تكون أرقاماً'}), 400
+        if options['max_palindrome'] > restriction.PALINDROME_LIMIT:
+            return jsonify({'error': f'max_palindrome يجب ألا يتجاوز {restriction.PALINDROME_LIMIT}'}), 400
+        
+        analyzer = get_analyzer()
+        result = {'restriction': analyzer.get_restriction_map(sequence, enzymes, **options)}
+        if data.get('reverse_complement'):
+            result['reverse_complement'] = analyzer.get_reverse_complement(sequence)
+        
+        logger.info(f"Restriction mapping completed for sequence length: {len(sequence)}")
+        return jsonify(result)
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in restriction mapping: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/properties', methods=['POST'])
+def api_properties():
+    """API endpoint للوزن الجزيئي ودرجات الانصهار لـ DNA أو RNA بشريط مفرد أو مزدوج"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        sequence = data.get('sequence', '').strip()
+        molecule = str(data.get('molecule', 'DNA')).upper()
+        if molecule == 'RNA':
+            # RNA is given with U and analyzed as its DNA template
+            sequence = sequence.replace('U', 'T').replace('u', 't')
+        
+        # التحقق من صحة التسلسل
+        is_valid, error_msg = validate_dna_sequence(sequence)
+        if not is_valid:
+            return jsonify({'error': error_msg}), 400
+        
+        try:
+            conditions = {
+                'sodium_mm': float(data.get('sodium_mm', 50)),
+                'strand_nm': float(data.get('strand_nm', 25))
+            }
+        except (TypeError, ValueError):
+            return jsonify({'error': 'sodium_mm و strand_nm يجب أن تكون أرقاماً'}), 400
+        
+        result = get_analyzer().get_physical_properties(
+            sequence, molecule=molecule,
+            double_stranded=bool(data.get('double_stranded', False)),
+            circular=bool(data.get('circular', False)),
+            **conditions
+        )
+        
+        logger.info(f"Physical properties completed for sequence length: {len(sequence)}")
+        return jsonify(result)
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in physical properties: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/expression', methods=['POST'])
+def api_expression():
+    """API endpoint لإحصائيات مصفوفة التعبير الجيني والجينات الأعلى تبايناً والارتباط بينها"""
+    try:
+        data = request.get_json(silent=True) or {}
+        dataset = secure_filename(data.get('dataset', 'DNA_Dataset_Normalized.csv'))
+        filepath = os.path.join(app.config['DATA_FOLDER'], dataset)
+        if not dataset.lower().endswith('.csv') or not os.path.isfile(filepath):
+            return jsonify({'error': 'مجموعة البيانات غير موجودة'}), 404
+        
+        genes = data.get('genes')
+        genes = parse_list_option(genes) if isinstance(genes, str) else genes
+        if genes is not None and (not isinstance(genes, list) or len(genes) > expression.MAX_MATRIX_GENES):
+            return jsonify({'error': f'genes يجب أن تكون قائمة من {expression.MAX_MATRIX_GENES} جين على الأكثر'}), 400
+        try:
+            top_n = int(data.get('top_n', 10))
+            top_pairs = int(data.get('top_pairs', 20))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'top_n و top_pairs يجب أن تكون أرقاماً صحيحة'}), 400
+        if not 0 <= top_n <= expression.MAX_MATRIX_GENES:
+            return jsonify({'error': f'top_n يجب أن يكون بين 0 و {expression.MAX_MATRIX_GENES}'}), 400
+        if not 0 <= top_pairs <= expression.MAX_TOP_PAIRS:
+            return jsonify({'error': f'top_pairs يجب أن يكون بين 0 و {expression.MAX_TOP_PAIRS}'}), 400
+        
+        matrix = expression.ExpressionMatrix.load(filepath)
+        result = expression.summarize(matrix, genes=genes, top_n=top_n, top_pairs=top_pairs)
+        result['dataset'] = dataset
+        
+        logger.info(f"Expression analysis completed for {dataset}: {matrix.shape[0]} samples x {matrix.shape[1]} genes")
+        return jsonify(result)
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in expression analysis: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/similar', methods=['POST'])
+def api_similar():
+    """API endpoint للبحث عن التسلسلات المتشابهة باستخدام بصمات MinHash"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        try:
+            k = int(data.get('k', 21))
+            num_hashes = int(data.get('num_hashes', 128))
+            top_k = int(data.get('top_k', 10))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k و num_hashes و top_k يجب أن تكون أرقاماً صحيحة'}), 400
+        
+        analyzer = get_analyzer()
+        filename = data.get('filename')
+        if not filename:
+            # all-vs-all between the posted sequences
+            sequences = data.get('sequences')
+            if not isinstance(sequences, list) or len(sequences) < 2:
+                return jsonify({'error': 'يجب إرسال اسم ملف مرفوع أو قائمة من تسلسلين على الأقل'}), 400
+            for sequence in sequences:
+                is_valid, error_msg = validate_dna_sequence(sequence if isinstance(sequence, str) else '')
+                if not is_valid:
+                    return jsonify({'error': error_msg}), 400
+            return jsonify(analyzer.similarity_matrix(sequences=sequences, k=k, num_hashes=num_hashes))
+        
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+        if not os.path.isfile(filepath):
+            return jsonify({'error': 'الملف غير موجود'}), 404
+        
+        if data.get('matrix'):
+            return jsonify(analyzer.similarity_matrix(filepath=filepath, k=k, num_hashes=num_hashes))
+        
+        sequence = data.get('sequence')
+        if sequence is not None:
+            is_valid, error_msg = validate_dna_sequence(sequence)
+            if not is_valid:
+                return jsonify({'error': error_msg}), 400
+        result = analyzer.find_similar(
+            filepath,
+            sequence=sequence,
+            record=data.get('record'),
+            top_k=top_k,
+            k=k,
+            num_hashes=num_hashes
+        )
+        
+        logger.info(f"Similarity search completed over {result['total_sequences']} records")
+        return jsonify(result)
+    
+    except (TypeError, ValueError, KeyError, IndexError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in similarity search: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء التحليل: {str(e)}'}), 500
+
+@app.route('/api/search', methods=['POST'])
+def api_search():
+    """API endpoint للبحث الدقيق عن أنماط في ملف مرفوع باستخدام فهرس FM"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type يجب أن يكون application/json'}), 400
+        
+        data = request.get_json()
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(data.get('filename', '')))
+        if not data.get('filename') or not os.path.isfile(filepath):
+            return jsonify({'error': 'الملف غير موجود'}), 404
+        
+        patterns = parse_list_option(data.get('patterns', data.get('pattern')))
+        if not patterns:
+            return jsonify({'error': 'يجب إرسال نمط واحد على الأقل للبحث'}), 400
+        try:
+            max_positions = int(data.get('max_positions', 100))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_positions يجب أن يكون رقماً صحيحاً'}), 400
+        
+        result = get_analyzer().search_patterns(
+            filepath,
+            patterns,
+            both_strands=bool(data.get('both_strands', False)),
+            max_positions=max_positions
+        )
+        
+        logger.info(f"Pattern search completed for {len(patterns)} patterns")
+        return jsonify(result)
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in pattern search: {str(e)}")
+        return jsonify({'error': f'حدث خطأ أثناء البحث: {str(e)}'}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    """إحصائيات ذاكرة التخزين المؤقت"""
+    return jsonify(result_cache.stats())
+
+# مقاييس الطلبات
+HTTP_REQUESTS = metrics.REGISTRY.counter(
+    'dna_http_requests_total', 'HTTP requests by endpoint, method and status.', ['endpoint', 'method', 'status'])
+HTTP_LATENCY = metrics.REGISTRY.histogram(
+    'dna_http_request_seconds', 'HTTP request latency by endpoint.', ['endpoint'])
+HTTP_REQUEST_BYTES = metrics.REGISTRY.counter(
+    'dna_http_request_bytes_total', 'Request body bytes received by endpoint.', ['endpoint'])
+IN_FLIGHT = metrics.REGISTRY.gauge('dna_http_requests_in_flight', 'HTTP requests being handled.')
+CACHE_EVENTS = metrics.REGISTRY.gauge(
+    'dna_result_cache_events', 'Result cache lookups since start, by outcome.', ['event'])
+CACHE_ENTRIES = metrics.REGISTRY.gauge('dna_result_cache_entries', 'Results held in the in-memory cache.')
+CACHE_HIT_RATIO = metrics.REGISTRY.gauge('dna_result_cache_hit_ratio', 'Result cache hits per lookup.')
+JOBS_PENDING = metrics.REGISTRY.gauge('dna_jobs_pending', 'Analysis jobs queued or running.')
+
+def wants_profile():
+    """هل طلب العميل ملف cProfile لهذا الطلب؟"""
+    if not app.config['PROFILING_ENABLED']:
+        return False
+    return request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+
+@app.before_request
+def before_request():
+    g.request_started = time.perf_counter()
+    IN_FLIGHT.inc()
+    if wants_profile():
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            g.profiler = profiler
+        except ValueError as e:
+            # another profiler is already active in this process
+            logger.warning(f"Request profiling skipped: {str(e)}")
+
+def save_profile(profiler):
+    """حفظ ملف cProfile للطلب وتسجيل أبطأ الدوال"""
+    os.makedirs(app.config['PROFILE_FOLDER'], exist_ok=True)
+    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{request.endpoint or 'unknown'}_{secrets.token_hex(4)}.prof"
+    profiler.dump_stats(os.path.join(app.config['PROFILE_FOLDER'], filename))
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(15)
+    logger.info(f"Profile for {request.path} saved as {filename}\n{summary.getvalue()}")
+    return filename
+
 # Headers أمان
 @app.after_request
 def after_request(response):
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'DENY'
     response.headers['X-XSS-Protection'] = '1; mode=block'
+    
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        response.headers['X-Profile-File'] = save_profile(profiler)
+    
+    endpoint = request.endpoint or 'unknown'
+    if 'request_started' in g:
+        HTTP_LATENCY.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    HTTP_REQUEST_BYTES.inc(request.content_length or 0, endpoint=endpoint)
     return response
 
-@app.route('/export/<format>', methods=['POST'])
+@app.teardown_request
+def teardown_request(error=None):
+    IN_FLIGHT.dec()
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """المقاييس بصيغة Prometheus"""
+    stats = result_cache.stats()
+    for event in ('hits', 'memory_hits', 'disk_hits', 'misses', 'evictions'):
+        CACHE_EVENTS.set(stats[event], event=event)
+    CACHE_ENTRIES.set(stats['size'])
+    CACHE_HIT_RATIO.set(stats['hit_rate'])
+    JOBS_PENDING.set(job_manager.pending())
+    return Response(metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/export/<format>', methods=['GET', 'POST'])
 def export_results(format):
-    """تصدير النتائج بصيغ مختلفة"""
+    """تصدير النتائج بصيغ مختلفة (csv, tsv, ndjson, parquet, arrow, pdf)
+    
+    The results are a posted result, a posted list (or {'results': [...]}),
+    an NDJSON body with one result per line, or the records of an uploaded
+    file given as filename, analyzed one by one as the export is streamed.
+    A single result keeps the original Property,Value CSV/TSV layout
+    (version 1) unless ?version=2 is given; the others default to version 2.
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-
-        if format == 'csv':
-            # Generate CSV
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write headers
-            writer.writerow(['Property', 'Value'])
-            
-            # Basic sequence info
-            writer.writerow(['Sequence Length', data['sequence_info']['length']])
-            writer.writerow(['GC Content', f"{data['gc_content']}%"])
-            
-            # Composition
-            for base, percentage in data['composition'].items():
-                writer.writerow([f'{base} Content', f"{percentage}%"])
-            
-            # Statistics
-            for stat, value in data['statistics'].items():
-                if stat != 'summary':
-                    writer.writerow([stat.replace('_', ' ').title(), value])
-            
-            return Response(
-                output.getvalue(),
-                mimetype='text/csv',
-                headers={'Content-Disposition': 'attachment; filename=sequence_analysis.csv'}
-            )
-            
-        elif format == 'pdf':
-            # Create PDF
-            buffer = io.BytesIO()
-            pdf = canvas.Canvas(buffer)
-            
-            # Title
-            pdf.setFont("Helvetica-Bold", 16)
-            pdf.drawString(50, 800, "DNA Sequence Analysis Report")
-            
-            # Basic Info
-            pdf.setFont("Helvetica", 12)
-            y = 750
-            pdf.drawString(50, y, f"Sequence Length: {data['sequence_info']['length']}")
-            y -= 20
-            pdf.drawString(50, y, f"GC Content: {data['gc_content']}%")
-            
-            # Composition
-            y -= 40
-            pdf.setFont("Helvetica-Bold", 14)
-            pdf.drawString(50, y, "Nucleotide Composition")
-            pdf.setFont("Helvetica", 12)
-            for base, percentage in data['composition'].items():
-                y -= 20
-                pdf.drawString(70, y, f"{base}: {percentage}%")
-            
-            # Statistics
-            y -= 40
-            pdf.setFont("Helvetica-Bold", 14)
-            pdf.drawString(50, y, "Statistics")
-            pdf.setFont("Helvetica", 12)
-            for stat, value in data['statistics'].items():
-                if stat != 'summary':
-                    y -= 20
-                    pdf.drawString(70, y, f"{stat.replace('_', ' ').title()}: {value}")
-            
-            pdf.save()
-            buffer.seek(0)
-            
-            return Response(
-                buffer.getvalue(),
-                mimetype='application/pdf',
-                headers={'Content-Disposition': 'attachment; filename=sequence_analysis.pdf'}
-            )
-            
-        else:
+        if format not in exporter.FORMATS:
             return jsonify({'error': 'Unsupported format'}), 400
+        version = request.args.get('version', type=int)
+        if version is not None and version not in exporter.EXPORT_VERSIONS:
+            return jsonify({'error': 'إصدار التصدير غير مدعوم'}), 400
+        if format in exporter.ARROW_FORMATS and not exporter.arrow_available():
+            return jsonify({'error': f'تصدير {format} يتطلب تثبيت مكتبة pyarrow'}), 400
+        
+        data = request.get_json(silent=True) if request.is_json else None
+        filename = request.args.get('filename') or (data.get('filename') if isinstance(data, dict) else None)
+        if filename:
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+            if not os.path.isfile(filepath):
+                return jsonify({'error': 'الملف غير موجود'}), 404
+            results = get_analyzer().iter_analyze_file(filepath)
+        elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            results = iter_ndjson(request.stream)
+        elif isinstance(data, list):
+            results = iter(data)
+        elif isinstance(data, dict) and isinstance(data.get('results'), list):
+            results = iter(data['results'])
+        elif isinstance(data, dict) and data:
+            results = iter([data])
+            if version is None:
+                version = exporter.SINGLE_RESULT_VERSION
+        else:
+            return jsonify({'error': 'No data provided'}), 400
+        if version is None:
+            version = exporter.EXPORT_VERSION
+        
+        mimetype, extension = exporter.FORMATS[format]
+        return Response(
+            stream_with_context(exporter.export(results, format, version)),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename=sequence_analysis.{extension}',
+                'X-Export-Version': str(version)
+            }
+        )
             
     except Exception as e:
         logger.error(f"Error in export: {str(e)}")
@@ -0,0 +1,329 @@
+"""Benchmarks for the analyzer hot paths.
+
+Run from the Backend directory:
+
+    python benchmark.py                                  # default sizes
+    python benchmark.py --sizes 1k,1M,10M --gc 0.6 --stops-per-kb 0.5
+    python benchmark.py --json results.json
+    python benchmark.py --compare baseline.json --threshold 0.2
+    python benchmark.py --legacy-orfs --max-bases 500000
+
+Each benchmark reports the best of ``--repeat`` runs as bases per second
+and, from a separate run under tracemalloc, the peak traced memory.
+``--compare`` exits with status 1 when any case is slower (or, with
+``--memory-threshold``, larger) than the baseline by more than the
+threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import orf_finder
+from analyzer import DNAAnalyzer
+from encoded_sequence import BASES, EncodedSequence
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data')
+CHIMPANZEE_FILE = os.path.join(DATA_DIR, 'chimpanzee.txt', 'chimpanzee.txt')
+
+
+def legacy_find_orfs(sequence):
+    """The original quadratic forward-frame scan, kept as the comparison baseline."""
+    orfs = []
+    start_codon = 'ATG'
+    stop_codons = ['TAA', 'TAG', 'TGA']
+
+    for frame in range(3):
+        for i in range(frame, len(sequence) - 2, 3):
+            codon = sequence[i:i+3]
+            if len(codon) == 3 and codon == start_codon:
+                for j in range(i + 3, len(sequence) - 2, 3):
+                    next_codon = sequence[j:j+3]
+                    if len(next_codon) == 3 and next_codon in stop_codons:
+                        orf_length = j - i + 3
+                        if orf_length >= 90:
+                            orfs.append({
+                                'start': i,
+                                'end': j + 3,
+                                'length': orf_length,
+                                'frame': frame + 1,
+                                'sequence': sequence[i:j+3][:60] + '...'
+                            })
+                        break
+
+    return sorted(orfs, key=lambda x: x['length'], reverse=True)[:5]
+
+
+def load_chimpanzee_sequence(max_bases=None):
+    """Concatenate the sequences of the bundled chimpanzee TSV into one string."""
+    parts = []
+    total = 0
+    with open(CHIMPANZEE_FILE, 'r') as f:
+        next(f)
+        for line in f:
+            sequence = line.split('\t', 1)[0].strip().upper()
+            parts.append(sequence)
+            total += len(sequence)
+            if max_bases and total >= max_bases:
+                break
+    sequence = ''.join(parts)
+    return sequence[:max_bases] if max_bases else sequence
+
+
+def stop_poor_sequence(length, seed=0, block=3000):
+    """Random sequence with an ATG every 30 bases and one in-frame stop per block."""
+    rng = random.Random(seed)
+    blocks = []
+    for _ in range(0, length, block):
+        # no T in the filler, so the only stops are the ones we place
+        filler = [rng.choice('ACG') for _ in range(block - 3)]
+        for i in range(0, len(filler) - 3, 30):
+            filler[i:i + 3] = 'ATG'
+        blocks.append(''.join(filler) + 'TAA')
+    return ''.join(blocks)[:length]
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def compare_orfs(name, sequence):
+    legacy, legacy_time = timed(legacy_find_orfs, sequence)
+    forward, forward_time = timed(orf_finder.find_orfs, sequence, nested=True, both_strands=False)
+    six_frame, six_frame_time = timed(orf_finder.find_orfs, sequence)
+
+    if [o['length'] for o in legacy] != [o['length'] for o in forward]:
+        raise AssertionError(f"{name}: forward-frame results differ from the legacy scan")
+
+    mbases = len(sequence) / 1e6
+    print(f"\n{name} ({len(sequence):,} bases)")
+    print(f"  legacy find_orfs (3 frames):   {legacy_time:8.3f}s  {mbases / legacy_time:8.2f} Mb/s")
+    print(f"  orf_finder (3 frames, nested): {forward_time:8.3f}s  {mbases / forward_time:8.2f} Mb/s")
+    print(f"  orf_finder (6 frames):         {six_frame_time:8.3f}s  {mbases / six_frame_time:8.2f} Mb/s")
+    print(f"  speedup: {legacy_time / forward_time:.1f}x")
+
+
+SIZE_SUFFIXES = {'k': 10 ** 3, 'm': 10 ** 6, 'g': 10 ** 9}
+DEFAULT_SIZES = '1k,100k,1M'
+
+
+def parse_size(text):
+    """'1k' / '10M' / '2500' -> number of bases."""
+    text = text.strip().lower()
+    if text and text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def synthetic_sequence(length, gc=0.5, stops_per_kb=None, seed=0):
+    """Random sequence with the given GC fraction.
+
+    With ``stops_per_kb`` the natural stop codons are removed (the T of every
+    TAA/TAG/TGA becomes C, which cannot create a new stop) and stops are
+    placed at random at that density instead.
+    """
+    rng = np.random.default_rng(seed)
+    probabilities = [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2]
+    codes = rng.choice(4, size=length, p=probabilities).astype(np.uint8)
+    if stops_per_kb is not None and length >= 3:
+        stops = np.isin(orf_finder.codon_ids(codes), [orf_finder.codon_id(c) for c in orf_finder.STOP_CODONS])
+        codes[np.flatnonzero(stops)] = BASES.index('C')
+        count = int(length / 1000 * stops_per_kb)
+        positions = rng.integers(0, length - 2, size=count)
+        stop_codes = np.array([[BASES.index(b) for b in c] for c in orf_finder.STOP_CODONS], dtype=np.uint8)
+        chosen = stop_codes[rng.integers(0, len(stop_codes), size=count)]
+        for offset in range(3):
+            codes[positions + offset] = chosen[:, offset]
+    return str(EncodedSequence(codes))
+
+
+def write_fasta(path, sequence, records=1, width=80):
+    """Write ``sequence`` split into ``records`` FASTA records."""
+    size = -(-len(sequence) // records) if records else len(sequence)
+    with open(path, 'w') as f:
+        for index in range(records):
+            chunk = sequence[index * size:(index + 1) * size]
+            f.write(f'>seq{index + 1}\n')
+            for start in range(0, len(chunk), width):
+                f.write(chunk[start:start + width] + '\n')
+
+
+def measure(func, bases, repeat=3):
+    """Best wall time over ``repeat`` runs, plus peak traced memory of one more run."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'bases': bases,
+        'seconds': round(best, 6),
+        'bases_per_second': round(bases / best, 1) if best > 0 else None,
+        'peak_memory_bytes': peak
+    }
+
+
+def sequence_benchmarks(analyzer, sequence):
+    """(name, callable) for each per-sequence hot path."""
+    encoded = EncodedSequence.from_string(sequence)
+    return [
+        ('clean_sequence', lambda: analyzer.clean_sequence(sequence)),
+        ('find_orfs', lambda: analyzer.find_orfs(encoded)),
+        ('find_motifs', lambda: analyzer.find_motifs(encoded)),
+        ('kmer_spectrum', lambda: analyzer.get_kmer_spectrum(encoded)),
+        ('gc_profile', lambda: analyzer.get_gc_profile(encoded)),
+        ('find_repeats', lambda: analyzer.find_repeats(encoded)),
+        ('codon_usage', lambda: analyzer.get_codon_usage(encoded)),
+        # a fresh object each run, so the cached reverse complement is rebuilt
+        ('restriction_map', lambda: analyzer.get_restriction_map(EncodedSequence(encoded.codes))),
+        ('analyze_sequence', lambda: analyzer.analyze_sequence(sequence)),
+    ]
+
+
+def run_suite(sizes, gc=0.5, stops_per_kb=None, repeat=3, max_bases=None, include_data=True,
+              records=10, log=print):
+    """Run every benchmark on each synthetic size and on the Data/ cases."""
+    analyzer = DNAAnalyzer()
+    results = []
+
+    def record(case, name, func, bases):
+        entry = {'case': case, 'name': name}
+        entry.update(measure(func, bases, repeat))
+        results.append(entry)
+        log(f"  {name:<20} {entry['seconds']:9.4f}s  {entry['bases_per_second'] / 1e6:9.2f} Mb/s"
+            f"  {entry['peak_memory_bytes'] / 2 ** 20:9.1f} MiB peak")
+
+    cases = []
+    for size in sizes:
+        label = f"synthetic-{size}-gc{gc}" + (f"-stops{stops_per_kb}" if stops_per_kb is not None else '')
+        cases.append((label, lambda size=size: synthetic_sequence(size, gc, stops_per_kb), None))
+    if include_data and os.path.exists(CHIMPANZEE_FILE):
+        cases.append(('chimpanzee.txt', lambda: load_chimpanzee_sequence(max_bases), CHIMPANZEE_FILE))
+
+    for label, make_sequence, data_file in cases:
+        sequence = make_sequence()
+        log(f"\n{label} ({len(sequence):,} bases)")
+        for name, func in sequence_benchmarks(analyzer, sequence):
+            record(label, name, func, len(sequence))
+
+        if data_file is not None:
+            # the whole file is read, whatever --max-bases says
+            file_bases = sum(len(r['sequence']) for r in analyzer.iter_records(data_file))
+            record(label, 'analyze_from_file', lambda: analyzer.analyze_from_file(data_file), file_bases)
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'benchmark.fasta')
+            write_fasta(path, sequence, records)
+            record(label, 'analyze_from_file', lambda: analyzer.analyze_from_file(path), len(sequence))
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def compare(results, baseline, threshold=0.2, memory_threshold=None):
+    """Cases that got slower (or larger) than the baseline by more than the thresholds."""
+    previous = {(r['case'], r['name']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result['case'], result['name']))
+        if old is None or not old.get('bases_per_second') or not result.get('bases_per_second'):
+            continue
+        change = result['bases_per_second'] / old['bases_per_second'] - 1
+        if change < -threshold:
+            regressions.append({'case': result['case'], 'name': result['name'], 'metric': 'bases_per_second',
+                                'baseline': old['bases_per_second'], 'current': result['bases_per_second'],
+                                'change': round(change, 4)})
+        if memory_threshold is not None and old.get('peak_memory_bytes'):
+            growth = result['peak_memory_bytes'] / old['peak_memory_bytes'] - 1
+            if growth > memory_threshold:
+                regressions.append({'case': result['case'], 'name': result['name'], 'metric': 'peak_memory_bytes',
+                                    'baseline': old['peak_memory_bytes'], 'current': result['peak_memory_bytes'],
+                                    'change': round(growth, 4)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'comma-separated synthetic sizes, e.g. 1k,1M,100M (default {DEFAULT_SIZES})')
+    parser.add_argument('--gc', type=float, default=0.5, help='GC fraction of the synthetic sequences')
+    parser.add_argument('--stops-per-kb', type=float, default=None,
+                        help='stop codons per kb in the synthetic sequences (default: natural rate)')
+    parser.add_argument('--records', type=int, default=10,
+                        help='FASTA records the synthetic file is split into for analyze_from_file')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark (best is kept)')
+    parser.add_argument('--max-bases', type=int, default=None,
+                        help='truncate the chimpanzee data to this many bases')
+    parser.add_argument('--no-data', action='store_true', help='skip the Data/ cases')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --json run')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed throughput drop against the baseline (default 0.2 = 20%%)')
+    parser.add_argument('--memory-threshold', type=float, default=None,
+                        help='allowed peak memory growth against the baseline (default: not checked)')
+    parser.add_argument('--legacy-orfs', action='store_true',
+                        help='only compare orf_finder with the original quadratic scan')
+    parser.add_argument('--stop-poor-bases', type=int, default=20000,
+                        help='length of the synthetic stop-poor sequence (--legacy-orfs)')
+    args = parser.parse_args(argv)
+
+    if args.legacy_orfs:
+        if os.path.exists(CHIMPANZEE_FILE):
+            compare_orfs('chimpanzee.txt', load_chimpanzee_sequence(args.max_bases))
+        else:
+            print(f"Skipping chimpanzee data: {CHIMPANZEE_FILE} not found", file=sys.stderr)
+        compare_orfs('stop-poor synthetic', stop_poor_sequence(args.stop_poor_bases))
+        return 0
+
+    if not 0 <= args.gc <= 1:
+        parser.error('--gc must be between 0 and 1')
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    results = run_suite(sizes, args.gc, args.stops_per_kb, args.repeat, args.max_bases,
+                        not args.no_data, args.records)
+    report = {'environment': environment(), 'results': results}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for r in regressions:
+                print(f"  {r['case']} / {r['name']}: {r['metric']} {r['baseline']} -> {r['current']}"
+                      f" ({r['change']:+.1%})")
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""Codon usage, RSCU and codon adaptation index over ORFs.
+
+Records are concatenated into batches (one invalid base between records,
+so no codon spans two of them) and every batch is scanned for ORFs on both
+strands at once.  Within a frame the outermost ORFs never overlap, so each
+codon is labelled with its ORF by a cumulative sum over start/end markers
+and one ``bincount`` gives the codon counts of every ORF in the batch.
+Totals, RSCU, CAI and protein properties are all derived from those
+64-column count rows; no ORF is translated codon by codon.
+
+Unlike ``orf_finder``, an ORF here also ends at a codon holding an
+invalid base, and is only counted when a real stop codon closes it.
+"""
+import heapq
+from functools import lru_cache
+
+import numpy as np
+from Bio.Data.CodonTable import unambiguous_dna_by_id
+from Bio.Data.IUPACData import protein_weights
+from Bio.SeqUtils.IsoelectricPoint import negative_pKs, pKcterminal, pKnterminal, positive_pKs
+from Bio.SeqUtils.ProtParamData import kd
+
+from encoded_sequence import INVALID, as_encoded, reverse_complement_codes
+from orf_finder import DEFAULT_START_CODONS, codon_id, codon_ids
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+STOP = len(AMINO_ACIDS)
+CODONS = [a + b + c for a in 'ACGT' for b in 'ACGT' for c in 'ACGT']
+
+# records are batched until a batch holds this many bases
+BATCH_BASES = 1 << 22
+
+_WATER = 18.0153
+_AA_WEIGHTS = np.array([protein_weights[aa] for aa in AMINO_ACIDS])
+_AA_HYDROPATHY = np.array([kd[aa] for aa in AMINO_ACIDS])
+_AROMATIC = np.array([aa in 'FWY' for aa in AMINO_ACIDS])
+_POSITIVE = [(AMINO_ACIDS.index(aa), pk) for aa, pk in positive_pKs.items() if aa != 'Nterm']
+_NEGATIVE = [(AMINO_ACIDS.index(aa), pk) for aa, pk in negative_pKs.items() if aa != 'Cterm']
+# terminal pKs depend on the residue at each end
+_N_TERMINAL_PK = np.array([pKnterminal.get(aa, positive_pKs['Nterm']) for aa in AMINO_ACIDS])
+_C_TERMINAL_PK = np.array([pKcterminal.get(aa, negative_pKs['Cterm']) for aa in AMINO_ACIDS])
+
+
+@lru_cache(maxsize=None)
+def genetic_code(table=1):
+    """Amino acid index (``STOP`` for stop codons) of each codon id, and the stop codon ids."""
+    if table not in unambiguous_dna_by_id:
+        raise ValueError(f"Unknown genetic code table: {table}")
+    code = unambiguous_dna_by_id[table]
+    amino_acids = np.full(64, STOP, dtype=np.int64)
+    for codon, aa in code.forward_table.items():
+        amino_acids[codon_id(codon)] = AMINO_ACIDS.index(aa)
+    return amino_acids, tuple(codon_id(c) for c in code.stop_codons)
+
+
+def _orf_counts(codes, start_ids, stop_ids, min_length):
+    """Yield ``(strand, starts, ends, counts, terminals)`` per strand/frame for the ORFs of a batch.
+
+    ``starts``/``ends`` are strand coordinates (end includes the stop codon),
+    ``counts`` holds one row of 64 codon counts per ORF and ``terminals``
+    the ids of each ORF's first and last sense codon.
+    """
+    for strand, strand_codes in (('+', codes), ('-', reverse_complement_codes(codes))):
+        ids = codon_ids(strand_codes)
+        for frame in range(3):
+            frame_ids = ids[frame::3]
+            starts = np.flatnonzero(np.isin(frame_ids, start_ids))
+            breaks = np.flatnonzero(np.isin(frame_ids, stop_ids) | (frame_ids < 0))
+            if len(starts) == 0 or len(breaks) == 0:
+                continue
+            next_break = np.searchsorted(breaks, starts)
+            closed = next_break < len(breaks)
+            ends, first = np.unique(breaks[next_break[closed]], return_index=True)
+            starts = starts[closed][first]
+            keep = (frame_ids[ends] >= 0) & ((ends - starts + 1) * 3 >= min_length)
+            starts, ends = starts[keep], ends[keep]
+            if len(starts) == 0:
+                continue
+
+            labels = np.arange(1, len(starts) + 1)
+            markers = np.zeros(len(frame_ids) + 1, dtype=np.int64)
+            markers[starts] += labels
+            markers[ends + 1] -= labels
+            label = np.cumsum(markers[:-1])
+            inside = label > 0
+            counts = np.bincount((label[inside] - 1) * 64 + frame_ids[inside],
+                                 minlength=len(starts) * 64).reshape(len(starts), 64)
+            terminals = np.column_stack((frame_ids[starts], frame_ids[ends - 1]))
+            yield strand, frame + 3 * starts, frame + 3 * ends + 3, counts, terminals
+
+
+def protein_properties(counts, terminals=None, table=1):
+    """Length, molecular weight, pI, GRAVY and aromaticity for rows of codon counts.
+
+    ``terminals`` (first and last codon id per row) refines the terminal pKs
+    used for the isoelectric point.
+    """
+    amino_acids, _ = genetic_code(table)
+    sense = amino_acids < STOP
+    one_hot = np.zeros((64, len(AMINO_ACIDS)))
+    one_hot[np.flatnonzero(sense), amino_acids[sense]] = 1
+    aa_counts = counts @ one_hot
+    length = aa_counts.sum(axis=1)
+    safe = np.maximum(length, 1)
+
+    n_pk = np.full(len(counts), positive_pKs['Nterm'])
+    c_pk = np.full(len(counts), negative_pKs['Cterm'])
+    if terminals is not None:
+        first, last = amino_acids[terminals[:, 0]], amino_acids[terminals[:, 1]]
+        n_pk = np.where(first < STOP, _N_TERMINAL_PK[np.minimum(first, STOP - 1)], n_pk)
+        c_pk = np.where(last < STOP, _C_TERMINAL_PK[np.minimum(last, STOP - 1)], c_pk)
+
+    # isoelectric point by bisection of the net charge, for all rows at once
+    low, high = np.zeros(len(counts)), np.full(len(counts), 14.0)
+    for _ in range(40):
+        ph = (low + high) / 2
+        charge = 1 / (10 ** (ph - n_pk) + 1) - 1 / (10 ** (c_pk - ph) + 1)
+        for index, pk in _POSITIVE:
+            charge += aa_counts[:, index] / (10 ** (ph - pk) + 1)
+        for index, pk in _NEGATIVE:
+            charge -= aa_counts[:, index] / (10 ** (pk - ph) + 1)
+        low = np.where(charge > 0, ph, low)
+        high = np.where(charge > 0, high, ph)
+
+    return {
+        'length': length.astype(np.int64),
+        'molecular_weight': np.where(length > 0, aa_counts @ _AA_WEIGHTS - (length - 1) * _WATER, 0.0),
+        'isoelectric_point': (low + high) / 2,
+        'gravy': aa_counts @ _AA_HYDROPATHY / safe,
+        'aromaticity': aa_counts[:, _AROMATIC].sum(axis=1) / safe
+    }
+
+
+def rscu(counts, table=1):
+    """Relative synonymous codon usage; 0 for codons of unused amino acids."""
+    amino_acids, _ = genetic_code(table)
+    family_total = np.bincount(amino_acids, weights=counts, minlength=STOP + 1)
+    family_size = np.bincount(amino_acids, minlength=STOP + 1)
+    expected = family_total[amino_acids] / family_size[amino_acids]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(expected > 0, counts / expected, 0.0)
+
+
+def relative_adaptiveness(reference, table=1):
+    """Weight of each codon against its most used synonym in ``reference``.
+
+    Codons unused in the reference get half a count, as in Sharp & Li.
+    Returns ``(weights, informative)``: stop codons, single-codon amino
+    acids and amino acids absent from the reference are not informative.
+    """
+    amino_acids, _ = genetic_code(table)
+    reference = np.asarray(reference, dtype=np.float64)
+    family_total = np.bincount(amino_acids, weights=reference, minlength=STOP + 1)
+    family_size = np.bincount(amino_acids, minlength=STOP + 1)
+    informative = (amino_acids < STOP) & (family_size[amino_acids] > 1) & (family_total[amino_acids] > 0)
+    adjusted = np.where(reference > 0, reference, 0.5)
+    family_max = np.zeros(STOP + 1)
+    np.maximum.at(family_max, amino_acids, np.where(informative, adjusted, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(informative, adjusted / family_max[amino_acids], 0.0)
+    return weights, informative
+
+
+def cai(counts, reference, table=1):
+    """Codon adaptation index of each row of codon counts against a reference usage."""
+    weights, informative = relative_adaptiveness(reference, table)
+    log_weights = np.where(informative, np.log(np.where(informative, weights, 1.0)), 0.0)
+    used = counts[:, informative].sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(used > 0, np.exp(counts @ log_weights / np.maximum(used, 1)), 0.0)
+
+
+def reference_from_dict(table_values):
+    """64-entry reference usage from a ``{codon: count or weight}`` dict."""
+    reference = np.zeros(64)
+    for codon, value in table_values.items():
+        value = float(value)
+        if value < 0:
+            raise ValueError(f"Negative reference value for codon {codon!r}")
+        reference[codon_id(codon.upper().replace('U', 'T'))] = value
+    return reference
+
+
+class CodonUsage:
+    """Accumulate codon counts over the ORFs of many records, in batches."""
+
+    def __init__(self, table=1, start_codons=DEFAULT_START_CODONS, min_length=90, top_n=5):
+        if top_n is not None and top_n < 0:
+            raise ValueError("top_n must not be negative")
+        self.table = table
+        self.min_length = min_length
+        self.top_n = top_n
+        self._start_ids = [codon_id(c) for c in start_codons]
+        self._stop_ids = list(genetic_code(table)[1])
+        self.totals = np.zeros(64, dtype=np.int64)
+        self.orf_count = 0
+        self.record_count = 0
+        self._names = []
+        self._top = []
+        self._counter = 0
+
+    def add_batch(self, records):
+        """Scan a list of ``(name, sequence)`` records as one concatenated batch."""
+        parts, starts, lengths = [], [], []
+        position = 0
+        for name, sequence in records:
+            codes = as_encoded(sequence).codes
+            self._names.append(name)
+            starts.append(position)
+            lengths.append(len(codes))
+            parts.extend((codes, np.array([INVALID], dtype=np.uint8)))
+            position += len(codes) + 1
+        if not parts:
+            return
+        codes = np.concatenate(parts)
+        first_record = self.record_count
+        self.record_count += len(starts)
+        starts = np.array(starts)
+
+        for strand, orf_starts, orf_ends, counts, terminals in _orf_counts(codes, self._start_ids, self._stop_ids,
+                                                                self.min_length):
+            self.totals += counts.sum(axis=0)
+            self.orf_count += len(counts)
+            if strand == '-':
+                orf_starts, orf_ends = len(codes) - orf_ends, len(codes) - orf_starts
+            records = np.searchsorted(starts, orf_starts, side='right') - 1
+            for i, record, start, end in zip(range(len(counts)), records.tolist(),
+                                             orf_starts.tolist(), orf_ends.tolist()):
+                item = (end - start, -self._counter, first_record + record, strand,
+                        start - int(starts[record]), end - int(starts[record]),
+                        lengths[record], counts[i], terminals[i])
+                self._counter += 1
+                if self.top_n is None or len(self._top) < self.top_n:
+                    heapq.heappush(self._top, item)
+                elif self.top_n > 0 and item[:2] > self._top[0][:2]:
+                    heapq.heapreplace(self._top, item)
+
+    def add(self, records, batch_bases=BATCH_BASES):
+        """Feed any iterable of ``(name, sequence)`` records, batching by size."""
+        batch, size = [], 0
+        for name, sequence in records:
+            batch.append((name, sequence))
+            size += len(sequence)
+            if size >= batch_bases:
+                self.add_batch(batch)
+                batch, size = [], 0
+        self.add_batch(batch)
+
+    def result(self, reference=None):
+        """Codon table, RSCU and CAI; the totals themselves are the reference by default."""
+        amino_acids, _ = genetic_code(self.table)
+        reference_name = 'custom'
+        if reference is None:
+            reference, reference_name = self.totals, 'self'
+        elif isinstance(reference, dict):
+            reference = reference_from_dict(reference)
+
+        total = int(self.totals.sum())
+        codon_rscu = rscu(self.totals, self.table)
+        codons = {
+            CODONS[i]: {
+                'amino_acid': AMINO_ACIDS[amino_acids[i]] if amino_acids[i] < STOP else '*',
+                'count': int(self.totals[i]),
+                'per_thousand': round(float(self.totals[i]) / total * 1000, 2) if total else 0,
+                'rscu': round(float(codon_rscu[i]), 3)
+            }
+            for i in range(64)
+        }
+
+        top = sorted(self._top, key=lambda item: item[:2], reverse=True)
+        orfs = []
+        if top:
+            rows = np.array([item[-2] for item in top])
+            properties = protein_properties(rows, np.array([item[-1] for item in top]), self.table)
+            orf_cai = cai(rows, reference, self.table)
+            for i, (length, _, record, strand, start, end, record_length, _, _) in enumerate(top):
+                frame = start % 3 + 1 if strand == '+' else -((record_length - end) % 3 + 1)
+                orfs.append({
+                    'record': record,
+                    'name': self._names[record],
+                    'start': start,
+                    'end': end,
+                    'length': length,
+                    'frame': frame,
+                    'strand': strand,
+                    'cai': round(float(orf_cai[i]), 4),
+                    'protein': {
+                        'length': int(properties['length'][i]),
+                        'molecular_weight': round(float(properties['molecular_weight'][i]), 2),
+                        'isoelectric_point': round(float(properties['isoelectric_point'][i]), 2),
+                        'gravy': round(float(properties['gravy'][i]), 3),
+                        'aromaticity': round(float(properties['aromaticity'][i]), 4)
+                    }
+                })
+
+        overall_cai = cai(self.totals[None, :], reference, self.table)[0] if total else 0.0
+        return {
+            'records': self.record_count,
+            'orfs_analyzed': self.orf_count,
+            'codons_counted': total,
+            'genetic_code': self.table,
+            'cai_reference': reference_name,
+            'overall_cai': round(float(overall_cai), 4),
+            'codons': codons,
+            'orfs': orfs
+        }
+
+
+def codon_usage(records, reference=None, table=1, start_codons=DEFAULT_START_CODONS,
+                min_length=90, top_n=5, batch_bases=BATCH_BASES):
+    """Codon statistics over the ORFs of an iterable of ``(name, sequence)`` records."""
+    usage = CodonUsage(table, start_codons, min_length, top_n)
+    usage.add(records, batch_bases)
+    return usage.result(reference)
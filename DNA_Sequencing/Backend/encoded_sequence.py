@@ -0,0 +1,121 @@
+"""NumPy representation of a DNA sequence shared by the analyses.
+
+Bases are stored as one uint8 code each (A=0, C=1, G=2, T=3, anything
+else=4), so the complement of a valid base is ``3 - code``.  That is the
+same one byte per base as an ASCII ``str``: the gain is in passes, not in
+memory.  Base counts are built lazily with one ``bincount`` and every
+composition statistic is derived from them, instead of re-scanning the
+string once per base.  The reverse complement is one lookup in
+``COMPLEMENT_CODES`` and is kept once built.
+"""
+import weakref
+
+import numpy as np
+
+BASES = 'ACGT'
+INVALID = 4
+
+# byte -> base code
+BASE_CODES = np.full(256, INVALID, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+# base code -> byte
+_DECODE = np.frombuffer(b'ACGTN', dtype=np.uint8)
+
+# base code -> code of its complement; invalid stays invalid
+COMPLEMENT_CODES = np.array([3, 2, 1, 0, INVALID], dtype=np.uint8)
+
+
+def encode(sequence):
+    """Encode a DNA string (or bytes) as a uint8 array of base codes."""
+    if isinstance(sequence, str):
+        sequence = sequence.encode('ascii', 'replace')
+    return BASE_CODES[np.frombuffer(sequence, dtype=np.uint8)]
+
+
+def reverse_complement_codes(codes):
+    """Reverse complement an encoded sequence, keeping invalid bases invalid."""
+    return COMPLEMENT_CODES[codes[::-1]]
+
+
+class EncodedSequence:
+    """A DNA sequence held as base codes, with cached counts and reverse complement."""
+
+    __slots__ = ('codes', '_counts', '_reverse_complement', '__weakref__')
+
+    def __init__(self, codes):
+        self.codes = codes
+        self._counts = None
+        self._reverse_complement = None
+
+    @classmethod
+    def from_string(cls, sequence):
+        return cls(encode(sequence))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __str__(self):
+        return _DECODE[self.codes].tobytes().decode('ascii')
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return EncodedSequence(self.codes[key])
+        return BASES[self.codes[key]] if self.codes[key] < INVALID else 'N'
+
+    def __repr__(self):
+        preview = str(self[:20]) + ('...' if len(self) > 20 else '')
+        return f'EncodedSequence({preview!r}, length={len(self)})'
+
+    @property
+    def counts(self):
+        """Counts of A, C, G, T and invalid bases, in that order."""
+        if self._counts is None:
+            self._counts = np.bincount(self.codes, minlength=INVALID + 1)
+        return self._counts
+
+    def count(self, bases):
+        """Number of positions holding any of ``bases`` (e.g. 'GC')."""
+        return int(sum(self.counts[BASES.index(b)] for b in bases))
+
+    def percent(self, bases):
+        """Percentage of positions holding any of ``bases``."""
+        if len(self) == 0:
+            return 0
+        return self.count(bases) / len(self) * 100
+
+    def gc_content(self):
+        return self.percent('GC')
+
+    def composition(self):
+        return {base: self.percent(base) for base in 'ATGC'}
+
+    def cleaned(self):
+        """Drop every non-ACGT position."""
+        if self.counts[INVALID] == 0:
+            return self
+        cleaned = EncodedSequence(self.codes[self.codes < INVALID])
+        cleaned._counts = self.counts.copy()
+        cleaned._counts[INVALID] = 0
+        return cleaned
+
+    def reverse_complement(self):
+        """The reverse strand, built once and shared by later calls."""
+        reverse = self._reverse_complement
+        if isinstance(reverse, weakref.ref):
+            reverse = reverse()
+        if reverse is None:
+            reverse = EncodedSequence(reverse_complement_codes(self.codes))
+            # the reverse strand points back weakly, so the pair is not a reference cycle
+            reverse._reverse_complement = weakref.ref(self)
+            self._reverse_complement = reverse
+        return reverse
+
+
+def as_encoded(sequence):
+    """Return ``sequence`` as an EncodedSequence, encoding strings on the way."""
+    if isinstance(sequence, EncodedSequence):
+        return sequence
+    return EncodedSequence.from_string(sequence)
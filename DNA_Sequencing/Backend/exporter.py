@@ -0,0 +1,416 @@
+"""Streaming export of analysis results.
+
+Each exporter takes an iterable of result dicts, one per record, and
+yields the document in pieces, so the results can come from a generator
+(an NDJSON request body, or records analyzed one at a time from an
+upload) and are never all held in memory:
+
+* CSV/TSV and NDJSON yield one line per record (CSV/TSV version 1, the
+  original layout, yields one Property,Value line per field instead);
+* Parquet and Arrow IPC write record batches of ``BATCH_ROWS`` rows and
+  yield the bytes written so far (needs the optional ``pyarrow``, which
+  like ``reportlab`` is only imported by the first export that uses it);
+* PDF yields each page of a paginated summary table as soon as the
+  page is full, written directly as PDF objects; a single result also
+  gets the statistics section of the original report.
+"""
+import csv
+import importlib.util
+import io
+import json
+import zlib
+
+# rows per Parquet/Arrow record batch
+BATCH_ROWS = 4096
+
+# CSV/TSV layout: version 1 is the original Property,Value rows of a single
+# result, version 2 a header line then one row of COLUMNS per record.  Lists
+# and files default to EXPORT_VERSION, a single posted result keeps the
+# layout it always had (SINGLE_RESULT_VERSION)
+EXPORT_VERSION = 2
+SINGLE_RESULT_VERSION = 1
+EXPORT_VERSIONS = (1, 2)
+
+# (column, path into the result dict, Arrow type name)
+COLUMNS = [
+    ('sequence_id', ('file_info', 'sequence_id'), 'string'),
+    ('description', ('file_info', 'description'), 'string'),
+    ('record_index', ('file_info', 'record_index'), 'int64'),
+    ('length', ('sequence_info', 'length'), 'int64'),
+    ('gc_content', ('gc_content',), 'float64'),
+    ('a_content', ('composition', 'A'), 'float64'),
+    ('c_content', ('composition', 'C'), 'float64'),
+    ('g_content', ('composition', 'G'), 'float64'),
+    ('t_content', ('composition', 'T'), 'float64'),
+    ('at_content', ('statistics', 'at_content'), 'float64'),
+    ('purine_content', ('statistics', 'purine_content'), 'float64'),
+    ('pyrimidine_content', ('statistics', 'pyrimidine_content'), 'float64'),
+    ('molecular_weight', ('statistics', 'molecular_weight'), 'float64'),
+    ('tm_nearest_neighbor', ('statistics', 'melting_temperature', 'nearest_neighbor'), 'float64'),
+    ('orfs', ('translation', 'orfs'), 'int64'),
+    ('tandem_repeats', ('repeats', 'tandem_repeats', 'count'), 'int64'),
+    ('masked_percent', ('repeats', 'masked_percent'), 'float64'),
+    ('overall_cai', ('codon_usage', 'overall_cai'), 'float64'),
+    ('error', ('error',), 'string'),
+]
+COLUMN_NAMES = [name for name, _, _ in COLUMNS]
+
+# formats and their (mimetype, file extension)
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'tsv': ('text/tab-separated-values', 'tsv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+ARROW_FORMATS = ('parquet', 'arrow')
+
+
+def arrow_available():
+    # checked without importing: pyarrow is only loaded by the first Parquet/Arrow export
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def flatten_result(result):
+    """One row of ``COLUMNS`` values for a result; missing fields are None."""
+    row = {}
+    for name, path, _ in COLUMNS:
+        value = result
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, list):
+            value = len(value)
+        elif isinstance(value, str) and name not in ('sequence_id', 'description', 'error'):
+            # e.g. a placeholder in a result cached by an older version
+            value = None
+        row[name] = value
+    if row['sequence_id'] is None and 'id' in result:
+        row['sequence_id'] = result['id']
+    return row
+
+
+def _cell(value):
+    return '' if value is None else value
+
+
+def _property_rows(result):
+    """The version 1 rows of a result: length, GC, composition and statistics."""
+    yield ['Sequence Length', result.get('sequence_info', {}).get('length')]
+    yield ['GC Content', f"{result.get('gc_content')}%"]
+    for base, percentage in result.get('composition', {}).items():
+        yield [f'{base} Content', f"{percentage}%"]
+    for stat, value in result.get('statistics', {}).items():
+        if stat != 'summary':
+            yield [stat.replace('_', ' ').title(), value]
+
+
+def _statistics_lines(statistics):
+    """``Name: value`` lines of a result's statistics, as in the original PDF report."""
+    for stat, value in statistics.items():
+        if stat == 'summary':
+            continue
+        name = stat.replace('_', ' ').title()
+        if isinstance(value, dict):
+            # e.g. the melting temperature by each method
+            for method, method_value in value.items():
+                if method_value is not None:
+                    yield f"{name} ({method.replace('_', ' ')}): {method_value}"
+        else:
+            yield f"{name}: {value}"
+
+
+def iter_delimited(results, delimiter=',', version=EXPORT_VERSION):
+    """CSV (or TSV) text, a header line then the lines of each result."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+
+    def take():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(COLUMN_NAMES if version >= 2 else ['Property', 'Value'])
+    yield take()
+    for result in results:
+        if version >= 2:
+            row = flatten_result(result)
+            writer.writerow([_cell(row[name]) for name in COLUMN_NAMES])
+        else:
+            writer.writerows(_property_rows(result))
+        yield take()
+
+
+def iter_ndjson(results):
+    """One JSON line per full result."""
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + '\n'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose written bytes are collected by ``take``."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _batches(results, size=BATCH_ROWS):
+    rows = []
+    for result in results:
+        rows.append(flatten_result(result))
+        if len(rows) == size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def iter_arrow(results, format='parquet'):
+    """Parquet file or Arrow IPC stream bytes, one record batch at a time."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # optional dependency
+        raise RuntimeError("Parquet and Arrow export require pyarrow")
+    schema = pa.schema([(name, getattr(pa, type_name)()) for name, _, type_name in COLUMNS])
+    sink = _ChunkSink()
+    if format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for rows in _batches(results):
+            batch = pa.RecordBatch.from_pylist(rows, schema=schema)
+            if format == 'parquet':
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            data = sink.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.take()
+    if data:
+        yield data
+
+
+class _PdfWriter:
+    """PDF file written object by object, each page as soon as it is finished.
+
+    reportlab's canvas keeps every page until ``save``, so a long report was
+    held whole in memory.  Here a page's content stream and page object are
+    yielded when the page is done; only the byte offsets of the objects and
+    the page object numbers are kept, for the cross-reference table and the
+    page tree written at the end.  Text uses the standard Helvetica fonts,
+    which PDF readers provide, so nothing is embedded.
+    """
+
+    # fixed objects; pages start at FIRST_PAGE_OBJECT
+    CATALOG, PAGES, FONT, BOLD_FONT, INFO = range(1, 6)
+    FIRST_PAGE_OBJECT = 6
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.position = 0
+        self.offsets = {}
+        self.pages = []
+
+    def _object(self, number, body):
+        self.offsets[number] = self.position
+        data = b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        self.position += len(data)
+        return data
+
+    def _stream(self, number, content):
+        data = zlib.compress(content)
+        return self._object(number, b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream'
+                            % (len(data), data))
+
+    def start(self, title):
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.position = len(header)
+        return b''.join([
+            header,
+            self._object(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES),
+            self._object(self.FONT, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                    b'/Encoding /WinAnsiEncoding >>'),
+            self._object(self.BOLD_FONT, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold '
+                                         b'/Encoding /WinAnsiEncoding >>'),
+            self._object(self.INFO, b'<< /Title %s /Producer (DNA Sequence Analyzer) >>' % _pdf_string(title)),
+        ])
+
+    def page(self, content):
+        """The objects of one page drawn by ``content`` (page content stream operators)."""
+        number = self.FIRST_PAGE_OBJECT + 2 * len(self.pages)
+        self.pages.append(number + 1)
+        return self._stream(number, content) + self._object(number + 1, (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>'
+            % (self.PAGES, self.width, self.height, number, self.FONT, self.BOLD_FONT)))
+
+    def finish(self):
+        """The page tree, cross-reference table and trailer."""
+        kids = b' '.join(b'%d 0 R' % number for number in self.pages)
+        data = self._object(self.PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.pages)))
+        size = max(self.offsets) + 1
+        xref = [b'xref\n0 %d\n0000000000 65535 f \n' % size]
+        xref += [b'%010d 00000 n \n' % self.offsets[number] if number in self.offsets
+                 else b'0000000000 65535 f \n' for number in range(1, size)]
+        trailer = b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            size, self.CATALOG, self.INFO, self.position)
+        return data + b''.join(xref) + trailer
+
+
+def _pdf_string(text):
+    data = str(text).encode('cp1252', 'replace').translate(None, b'\r\n')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class _PdfTable:
+    """Paginated table drawn row by row, one page of operators at a time."""
+
+    MARGIN = 40
+    ROW_HEIGHT = 14
+    # (header, column, x offset, format)
+    FIELDS = [
+        ('#', 'record_index', 0, '{}'),
+        ('Record', 'sequence_id', 30, '{}'),
+        ('Length', 'length', 210, '{:,}'),
+        ('GC %', 'gc_content', 280, '{}'),
+        ('A %', 'a_content', 330, '{}'),
+        ('C %', 'c_content', 375, '{}'),
+        ('G %', 'g_content', 420, '{}'),
+        ('T %', 't_content', 465, '{}'),
+    ]
+
+    def __init__(self, title):
+        from reportlab.lib.pagesizes import A4
+
+        self.title = title
+        self.width, self.height = A4
+        self.page = 0
+        self.y = 0
+        self.ops = []
+        self._new_page()
+
+    def _text(self, x, y, text, size=9, bold=False):
+        self.ops.append(b'BT /%s %d Tf %.2f %.2f Td %s Tj ET'
+                        % (b'F2' if bold else b'F1', size, x, y, _pdf_string(text)))
+
+    def _new_page(self, headers=True):
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        self.page += 1
+        self.ops = []
+        self._text(self.MARGIN, self.height - self.MARGIN - 10, self.title,
+                   16 if self.page == 1 else 12, bold=True)
+        number = f"Page {self.page}"
+        self._text(self.width - self.MARGIN - stringWidth(number, 'Helvetica', 9), self.MARGIN - 20, number)
+        self.y = self.height - self.MARGIN - 40
+        if headers:
+            for header, _, x, _ in self.FIELDS:
+                self._text(self.MARGIN + x, self.y, header, 10, bold=True)
+            self.y -= self.ROW_HEIGHT
+
+    def row(self, row):
+        """Draw a row; returns the operators of the page it filled, if any."""
+        finished = None
+        if self.y < self.MARGIN:
+            finished = self.finish()
+            self._new_page()
+        fields = self.FIELDS if not row['error'] else self.FIELDS[:3]
+        for header, column, x, template in fields:
+            value = row[column]
+            if row['error'] and header == 'Length':
+                text = f"Error: {row['error']}"
+            else:
+                text = '' if value is None else template.format(value)
+            self._text(self.MARGIN + x, self.y, text[:30 if column == 'sequence_id' else 80])
+        self.y -= self.ROW_HEIGHT
+        return finished
+
+    def section(self, title, lines):
+        """Draw a titled list of lines below the table; returns the operators of the pages it filled."""
+        finished = []
+        self.y -= self.ROW_HEIGHT
+        for i, text in enumerate([title] + list(lines)):
+            if self.y < self.MARGIN:
+                finished.append(self.finish())
+                self._new_page(headers=False)
+            if i == 0:
+                self._text(self.MARGIN, self.y, text, 12, bold=True)
+            else:
+                self._text(self.MARGIN + 20, self.y, text[:90])
+            self.y -= self.ROW_HEIGHT
+        return finished
+
+    def finish(self):
+        """Operators of the current page."""
+        return b'\n'.join(self.ops)
+
+
+def iter_pdf(results, title="DNA Sequence Analysis Report"):
+    """A paginated PDF with one table row per result, yielded page by page.
+
+    A report of a single result ends with its statistics section.
+    """
+    table = _PdfTable(title)
+    writer = _PdfWriter(table.width, table.height)
+    yield writer.start(title)
+    count = 0
+    statistics = None
+    for result in results:
+        if count == 0:
+            statistics = result.get('statistics')
+        row = flatten_result(result)
+        if row['record_index'] is None:
+            row['record_index'] = count
+        page = table.row(row)
+        if page is not None:
+            yield writer.page(page)
+        count += 1
+    if count == 1 and isinstance(statistics, dict):
+        for page in table.section('Statistics', _statistics_lines(statistics)):
+            yield writer.page(page)
+    yield writer.page(table.finish())
+    yield writer.finish()
+
+
+def export(results, format, version=EXPORT_VERSION):
+    """Pieces of ``results`` exported as ``format`` (a key of ``FORMATS``).
+
+    ``version`` picks the CSV/TSV layout (see ``EXPORT_VERSIONS``).
+    """
+    if version not in EXPORT_VERSIONS:
+        raise ValueError(f"Unsupported export version: {version}")
+    if format == 'csv':
+        return iter_delimited(results, version=version)
+    if format == 'tsv':
+        return iter_delimited(results, delimiter='\t', version=version)
+    if format == 'ndjson':
+        return iter_ndjson(results)
+    if format in ARROW_FORMATS:
+        return iter_arrow(results, format)
+    if format == 'pdf':
+        return iter_pdf(results)
+    raise ValueError(f"Unsupported export format: {format}")
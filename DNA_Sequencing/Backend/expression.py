@@ -0,0 +1,267 @@
+"""Gene-expression matrices (samples x genes) loaded from CSV into NumPy.
+
+The CSV has one header row of column names and one row per sample.
+Columns named like a class label (``LABEL_COLUMNS``) or holding text are
+kept as labels; every other column is a gene.  The first load parses
+``CHUNK_ROWS`` rows at a time straight into ``<file>.matrix.npy`` (a
+float32 ``open_memmap``) with the column names in ``<file>.matrix.json``,
+so later loads only map the saved array and peak memory never holds a
+parsed copy of the whole CSV.
+
+Statistics are vectorized over blocks of ``GENE_BLOCK`` genes.  The
+gene-gene Pearson correlation is computed a block of rows at a time from
+standardized columns, so the strongest pairs among tens of thousands of
+genes can be found without building the full matrix.
+"""
+import csv
+import heapq
+import itertools
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# column names (lowercase) treated as sample labels rather than genes
+LABEL_COLUMNS = ('class', 'label', 'group', 'condition', 'sample', 'id')
+
+# CSV rows parsed per chunk on the first load
+CHUNK_ROWS = 4096
+# genes per block for statistics and correlation
+GENE_BLOCK = 2048
+# correlation values held per block (rows x genes) while scanning all pairs
+CORRELATION_CELLS = 1 << 23
+# largest gene subset returned as a full correlation matrix
+MAX_MATRIX_GENES = 200
+# most correlated pairs listed at most
+MAX_TOP_PAIRS = 10000
+
+
+def cache_paths(path):
+    return path + '.matrix.npy', path + '.matrix.json'
+
+
+def _is_number(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _parse_csv(path, values_path):
+    """Parse ``path`` into a float32 array at ``values_path`` (or in memory when None)."""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        first = next(reader, None)
+    if not header or first is None:
+        raise ValueError("The CSV file has no data rows")
+    if len(first) != len(header):
+        raise ValueError("The first data row does not match the header")
+
+    label_columns = [i for i, (name, value) in enumerate(zip(header, first))
+                     if name.strip().lower() in LABEL_COLUMNS or not _is_number(value)]
+    gene_columns = [i for i in range(len(header)) if i not in label_columns]
+    if not gene_columns:
+        raise ValueError("The CSV file has no numeric gene columns")
+
+    with open(path, 'r') as f:
+        rows = sum(1 for line in f if line.strip()) - 1
+
+    shape = (rows, len(gene_columns))
+    if values_path is None:
+        values = np.empty(shape, dtype=np.float32)
+    else:
+        values = np.lib.format.open_memmap(values_path, mode='w+', dtype=np.float32, shape=shape)
+    labels = []
+    with open(path, 'r', newline='') as f:
+        next(f)
+        lines = (line for line in f if line.strip())
+        row = 0
+        while True:
+            chunk = list(itertools.islice(lines, CHUNK_ROWS))
+            if not chunk:
+                break
+            try:
+                values[row:row + len(chunk)] = np.loadtxt(
+                    chunk, delimiter=',', usecols=gene_columns, dtype=np.float32, ndmin=2)
+            except ValueError as e:
+                raise ValueError(f"Invalid value near data row {row + 1}: {str(e)}")
+            if label_columns:
+                labels.extend(next(csv.reader([line]))[label_columns[0]] for line in chunk)
+            row += len(chunk)
+    if isinstance(values, np.memmap):
+        values.flush()
+
+    meta = {
+        'genes': [header[i].strip() for i in gene_columns],
+        'label_column': header[label_columns[0]].strip() if label_columns else None,
+        'labels': labels if label_columns else None
+    }
+    return values, meta
+
+
+class ExpressionMatrix:
+    """A samples x genes float32 matrix with gene names and optional sample labels."""
+
+    def __init__(self, values, genes, labels=None, label_column=None):
+        self.values = values
+        self.genes = list(genes)
+        self.labels = labels
+        self.label_column = label_column
+        self._index = {gene: i for i, gene in enumerate(self.genes)}
+
+    @classmethod
+    def load(cls, path, cache=True):
+        """Load a CSV matrix, from its saved binary copy when that is newer than the file."""
+        values_path, meta_path = cache_paths(path)
+        if cache and all(os.path.exists(p) and os.path.getmtime(p) >= os.path.getmtime(path)
+                         for p in (values_path, meta_path)):
+            try:
+                with open(meta_path, 'r') as f:
+                    meta = json.load(f)
+                values = np.load(values_path, mmap_mode='r')
+                return cls(values, meta['genes'], meta['labels'], meta['label_column'])
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f"Ignoring saved matrix for {path}: {str(e)}")
+
+        if cache:
+            try:
+                values, meta = _parse_csv(path, values_path)
+                with open(meta_path, 'w') as f:
+                    json.dump(meta, f)
+                del values
+                return cls(np.load(values_path, mmap_mode='r'), meta['genes'], meta['labels'],
+                           meta['label_column'])
+            except OSError as e:
+                # e.g. a read-only data directory
+                logger.warning(f"Could not save matrix for {path}: {str(e)}")
+        values, meta = _parse_csv(path, None)
+        return cls(values, meta['genes'], meta['labels'], meta['label_column'])
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def columns(self, genes):
+        """Column indices of gene names."""
+        try:
+            return [self._index[gene] for gene in genes]
+        except KeyError as e:
+            raise ValueError(f"Unknown gene: {e.args[0]}")
+
+    def _blocks(self, block=GENE_BLOCK):
+        for start in range(0, self.shape[1], block):
+            yield start, np.asarray(self.values[:, start:start + block], dtype=np.float64)
+
+    def gene_stats(self):
+        """Per-gene arrays: mean, std (ddof=1), variance, min, max, median and fraction of zeros."""
+        genes = self.shape[1]
+        stats = {name: np.empty(genes) for name in
+                 ('mean', 'std', 'variance', 'min', 'max', 'median', 'zero_fraction')}
+        ddof = 1 if self.shape[0] > 1 else 0
+        for start, block in self._blocks():
+            stop = start + block.shape[1]
+            stats['mean'][start:stop] = block.mean(axis=0)
+            stats['variance'][start:stop] = block.var(axis=0, ddof=ddof)
+            stats['min'][start:stop] = block.min(axis=0)
+            stats['max'][start:stop] = block.max(axis=0)
+            stats['median'][start:stop] = np.median(block, axis=0)
+            stats['zero_fraction'][start:stop] = (block == 0).mean(axis=0)
+        stats['std'] = np.sqrt(stats['variance'])
+        return stats
+
+    def top_variance(self, n=10, stats=None):
+        """Indices of the ``n`` genes with the highest variance, highest first."""
+        variance = (stats or self.gene_stats())['variance']
+        n = min(n, len(variance))
+        if n <= 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(variance, -n)[-n:]
+        return top[np.argsort(variance[top])[::-1]]
+
+    def _standardized(self, columns=None):
+        """Columns scaled so that ``z.T @ z`` is their Pearson correlation (0 for constant genes)."""
+        values = self.values if columns is None else self.values[:, columns]
+        z = np.array(values, dtype=np.float32)
+        z -= z.mean(axis=0)
+        norms = np.sqrt(np.einsum('ij,ij->j', z, z, dtype=np.float64)).astype(np.float32)
+        z /= np.where(norms > 0, norms, 1)
+        return z
+
+    def correlation(self, columns):
+        """Full correlation matrix of a gene subset (at most ``MAX_MATRIX_GENES``)."""
+        if len(columns) > MAX_MATRIX_GENES:
+            raise ValueError(f"At most {MAX_MATRIX_GENES} genes can be correlated as a matrix")
+        z = self._standardized(columns)
+        return np.clip(z.T @ z, -1, 1)
+
+    def iter_correlation_blocks(self, block=None, upper=False):
+        """Yield ``(start, rows)``: correlations of genes ``start:start + len(rows)``
+        with every gene, or with ``upper`` only with genes from ``start`` on."""
+        z = self._standardized()
+        genes = z.shape[1]
+        block = block or max(1, min(GENE_BLOCK, CORRELATION_CELLS // max(genes, 1)))
+        for start in range(0, genes, block):
+            others = z[:, start:] if upper else z
+            yield start, np.clip(z[:, start:start + block].T @ others, -1, 1)
+
+    def top_correlations(self, n=20, block=None):
+        """The ``n`` gene pairs with the largest absolute correlation, as ``(r, i, j)``."""
+        if n <= 0:
+            return []
+        best = []
+        for start, rows in self.iter_correlation_blocks(block, upper=True):
+            size, width = rows.shape
+            strength = np.abs(rows)
+            # each pair once: only the genes after each row's gene
+            strength[np.tril_indices(size, m=width)] = -1
+            floor = best[0][0] if len(best) == n else -0.5
+            candidates = np.flatnonzero(strength.ravel() > floor)
+            if len(candidates) > n:
+                candidates = candidates[np.argpartition(strength.ravel()[candidates], -n)[-n:]]
+            for index in candidates.tolist():
+                i, j = divmod(index, width)
+                item = (float(strength[i, j]), float(rows[i, j]), start + i, start + j)
+                if len(best) < n:
+                    heapq.heappush(best, item)
+                else:
+                    heapq.heappushpop(best, item)
+        return [(r, i, j) for _, r, i, j in sorted(best, reverse=True)]
+
+    def class_counts(self):
+        if self.labels is None:
+            return None
+        labels, counts = np.unique(np.array(self.labels), return_counts=True)
+        return dict(zip(labels.tolist(), counts.tolist()))
+
+
+def summarize(matrix, genes=None, top_n=10, top_pairs=20):
+    """Statistics and correlations of the requested genes (or the top-variance
+    ones), with the most correlated pairs over all genes."""
+    stats = matrix.gene_stats()
+    top = matrix.top_variance(top_n, stats).tolist()
+    selected = matrix.columns(genes) if genes else top
+    correlation = matrix.correlation(selected) if selected else np.zeros((0, 0))
+    return {
+        'samples': matrix.shape[0],
+        'genes': matrix.shape[1],
+        'label_column': matrix.label_column,
+        'classes': matrix.class_counts(),
+        'top_variance': [matrix.genes[i] for i in top],
+        'gene_stats': [
+            {'gene': matrix.genes[i], **{name: round(float(values[i]), 6) for name, values in stats.items()}}
+            for i in selected
+        ],
+        'correlation': {
+            'genes': [matrix.genes[i] for i in selected],
+            'matrix': np.round(correlation.astype(np.float64), 4).tolist()
+        },
+        'top_correlated_pairs': [
+            {'gene_a': matrix.genes[i], 'gene_b': matrix.genes[j], 'r': round(r, 4)}
+            for r, i, j in matrix.top_correlations(top_pairs)
+        ]
+    }
@@ -0,0 +1,347 @@
+"""Streaming quality control for FASTQ files.
+
+The file is read in binary blocks of ``CHUNK_BYTES``.  Line breaks are
+located with NumPy, and every complete 4-line record in the block is
+turned into flat arrays: quality bytes, bases, the read each byte
+belongs to and its position in the read.  No per-read Python code runs
+on this path.  Files with wrapped sequence lines are re-read with
+Biopython's parser and fed to the same code as 4-line records.
+
+Each block is added to fixed-size accumulators, so memory does not grow
+with the number of reads:
+
+* a quality histogram per position (positions from ``MAX_POSITION`` on
+  share one row), giving exact per-position means and quantiles;
+* histograms of read length, per-read GC and per-read mean quality;
+* the first position in each read of each adapter's leading
+  ``ADAPTER_K``-mer;
+* a bottom-k sketch of read hashes (the ``DUPLICATION_SKETCH`` smallest
+  hashes with their counts), estimating the number of distinct reads and
+  the duplication levels from a uniform sample of distinct sequences.
+"""
+import io
+from collections import Counter
+
+import numpy as np
+
+from encoded_sequence import BASE_CODES, INVALID, encode
+from minhash import mix64
+
+CHUNK_BYTES = 8 << 20
+# positions at or beyond this share the last histogram row
+MAX_POSITION = 1000
+# quality characters are bytes 33..126
+QUALITY_BYTES = 128
+
+ADAPTER_K = 12
+ADAPTERS = {
+    'Illumina Universal': 'AGATCGGAAGAGC',
+    'Illumina Small RNA 3\'': 'TGGAATTCTCGG',
+    'Nextera Transposase': 'CTGTCTCTTATA',
+    'PolyA': 'AAAAAAAAAAAA',
+}
+
+DUPLICATION_SKETCH = 1 << 14
+DUPLICATION_LEVELS = ((1, 1), (2, 2), (3, 4), (5, 9), (10, 49), (50, 99), (100, None))
+
+# per-position statistics are reported in at most this many position groups
+MAX_POINTS = 100
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+_NEWLINE = ord('\n')
+_CR = ord('\r')
+_GC = np.zeros(256, dtype=bool)
+_GC[[ord('G'), ord('C'), ord('g'), ord('c')]] = True
+
+
+class _NotFourLine(Exception):
+    pass
+
+
+def _ranges(starts, lengths):
+    """Flat indices covering ``starts[i]:starts[i] + lengths[i]`` for each i, with the
+    read index and position of each."""
+    # blocks are well under 2 GiB, so int32 halves the temporaries
+    lengths = lengths.astype(np.int32)
+    reads = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+    positions = np.arange(int(lengths.sum()), dtype=np.int32)
+    positions -= np.repeat(np.cumsum(lengths, dtype=np.int32) - lengths, lengths)
+    return starts[reads] + positions, reads, positions
+
+
+def _read_sums(values, lengths, dtype=np.int64):
+    """Sum of ``values`` over each read of the flat layout (0 for empty reads)."""
+    sums = np.zeros(len(lengths), dtype=dtype)
+    nonempty = lengths > 0
+    if len(values):
+        read_starts = (np.cumsum(lengths) - lengths)[nonempty]
+        sums[nonempty] = np.add.reduceat(values, read_starts, dtype=dtype)
+    return sums
+
+
+class FastqQC:
+    """Accumulates QC statistics over batches of FASTQ records."""
+
+    def __init__(self, adapters=None, sketch_size=DUPLICATION_SKETCH):
+        self.adapters = dict(ADAPTERS if adapters is None else adapters)
+        self.sketch_size = sketch_size
+        self.reads = 0
+        self.bases = 0
+        self.gc_bases = 0
+        self.min_quality_byte = QUALITY_BYTES
+        self.position_quality = np.zeros((MAX_POSITION + 1, QUALITY_BYTES), dtype=np.int64)
+        self.lengths = Counter()
+        self.gc_histogram = np.zeros(101, dtype=np.int64)
+        self.mean_quality_histogram = np.zeros(QUALITY_BYTES, dtype=np.int64)
+        self.max_length = 0
+
+        self._adapter_codes = {}
+        for name, adapter in self.adapters.items():
+            codes = encode(adapter[:ADAPTER_K])
+            if len(codes) < ADAPTER_K or (codes == INVALID).any():
+                raise ValueError(f"Adapter {name!r} must start with {ADAPTER_K} ACGT bases")
+            self._adapter_codes[name] = codes
+        self.adapter_positions = {name: np.zeros(MAX_POSITION + 1, dtype=np.int64) for name in self.adapters}
+
+        self._sketch_keys = np.zeros(0, dtype=np.uint64)
+        self._sketch_counts = np.zeros(0, dtype=np.int64)
+        self._powers = np.ones(1, dtype=np.uint64)
+
+    def _power_table(self, length):
+        if len(self._powers) < length:
+            self._powers = np.cumprod(np.full(length, 0x9E3779B97F4A7C15, dtype=np.uint64), dtype=np.uint64)
+            self._powers = np.concatenate(([np.uint64(1)], self._powers[:-1]))
+        return self._powers
+
+    def add_block(self, buf, starts, ends):
+        """Add the records whose line spans (4 per record) are ``starts``/``ends`` in ``buf``."""
+        if len(starts) == 0:
+            return
+        if not (np.all(buf[starts[0::4]] == ord('@')) and np.all(buf[starts[2::4]] == ord('+'))):
+            raise _NotFourLine()
+        sequence_starts = starts[1::4]
+        lengths = ends[1::4] - sequence_starts
+        if not np.array_equal(lengths, ends[3::4] - starts[3::4]):
+            raise _NotFourLine()
+
+        base_index, reads, positions = _ranges(sequence_starts, lengths)
+        bases = buf[base_index]
+        quality = buf[starts[3::4][reads] + positions]
+        count = len(lengths)
+
+        self.reads += count
+        self.bases += len(bases)
+        if len(quality):
+            self.min_quality_byte = min(self.min_quality_byte, int(quality.min()))
+        self.max_length = max(self.max_length, int(lengths.max()))
+        unique_lengths, length_counts = np.unique(lengths, return_counts=True)
+        self.lengths.update(dict(zip(unique_lengths.tolist(), length_counts.tolist())))
+
+        # quality per position
+        capped = np.minimum(positions, MAX_POSITION)
+        self.position_quality += np.bincount(
+            capped * QUALITY_BYTES + quality, minlength=self.position_quality.size
+        ).reshape(self.position_quality.shape)
+
+        # per-read GC and mean quality (empty reads are left out of both)
+        nonempty = lengths > 0
+        gc = _read_sums(_GC[bases], lengths)
+        self.gc_bases += int(gc.sum())
+        gc_percent = np.rint(gc[nonempty] / lengths[nonempty] * 100).astype(np.int64)
+        self.gc_histogram += np.bincount(gc_percent, minlength=101)
+        read_quality = _read_sums(quality, lengths)[nonempty] / lengths[nonempty]
+        self.mean_quality_histogram += np.bincount(
+            np.rint(read_quality).astype(np.int64), minlength=QUALITY_BYTES)[:QUALITY_BYTES]
+
+        self._add_adapters(bases, reads, positions, lengths)
+        self._add_hashes(bases, positions, lengths)
+
+    def _add_adapters(self, bases, reads, positions, lengths):
+        windows = len(bases) - ADAPTER_K + 1
+        if windows <= 0:
+            return
+        codes = BASE_CODES[bases]
+        for name, adapter in self._adapter_codes.items():
+            # narrow down on the first two bases, then check the rest at the candidates only
+            hits = np.flatnonzero((codes[:windows] == adapter[0]) & (codes[1:windows + 1] == adapter[1]))
+            for offset in range(2, ADAPTER_K):
+                hits = hits[codes[hits + offset] == adapter[offset]]
+            # windows running past the end of their read
+            hits = hits[positions[hits] + ADAPTER_K <= lengths[reads[hits]]]
+            if len(hits):
+                # first hit in each read
+                _, first = np.unique(reads[hits], return_index=True)
+                self.adapter_positions[name] += np.bincount(
+                    np.minimum(positions[hits[first]], MAX_POSITION), minlength=MAX_POSITION + 1)
+
+    def _add_hashes(self, bases, positions, lengths):
+        powers = self._power_table(int(lengths.max()) if len(lengths) else 1)
+        terms = (bases.astype(np.uint64) | np.uint64(32)) * powers[positions]
+        hashes = mix64(_read_sums(terms, lengths, np.uint64) ^ lengths.astype(np.uint64))
+
+        keys, counts = np.unique(hashes, return_counts=True)
+        keys = np.concatenate((self._sketch_keys, keys))
+        counts = np.concatenate((self._sketch_counts, counts))
+        keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        self._sketch_keys = keys[:self.sketch_size]
+        self._sketch_counts = counts[:self.sketch_size]
+
+    def add_bytes(self, data):
+        """Add a block of complete 4-line records; returns the bytes after the last one."""
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == _NEWLINE)
+        complete = len(newlines) // 4 * 4
+        if complete == 0:
+            return data
+        newlines = newlines[:complete]
+        starts = np.concatenate(([0], newlines[:-1] + 1))
+        ends = newlines - (buf[np.maximum(newlines - 1, 0)] == _CR)
+        self.add_block(buf, starts, ends)
+        return data[newlines[-1] + 1:]
+
+    def add_file(self, path, chunk_bytes=CHUNK_BYTES):
+        with open(path, 'rb') as f:
+            rest = b''
+            while True:
+                block = f.read(chunk_bytes)
+                if not block:
+                    break
+                rest = self.add_bytes(rest + block)
+            if rest.strip():
+                rest = self.add_bytes(rest + b'\n')
+            if rest.strip():
+                raise _NotFourLine()
+
+    def add_records(self, records, batch_reads=100000):
+        """Add ``(title, sequence, quality)`` tuples, ``batch_reads`` at a time."""
+        batch = io.BytesIO()
+        pending = 0
+        for title, sequence, quality in records:
+            batch.write(f'@{title}\n{sequence}\n+\n{quality}\n'.encode('ascii', 'replace'))
+            pending += 1
+            if pending == batch_reads:
+                self.add_bytes(batch.getvalue())
+                batch = io.BytesIO()
+                pending = 0
+        if pending:
+            self.add_bytes(batch.getvalue())
+
+    @property
+    def quality_offset(self):
+        """Phred offset: 64 for old Illumina files whose qualities never go below '@'."""
+        return 64 if self.min_quality_byte >= 64 and self.min_quality_byte < QUALITY_BYTES else 33
+
+    def _position_groups(self):
+        positions = min(self.max_length, MAX_POSITION + 1)
+        size = max(1, -(-positions // MAX_POINTS))
+        return [(start, min(start + size, positions)) for start in range(0, positions, size)]
+
+    def _per_position(self):
+        offset = self.quality_offset
+        scores = np.arange(QUALITY_BYTES) - offset
+        rows = []
+        for start, stop in self._position_groups():
+            histogram = self.position_quality[start:stop].sum(axis=0)
+            total = int(histogram.sum())
+            if not total:
+                continue
+            cumulative = np.cumsum(histogram)
+            quantiles = scores[np.searchsorted(cumulative, [q * total for q in QUANTILES])]
+            label = f'{start + 1}' if stop - start == 1 else f'{start + 1}-{stop}'
+            if stop > MAX_POSITION:
+                label = f'{start + 1}+'
+            rows.append({
+                'position': label,
+                'mean': round(float((histogram * scores).sum() / total), 2),
+                'q10': int(quantiles[0]),
+                'q25': int(quantiles[1]),
+                'median': int(quantiles[2]),
+                'q75': int(quantiles[3]),
+                'q90': int(quantiles[4]),
+            })
+        return rows
+
+    def _duplication(self):
+        if not self.reads:
+            return {'distinct_estimate': 0, 'duplicate_percent': 0, 'levels': {}}
+        keys, counts = self._sketch_keys, self._sketch_counts
+        if len(keys) < self.sketch_size:
+            distinct = len(keys)
+        else:
+            # the k-th smallest of n uniform hashes sits near k / n of the range
+            distinct = int(round((self.sketch_size - 1) / (float(keys[-1]) / 2 ** 64)))
+        distinct = min(distinct, self.reads)
+        levels = {}
+        for low, high in DUPLICATION_LEVELS:
+            in_level = (counts >= low) if high is None else (counts >= low) & (counts <= high)
+            label = f'{low}+' if high is None else (str(low) if low == high else f'{low}-{high}')
+            levels[label] = {
+                'sequences_percent': round(float(in_level.sum()) / len(counts) * 100, 2),
+                'reads_percent': round(float(counts[in_level].sum()) / float(counts.sum()) * 100, 2)
+            }
+        return {
+            'distinct_estimate': distinct,
+            'duplicate_percent': round((1 - distinct / self.reads) * 100, 2),
+            'levels': levels
+        }
+
+    def _length_distribution(self, max_bins=50):
+        lengths = sorted(self.lengths.items())
+        if len(lengths) <= max_bins:
+            return [{'length': str(length), 'count': count} for length, count in lengths]
+        low, high = lengths[0][0], lengths[-1][0]
+        size = -(-(high - low + 1) // max_bins)
+        bins = Counter()
+        for length, count in lengths:
+            bins[(length - low) // size] += count
+        return [{'length': f'{low + b * size}-{low + (b + 1) * size - 1}', 'count': bins[b]}
+                for b in sorted(bins)]
+
+    def result(self):
+        offset = self.quality_offset
+        read_quality = self.mean_quality_histogram
+        mean_scores = np.arange(QUALITY_BYTES) - offset
+        lengths = np.array(sorted(self.lengths.items()), dtype=np.int64).reshape(-1, 2)
+        return {
+            'reads': self.reads,
+            'bases': self.bases,
+            'quality_encoding': f'Phred+{offset}',
+            'gc_content': round(self.gc_bases / self.bases * 100, 2) if self.bases else 0,
+            'read_length': {
+                'min': int(lengths[0, 0]) if len(lengths) else 0,
+                'max': int(lengths[-1, 0]) if len(lengths) else 0,
+                'mean': round(self.bases / self.reads, 2) if self.reads else 0,
+                'distribution': self._length_distribution()
+            },
+            'per_position_quality': self._per_position(),
+            'per_read_quality': {
+                str(score): int(count)
+                for score, count in zip(mean_scores.tolist(), read_quality.tolist()) if count
+            },
+            'gc_distribution': self.gc_histogram.tolist(),
+            'adapters': {
+                name: {
+                    'sequence': self.adapters[name],
+                    'reads': int(positions.sum()),
+                    'percent': round(float(positions.sum()) / self.reads * 100, 3) if self.reads else 0,
+                    'first_position': int(np.flatnonzero(positions)[0]) + 1 if positions.any() else None
+                }
+                for name, positions in self.adapter_positions.items()
+            },
+            'duplication': self._duplication()
+        }
+
+
+def fastq_qc(path, adapters=None, chunk_bytes=CHUNK_BYTES):
+    """QC statistics for a FASTQ file, read in chunks of ``chunk_bytes``."""
+    qc = FastqQC(adapters)
+    try:
+        qc.add_file(path, chunk_bytes)
+    except _NotFourLine:
+        # wrapped records: parse them and feed them back as 4-line records
+        from Bio.SeqIO.QualityIO import FastqGeneralIterator
+        qc = FastqQC(adapters)
+        with open(path, 'r') as f:
+            qc.add_records(FastqGeneralIterator(f))
+    return qc.result()
@@ -0,0 +1,264 @@
+"""Suffix array and FM-index for repeated exact searches over an upload.
+
+All records of a file are joined into one text (with a separator between
+records and a sentinel at the end) and indexed once:
+
+* the suffix array is built by prefix doubling: suffixes are first ranked
+  by their leading 16 symbols, then each round sorts by (rank of the first
+  h symbols, rank of the next h) so h doubles until every rank is unique;
+* the BWT is read off the suffix array, with occurrence counts sampled
+  every ``OCC_STEP`` rows.
+
+Counting a pattern is a backward search of O(pattern length) steps, and
+the matching suffix array rows are the match positions.  The index is
+saved next to the upload as ``<file>.fm.npz`` and the most recently used
+indexes are kept loaded.  Construction holds about 25 bytes per base, and
+files are indexed up to ``MAX_TEXT_LENGTH`` bases, which covers any upload.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from encoded_sequence import as_encoded
+from motif_search import expand_iupac, reverse_complement
+
+# text symbols: sentinel, the four bases, any other base, record separator
+SENTINEL = 0
+OTHER = 5
+SEPARATOR = 6
+SIGMA = 7
+
+# rows between occurrence-count samples
+OCC_STEP = 64
+# symbols packed into the initial suffix ranks (7**16 fits in int64)
+_INITIAL_SYMBOLS = 16
+# loaded indexes kept in memory
+MAX_LOADED = 4
+# longest text (bases and record separators) indexed: covers the 16 MB upload
+# limit, and construction peaks near 25 bytes per base (about 400 MB)
+MAX_TEXT_LENGTH = 1 << 24
+
+_PATTERN_CODES = {base: code + 1 for code, base in enumerate('ACGT')}
+
+
+def index_path(path):
+    return path + '.fm.npz'
+
+
+def _ranks(keys, sa):
+    """Rank (int32) of each suffix by ``keys``, equal keys sharing a rank; also the largest rank."""
+    sorted_keys = keys[sa]
+    boundaries = sorted_keys[1:] != sorted_keys[:-1]
+    del sorted_keys
+    sorted_ranks = np.zeros(len(sa), dtype=np.int32)
+    np.cumsum(boundaries, dtype=np.int32, out=sorted_ranks[1:])
+    del boundaries
+    rank = np.empty(len(sa), dtype=np.int32)
+    rank[sa] = sorted_ranks
+    return rank, int(sorted_ranks[-1])
+
+
+def suffix_array(text):
+    """Suffix array of a symbol array ending in a unique smallest sentinel.
+
+    The suffix array and ranks are int32, and each round frees the previous
+    keys, order and ranks before allocating the next, so the peak is about
+    25 bytes per symbol (text up to ``MAX_TEXT_LENGTH``).
+    """
+    n = len(text)
+    keys = np.zeros(n, dtype=np.int64)
+    for offset in range(_INITIAL_SYMBOLS):
+        keys *= SIGMA
+        keys[:max(n - offset, 0)] += text[offset:]
+    sa = np.argsort(keys).astype(np.int32)
+    rank, top = _ranks(keys, sa)
+
+    h = _INITIAL_SYMBOLS
+    while top < n - 1 and h < n:
+        del keys, sa
+        # (rank of the first h symbols, rank of the next h + 1, or 0 past the end of the text)
+        keys = rank.astype(np.int64)
+        keys *= n + 1
+        keys[:n - h] += rank[h:]
+        keys[:n - h] += 1
+        del rank
+        sa = np.argsort(keys).astype(np.int32)
+        rank, top = _ranks(keys, sa)
+        h *= 2
+    return sa
+
+
+def _smallest(values, k):
+    """The ``k`` smallest ``values`` in order, partitioning instead of sorting them all."""
+    if len(values) > k:
+        values = np.partition(values, k - 1)[:k] if k else values[:0]
+    return np.sort(values)
+
+
+class FMIndex:
+    """FM-index over the records of a file, with the full suffix array for locate."""
+
+    def __init__(self, sa, bwt, occ, counts, starts, names):
+        self.sa = sa
+        self.bwt = bwt
+        self.occ = occ
+        self.counts = counts
+        self.starts = starts
+        self.names = names
+        # first row of each symbol in the sorted suffixes
+        self._first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    @classmethod
+    def build(cls, records):
+        """Index an iterable of ``(name, sequence)`` pairs."""
+        names, parts, starts = [], [], []
+        position = 0
+        for name, sequence in records:
+            codes = as_encoded(sequence).codes
+            if parts:
+                parts.append(np.array([SEPARATOR], dtype=np.uint8))
+                position += 1
+            names.append(name)
+            starts.append(position)
+            parts.append(np.minimum(codes, OTHER - 1) + 1)
+            position += len(codes)
+        parts.append(np.array([SENTINEL], dtype=np.uint8))
+        text = np.concatenate(parts).astype(np.uint8)
+
+        # the sentinel is not counted, so a 16 MB single-line upload still fits
+        if len(text) - 1 > MAX_TEXT_LENGTH:
+            raise ValueError(f"Files over {MAX_TEXT_LENGTH} bases are too large to index")
+
+        sa = suffix_array(text)
+        bwt = text[sa - 1]  # sa == 0 wraps around to the sentinel
+
+        # occurrences before each sampled row: per-block counts, accumulated
+        blocks = np.zeros(-(-len(bwt) // OCC_STEP) * OCC_STEP, dtype=np.uint8)
+        blocks[:len(bwt)] = bwt
+        blocks[len(bwt):] = SIGMA  # padding, counted for no symbol
+        blocks = blocks.reshape(-1, OCC_STEP)
+        occ = np.zeros((len(blocks) + 1, SIGMA), dtype=np.int64)
+        for symbol in range(SIGMA):
+            np.cumsum(np.count_nonzero(blocks == symbol, axis=1), out=occ[1:, symbol])
+        if len(bwt) % OCC_STEP:
+            # the last sample is at a block boundary past the end of the text
+            occ = occ[:-1]
+        counts = np.bincount(text, minlength=SIGMA).astype(np.int64)
+        return cls(sa, bwt, occ, counts, np.array(starts, dtype=np.int64), names)
+
+    def save(self, path):
+        np.savez(path, sa=self.sa, bwt=self.bwt, occ=self.occ, counts=self.counts,
+                 starts=self.starts, names=np.array(self.names, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['sa'], data['bwt'], data['occ'], data['counts'],
+                       data['starts'], data['names'].tolist())
+
+    @property
+    def text_length(self):
+        return len(self.bwt)
+
+    def _occ(self, symbol, row):
+        """Occurrences of ``symbol`` in ``bwt[:row]``."""
+        block = row // OCC_STEP
+        base = block * OCC_STEP
+        return int(self.occ[block, symbol]) + int(np.count_nonzero(self.bwt[base:row] == symbol))
+
+    def _range(self, pattern):
+        """Suffix array rows ``[lo, hi)`` of suffixes starting with ``pattern``."""
+        lo, hi = 0, len(self.bwt)
+        for base in reversed(pattern):
+            symbol = _PATTERN_CODES[base]
+            lo = int(self._first[symbol]) + self._occ(symbol, lo)
+            hi = int(self._first[symbol]) + self._occ(symbol, hi)
+            if lo >= hi:
+                return 0, 0
+        return lo, hi
+
+    def count(self, pattern):
+        """Number of occurrences of a concrete ACGT pattern."""
+        lo, hi = self._range(pattern.upper())
+        return hi - lo
+
+    def locate(self, pattern, limit=None):
+        """Sorted text positions of a concrete ACGT pattern (at most ``limit``)."""
+        lo, hi = self._range(pattern.upper())
+        return np.sort(self.sa[lo:hi]) if limit is None else _smallest(self.sa[lo:hi], limit)
+
+    def to_records(self, positions):
+        """Map text positions to ``(record index, offset in record)``."""
+        records = np.searchsorted(self.starts, positions, side='right') - 1
+        return records, positions - self.starts[records]
+
+    def search(self, pattern, both_strands=False, max_positions=100):
+        """Count and locate an IUPAC pattern, optionally on both strands."""
+        if not pattern:
+            raise ValueError("Empty search pattern")
+        if max_positions < 0:
+            raise ValueError("max_positions must not be negative")
+        forward = expand_iupac(pattern)
+        concrete = [(p, '+') for p in forward]
+        if both_strands:
+            # palindromic expansions are already found on the forward strand
+            forward_set = set(forward)
+            concrete += [(reverse_complement(p), '-') for p in forward
+                         if reverse_complement(p) not in forward_set]
+
+        total = {'+': 0, '-': 0}
+        hits = []
+        for sequence, strand in dict.fromkeys(concrete):
+            lo, hi = self._range(sequence)
+            total[strand] += hi - lo
+            if hi > lo:
+                found = _smallest(self.sa[lo:hi], max_positions)
+                hits.extend((int(p), strand) for p in found)
+        hits.sort()
+        hits = hits[:max_positions]
+
+        records, offsets = self.to_records(np.array([p for p, _ in hits], dtype=np.int64))
+        return {
+            'pattern': pattern.upper(),
+            'count': total['+'] + total['-'],
+            'forward_count': total['+'],
+            'reverse_count': total['-'],
+            'positions': [
+                {'record': int(r), 'name': self.names[r], 'position': int(o), 'strand': strand}
+                for r, o, (_, strand) in zip(records, offsets, hits)
+            ]
+        }
+
+
+_loaded = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def load_or_build(path, records):
+    """The FM-index of ``path``: from memory, from ``<path>.fm.npz`` when newer
+    than the file, or built from ``records()`` and saved."""
+    key = (path, os.path.getmtime(path))
+    with _loaded_lock:
+        index = _loaded.get(key)
+        if index is not None:
+            _loaded.move_to_end(key)
+            return index
+
+    saved = index_path(path)
+    index = None
+    if os.path.exists(saved) and os.path.getmtime(saved) >= key[1]:
+        try:
+            index = FMIndex.load(saved)
+        except (OSError, KeyError, ValueError):
+            index = None
+    if index is None:
+        index = FMIndex.build(records())
+        index.save(saved)
+
+    with _loaded_lock:
+        _loaded[key] = index
+        while len(_loaded) > MAX_LOADED:
+            _loaded.popitem(last=False)
+    return index
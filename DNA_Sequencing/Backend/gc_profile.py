@@ -0,0 +1,157 @@
+"""Sliding-window GC content and GC skew from binned prefix sums.
+
+The sequence is reduced to G, C and valid-base counts per bin, where the
+bin size is the gcd of a window and its step.  Prefix sums over the bins
+then give any window's counts with two lookups, so each window size costs
+O(n / bin) after the single O(n) counting pass, and the input can be fed
+in chunks without ever holding it whole.  Windows sharing a bin size share
+the counts; a window and step that are (nearly) coprime would need a bin
+per base, so the total number of bins is capped at ``MAX_BINS``.
+"""
+from functools import reduce
+from math import gcd
+
+import numpy as np
+
+from encoded_sequence import INVALID, as_encoded
+
+# codes of G and C in encoded_sequence
+_G = 2
+_C = 1
+
+# bins kept over all bin sizes (about 36 bytes each with the prefix sums)
+MAX_BINS = 1 << 22
+
+
+class GCProfileBuilder:
+    """Accumulate per-bin G/C counts from sequence chunks."""
+
+    def __init__(self, bin_size):
+        if bin_size < 1:
+            raise ValueError("bin_size must be positive")
+        self.bin_size = bin_size
+        self.length = 0
+        self._g = []
+        self._c = []
+        self._valid = []
+        self._carry = np.empty(0, dtype=np.uint8)
+        self._finished = None
+
+    def update(self, chunk):
+        """Add the next chunk (string, bytes or EncodedSequence) of the sequence."""
+        codes = as_encoded(chunk).codes
+        self.length += len(codes)
+        if len(self._carry):
+            codes = np.concatenate((self._carry, codes))
+        full = len(codes) // self.bin_size * self.bin_size
+        if full:
+            self._add_bins(codes[:full].reshape(-1, self.bin_size))
+        self._carry = codes[full:].copy()
+        self._finished = None
+
+    def _add_bins(self, bins):
+        self._g.append((bins == _G).sum(axis=1, dtype=np.int32))
+        self._c.append((bins == _C).sum(axis=1, dtype=np.int32))
+        self._valid.append((bins < INVALID).sum(axis=1, dtype=np.int32))
+
+    def _prefix_sums(self):
+        """Prefix sums of G, C and valid counts over the full bins."""
+        if self._finished is None:
+            def prefix(parts):
+                counts = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+                return np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+            self._finished = (prefix(self._g), prefix(self._c), prefix(self._valid))
+        return self._finished
+
+    def profile(self, window, step=None, max_points=500):
+        """GC content and skew for each window, downsampled to ``max_points``."""
+        step = step or window
+        if window % self.bin_size or step % self.bin_size:
+            raise ValueError("window and step must be multiples of the bin size")
+        cum_g, cum_c, cum_valid = self._prefix_sums()
+        window_bins = window // self.bin_size
+        step_bins = step // self.bin_size
+        starts = np.arange(0, len(cum_g) - window_bins, step_bins)
+        if len(starts) > max_points:
+            starts = starts[np.unique(np.linspace(0, len(starts) - 1, max_points).round().astype(np.int64))]
+        ends = starts + window_bins
+
+        g = cum_g[ends] - cum_g[starts]
+        c = cum_c[ends] - cum_c[starts]
+        valid = cum_valid[ends] - cum_valid[starts]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gc = np.where(valid > 0, (g + c) / valid * 100, 0.0)
+            skew = np.where(g + c > 0, (g - c) / (g + c), 0.0)
+
+        return {
+            'window': window,
+            'step': step,
+            'positions': (starts * self.bin_size + window // 2).tolist(),
+            'gc_content': np.round(gc, 2).tolist(),
+            'gc_skew': np.round(skew, 4).tolist()
+        }
+
+    def cumulative_skew(self, max_points=500):
+        """Cumulative G - C along the sequence; its minimum marks the likely replication origin."""
+        cum_g, cum_c, _ = self._prefix_sums()
+        cumulative = cum_g - cum_c
+        positions = np.arange(len(cum_g)) * self.bin_size
+        if len(self._carry):
+            # close the last partial bin
+            tail = int((self._carry == _G).sum()) - int((self._carry == _C).sum())
+            cumulative = np.append(cumulative, cumulative[-1] + tail)
+            positions = np.append(positions, self.length)
+
+        origin = int(np.argmin(cumulative))
+        terminus = int(np.argmax(cumulative))
+        points = np.unique(np.linspace(0, len(cumulative) - 1, min(max_points, len(cumulative))).round().astype(np.int64))
+        return {
+            'positions': positions[points].tolist(),
+            'values': cumulative[points].tolist(),
+            'min_position': int(positions[origin]),
+            'min_value': int(cumulative[origin]),
+            'max_position': int(positions[terminus]),
+            'max_value': int(cumulative[terminus])
+        }
+
+
+def bin_size_for(windows, step=None):
+    """Largest bin size that divides every window and step."""
+    sizes = list(windows) + ([step] if step else [])
+    return reduce(gcd, sizes)
+
+
+def gc_profile_from_chunks(chunks, windows=(1000,), step=None, max_points=500):
+    """Windowed GC/skew profiles for one or more window sizes from an iterable of chunks.
+
+    Each window is binned by the gcd of itself and its step, so windows of
+    coprime sizes do not force a bin per base on each other.
+    """
+    windows = [int(w) for w in windows]
+    if not windows or min(windows) < 1 or (step is not None and step < 1):
+        raise ValueError("window and step must be positive")
+    builders = {}
+    for w in windows:
+        size = bin_size_for([w], step)
+        if size not in builders:
+            builders[size] = GCProfileBuilder(size)
+    length = 0
+    for chunk in chunks:
+        chunk = as_encoded(chunk)
+        length += len(chunk.codes)
+        if sum(length // size for size in builders) > MAX_BINS:
+            raise ValueError("window sizes and step leave too small a common divisor for this sequence; "
+                             "use larger windows or a larger step")
+        for builder in builders.values():
+            builder.update(chunk)
+    return {
+        'length': length,
+        'profiles': [builders[bin_size_for([w], step)].profile(w, step or w, max_points) for w in windows],
+        # the finest bins place the extremes most precisely
+        'cumulative_skew': builders[min(builders)].cumulative_skew(max_points)
+    }
+
+
+def gc_profile(sequence, windows=(1000,), step=None, max_points=500):
+    """Windowed GC/skew profiles for a sequence held in memory."""
+    return gc_profile_from_chunks([sequence], windows, step, max_points)
@@ -0,0 +1,203 @@
+"""Random access to FASTA/FASTQ files through a samtools-style .fai index.
+
+The file is memory-mapped and indexed once; the index is written next to
+it as ``<file>.fai`` in the samtools faidx layout (NAME, LENGTH, OFFSET,
+LINEBASES, LINEWIDTH, plus QUALOFFSET for FASTQ) and reused while it is
+newer than the file.  A region is located by arithmetic on the line
+layout, so fetching costs O(region) regardless of where it is in the file.
+"""
+import mmap
+import os
+
+
+class FaiEntry:
+    __slots__ = ('name', 'length', 'offset', 'line_bases', 'line_width', 'qual_offset')
+
+    def __init__(self, name, length, offset, line_bases, line_width, qual_offset=None):
+        self.name = name
+        self.length = length
+        self.offset = offset
+        self.line_bases = line_bases
+        self.line_width = line_width
+        self.qual_offset = qual_offset
+
+    def to_line(self):
+        fields = [self.name, self.length, self.offset, self.line_bases, self.line_width]
+        if self.qual_offset is not None:
+            fields.append(self.qual_offset)
+        return '\t'.join(str(f) for f in fields)
+
+    @classmethod
+    def from_line(cls, line):
+        parts = line.rstrip('\n').split('\t')
+        numbers = [int(p) for p in parts[1:]]
+        return cls(parts[0], *numbers)
+
+
+def index_path(path):
+    return path + '.fai'
+
+
+def _lines(data, start=0):
+    """Yield (line_start, content_end, next_line_start) for each line of a buffer."""
+    size = len(data)
+    pos = start
+    while pos < size:
+        newline = data.find(b'\n', pos)
+        next_pos = size if newline == -1 else newline + 1
+        end = next_pos - 1 if newline != -1 else size
+        if end > pos and data[end - 1:end] == b'\r':
+            end -= 1
+        yield pos, end, next_pos
+        pos = next_pos
+
+
+def _build_fasta_index(data):
+    entries = []
+    current = None
+    irregular = False
+    for start, end, next_pos in _lines(data):
+        if data[start:start + 1] == b'>':
+            name = bytes(data[start + 1:end]).split(None, 1)
+            current = FaiEntry(name[0].decode('utf-8', 'replace') if name else '', 0, next_pos, 0, 0)
+            entries.append(current)
+            irregular = False
+            continue
+        if current is None:
+            continue
+        if end == start:
+            # a blank line may only end a record, like a short last line
+            irregular = True
+            continue
+        bases = end - start
+        if irregular:
+            raise ValueError(f"Record {current.name!r} has lines of different lengths or a blank line")
+        if current.line_bases == 0:
+            current.line_bases = bases
+            current.line_width = next_pos - start
+        elif bases > current.line_bases:
+            # a longer line (the last one included) breaks the offset arithmetic
+            raise ValueError(f"Record {current.name!r} has lines of different lengths")
+        elif bases < current.line_bases:
+            # only the last line of a record may be shorter
+            irregular = True
+        current.length += bases
+    return entries
+
+
+def _build_fastq_index(data):
+    entries = []
+    lines = _lines(data)
+    for start, end, next_pos in lines:
+        if end == start:
+            continue
+        if data[start:start + 1] != b'@':
+            raise ValueError("Malformed FASTQ record header")
+        name = bytes(data[start + 1:end]).split(None, 1)
+        try:
+            seq_start, seq_end, seq_next = next(lines)
+            next(lines)  # '+' line
+            qual_start, _, _ = next(lines)
+        except StopIteration:
+            raise ValueError("Truncated FASTQ record")
+        entries.append(FaiEntry(
+            name[0].decode('utf-8', 'replace') if name else '',
+            seq_end - seq_start, seq_start,
+            seq_end - seq_start, seq_next - seq_start,
+            qual_start
+        ))
+    return entries
+
+
+def build_index(path):
+    """Scan a FASTA/FASTQ file and write its .fai index; returns the entries."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            entries = []
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                first = data[:1]
+                if first == b'>':
+                    entries = _build_fasta_index(data)
+                elif first == b'@':
+                    entries = _build_fastq_index(data)
+                else:
+                    raise ValueError("Only FASTA and FASTQ files can be indexed")
+
+    with open(index_path(path), 'w') as f:
+        for entry in entries:
+            f.write(entry.to_line() + '\n')
+    return entries
+
+
+def load_index(path):
+    """Read the .fai next to ``path``, (re)building it when missing or stale."""
+    fai = index_path(path)
+    if os.path.exists(fai) and os.path.getmtime(fai) >= os.path.getmtime(path):
+        with open(fai, 'r') as f:
+            return [FaiEntry.from_line(line) for line in f if line.strip()]
+    return build_index(path)
+
+
+class IndexedReader:
+    """Memory-mapped, indexed FASTA/FASTQ reader.
+
+    Regions inside a single line come back as zero-copy memoryviews into
+    the mapping; regions crossing line breaks are copied once with the
+    newlines removed.  Release returned memoryviews before ``close``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = load_index(path)
+        self._by_name = {entry.name: i for i, entry in enumerate(self.entries)}
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.entries else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def names(self):
+        return [entry.name for entry in self.entries]
+
+    def entry(self, record):
+        """Look up a record by index or by name."""
+        if isinstance(record, int):
+            if not 0 <= record < len(self.entries):
+                raise IndexError(f"Record {record} out of range (file has {len(self.entries)})")
+            return self.entries[record]
+        try:
+            return self.entries[self._by_name[record]]
+        except KeyError:
+            raise KeyError(f"Record {record!r} not found")
+
+    def _byte_offset(self, entry, position):
+        line, column = divmod(position, entry.line_bases)
+        return entry.offset + line * entry.line_width + column
+
+    def fetch(self, record, start=0, end=None):
+        """Bases ``[start, end)`` of a record (0-based, half-open)."""
+        entry = self.entry(record)
+        end = entry.length if end is None else min(end, entry.length)
+        start = max(0, start)
+        if start >= end:
+            return b''
+
+        first = self._byte_offset(entry, start)
+        last = self._byte_offset(entry, end - 1) + 1
+        if start // entry.line_bases == (end - 1) // entry.line_bases:
+            return memoryview(self._map)[first:last]
+        return self._map[first:last].replace(b'\n', b'').replace(b'\r', b'')
@@ -0,0 +1,130 @@
+"""Background analysis jobs for uploaded files.
+
+Uploads are analyzed on a bounded thread pool so the request that saved
+the file can return a job id straight away.  The number of queued plus
+running jobs is capped; finished jobs and their upload files are removed
+once they are older than the retention period.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting or running."""
+
+
+class Job:
+    def __init__(self, filepath, filename):
+        self.id = uuid.uuid4().hex
+        self.filepath = filepath
+        self.filename = filename
+        self.status = QUEUED
+        self.records_done = 0
+        self.bytes_total = os.path.getsize(filepath) if os.path.exists(filepath) else 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    @property
+    def is_finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self, include_result=False):
+        data = {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': {
+                'records_done': self.records_done,
+                'bytes_total': self.bytes_total
+            },
+            'created': self.created,
+            'finished': self.finished
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.status == DONE:
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """Runs ``analyze(filepath, progress)`` for each submitted upload."""
+
+    def __init__(self, analyze, max_workers=2, max_pending=16, retention=3600):
+        self.analyze = analyze
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def pending(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.is_finished)
+
+    def submit(self, filepath, filename):
+        self.cleanup()
+        job = Job(filepath, filename)
+        with self._lock:
+            if sum(1 for j in self._jobs.values() if not j.is_finished) >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} analysis jobs are already pending")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        self.cleanup()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = RUNNING
+
+        def progress(records_done):
+            job.records_done = records_done
+
+        try:
+            job.result = self.analyze(job.filepath, progress)
+            status = DONE
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            status = FAILED
+        # the finish time is set first: a job seen as finished always has one
+        job.finished = time.time()
+        job.status = status
+
+    def cleanup(self):
+        """Forget finished jobs past the retention period and delete their uploads."""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.is_finished and job.finished is not None and job.finished < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            # the upload and any .fai index, MinHash sketches or FM-index built for it
+            for path in (job.filepath, job.filepath + '.fai', job.filepath + '.sketch.npz',
+                         job.filepath + '.fm.npz'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return len(expired)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
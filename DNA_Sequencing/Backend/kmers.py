@@ -0,0 +1,126 @@
+"""Vectorized k-mer counting over encoded sequences.
+
+Each k-mer is an integer in base 4 (A=0, C=1, G=2, T=3).  The ids for
+k + 1 are built from the ids for k (``id * 4 + next base``), so several
+values of k share one walk over the sequence.  Small k are counted with
+``np.bincount`` over all 4**k bins; larger k fall back to ``np.unique``
+on the observed ids so memory never depends on 4**k.
+"""
+import numpy as np
+
+from encoded_sequence import INVALID, as_encoded, reverse_complement_codes
+
+# largest k counted with a dense 4**k bincount (4**11 int64 bins = 32 MB);
+# short sequences only go dense while 4**k stays near their length
+DENSE_MAX_K = 11
+DENSE_ALWAYS_K = 8
+# ids are int64, so k is capped at 31
+MAX_K = 31
+
+
+def decode_kmer(kmer_id, k):
+    """Turn an integer k-mer id back into its string."""
+    bases = []
+    for _ in range(k):
+        bases.append('ACGT'[kmer_id & 3])
+        kmer_id >>= 2
+    return ''.join(reversed(bases))
+
+
+def _iter_kmer_ids(codes, ks):
+    """Yield (k, ids, valid) for each k in ``ks`` (ascending), reusing the previous k's ids."""
+    invalid = np.concatenate(([0], np.cumsum(codes >= INVALID)))
+    ids = np.zeros(len(codes), dtype=np.int64)
+    current = 0
+    for k in ks:
+        if k > len(codes):
+            yield k, ids[:0], ids[:0].astype(bool)
+            continue
+        while current < k:
+            # extend every window by one base: ids[i] covers codes[i:i + current + 1]
+            ids = ids[:len(codes) - current] * 4 + (codes[current:] & 3)
+            current += 1
+        valid = (invalid[k:] - invalid[:-k]) == 0
+        yield k, ids, valid
+
+
+def _canonical(ids, codes, k):
+    """Smaller of each k-mer id and the id of its reverse complement."""
+    rc_codes = reverse_complement_codes(codes)
+    _, rc_ids, _ = next(_iter_kmer_ids(rc_codes, [k]))
+    return np.minimum(ids, rc_ids[::-1])
+
+
+def iter_kmer_windows(sequence, ks):
+    """Yield ``(k, ids, valid)`` for each k in ``ks``, where ``ids[i]`` is the
+    k-mer starting at position i and ``valid[i]`` says it holds only ACGT."""
+    ks = sorted(set(ks))
+    for k in ks:
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}")
+    return _iter_kmer_ids(as_encoded(sequence).codes, ks)
+
+
+def kmer_id_array(sequence, k, canonical=False):
+    """Integer id of every valid k-mer window of ``sequence``, in order."""
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+    codes = as_encoded(sequence).codes
+    _, ids, valid = next(_iter_kmer_ids(codes, [k]))
+    if canonical and len(ids):
+        ids = _canonical(ids, codes, k)
+    return ids[valid]
+
+
+def count_kmers(sequence, k, canonical=False):
+    """Count the k-mers of ``sequence``.
+
+    Returns ``(kmer_ids, counts)`` for every k-mer seen at least once;
+    windows containing a non-ACGT base are skipped.
+    """
+    return next(iter_kmer_counts(sequence, [k], canonical))[1:]
+
+
+def iter_kmer_counts(sequence, ks, canonical=False):
+    """Yield ``(k, kmer_ids, counts)`` for each k, sharing one encoding and id walk."""
+    codes = as_encoded(sequence).codes
+    for k in sorted(set(ks)):
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}")
+    for k, ids, valid in _iter_kmer_ids(codes, sorted(set(ks))):
+        if canonical and len(ids):
+            ids = _canonical(ids, codes, k)
+        ids = ids[valid]
+        if k <= DENSE_ALWAYS_K or (k <= DENSE_MAX_K and 4 ** k <= 4 * len(ids)):
+            counts = np.bincount(ids, minlength=4 ** k)
+            kmer_ids = np.flatnonzero(counts)
+            yield k, kmer_ids, counts[kmer_ids]
+        else:
+            kmer_ids, counts = np.unique(ids, return_counts=True)
+            yield k, kmer_ids, counts
+
+
+def top_kmers(kmer_ids, counts, k, top_n=None, min_count=1):
+    """Most frequent k-mers as ``(kmer, count)`` pairs, highest count first."""
+    keep = counts >= min_count
+    kmer_ids, counts = kmer_ids[keep], counts[keep]
+    if top_n is not None and top_n < len(counts):
+        chosen = np.argpartition(-counts, top_n - 1)[:top_n]
+        kmer_ids, counts = kmer_ids[chosen], counts[chosen]
+    order = np.lexsort((kmer_ids, -counts))
+    return [(decode_kmer(int(kmer_ids[i]), k), int(counts[i])) for i in order]
+
+
+def kmer_spectrum(sequence, ks=(6,), canonical=False, top_n=10, min_count=1):
+    """Per-k summary of the k-mer spectrum with the ``top_n`` most common k-mers."""
+    spectrum = {}
+    for k, kmer_ids, counts in iter_kmer_counts(sequence, ks, canonical):
+        spectrum[k] = {
+            'distinct': int(len(kmer_ids)),
+            'total': int(counts.sum()),
+            'top': [
+                {'kmer': kmer, 'count': count}
+                for kmer, count in top_kmers(kmer_ids, counts, k, top_n, min_count)
+            ]
+        }
+    return spectrum
@@ -0,0 +1,181 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are kept per label set behind one lock
+and rendered on demand for a ``/metrics`` scrape.  ``stage`` times one
+step of an analysis and records how many bases it processed, so a slow
+request can be traced to the step responsible.  Work done in
+``analyze_many`` pool processes is not recorded here.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds; covers sub-millisecond sections up to minute-long file analyses
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _render_samples(self, items):
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'dna_analysis_stage_seconds', 'Time spent in each analysis stage.', ['stage'])
+STAGE_BASES = REGISTRY.counter(
+    'dna_analysis_stage_bases_total', 'Bases processed by each analysis stage.', ['stage'])
+STAGE_ERRORS = REGISTRY.counter(
+    'dna_analysis_stage_errors_total', 'Analysis stages that raised an exception.', ['stage'])
+
+
+class _Stage:
+    __slots__ = ('bases',)
+
+    def __init__(self, bases):
+        self.bases = bases
+
+
+@contextmanager
+def stage(name, bases=0):
+    """Time a block as analysis stage ``name``.
+
+    ``bases`` is the amount of sequence it processes; set ``.bases`` on the
+    yielded object when that is only known at the end.
+    """
+    current = _Stage(bases)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+        STAGE_BASES.inc(current.bases, stage=name)
@@ -0,0 +1,228 @@
+"""MinHash sketches for fast sequence similarity.
+
+A record is reduced to the set of its canonical k-mers, and that set to a
+fixed-size signature: for each of ``num_hashes`` hash functions, the
+smallest hash over the set.  Two signatures agree at a position with
+probability equal to the Jaccard index of the k-mer sets, so comparing
+signatures costs O(num_hashes) however long the records are, and a whole
+collection compares all-vs-all as one blocked array operation.  The Mash
+distance turns the Jaccard estimate into an approximate per-base mutation
+rate.
+
+Hashes are multiply-add-shift on a 64-bit mix of the k-mer id, done in
+wrapping uint64 arithmetic so a block of k-mers hashes without a Python
+loop.  Sketches of a file are saved next to it as ``<file>.sketch.npz``.
+"""
+import os
+
+import numpy as np
+
+from kmers import MAX_K, kmer_id_array
+
+DEFAULT_K = 21
+DEFAULT_NUM_HASHES = 128
+DEFAULT_SEED = 42
+
+# distinct k-mers hashed per block (block x num_hashes uint64 values)
+HASH_BLOCK = 1 << 14
+# signature rows compared per block in all-vs-all
+PAIR_BLOCK = 64
+
+_EMPTY = np.iinfo(np.uint64).max
+
+
+def sketch_path(path):
+    return path + '.sketch.npz'
+
+
+def mix64(ids):
+    """splitmix64 finalizer, so neighbouring k-mer ids hash far apart."""
+    x = ids.astype(np.uint64)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def _hash_params(num_hashes, seed):
+    rng = np.random.default_rng(seed)
+    # odd multipliers keep each hash a bijection on uint64
+    a = rng.integers(1, 1 << 63, size=num_hashes, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=num_hashes, dtype=np.uint64)
+    return a, b
+
+
+def mash_distance(jaccard, k):
+    """Mash distance for a Jaccard estimate; 1.0 when nothing is shared."""
+    jaccard = np.asarray(jaccard, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        distance = np.log((1 + jaccard) / (2 * jaccard)) / k
+    return np.where(jaccard > 0, np.clip(distance, 0.0, 1.0), 1.0)
+
+
+class MinHasher:
+    """Builds MinHash signatures for one (k, num_hashes, seed) setting."""
+
+    def __init__(self, k=DEFAULT_K, num_hashes=DEFAULT_NUM_HASHES, seed=DEFAULT_SEED):
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}")
+        if num_hashes < 1:
+            raise ValueError("num_hashes must be positive")
+        self.k = k
+        self.num_hashes = num_hashes
+        self.seed = seed
+        self._a, self._b = _hash_params(num_hashes, seed)
+
+    def signature(self, sequence):
+        """Signature of a sequence's canonical k-mer set; all-max when it has none."""
+        ids = np.unique(kmer_id_array(sequence, self.k, canonical=True))
+        signature = np.full(self.num_hashes, _EMPTY, dtype=np.uint64)
+        mixed = mix64(ids)
+        for start in range(0, len(mixed), HASH_BLOCK):
+            block = mixed[start:start + HASH_BLOCK, None]
+            hashes = block * self._a + self._b
+            np.minimum(signature, hashes.min(axis=0), out=signature)
+        return signature
+
+
+class SketchIndex:
+    """Named MinHash signatures with top-k and all-vs-all queries."""
+
+    def __init__(self, k=DEFAULT_K, num_hashes=DEFAULT_NUM_HASHES, seed=DEFAULT_SEED):
+        self.hasher = MinHasher(k, num_hashes, seed)
+        self.names = []
+        self.lengths = []
+        self._rows = []
+        self._signatures = None
+
+    @property
+    def k(self):
+        return self.hasher.k
+
+    @property
+    def num_hashes(self):
+        return self.hasher.num_hashes
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, sequence):
+        self.names.append(name)
+        self.lengths.append(len(sequence))
+        self._rows.append(self.hasher.signature(sequence))
+        self._signatures = None
+
+    @property
+    def signatures(self):
+        if self._signatures is None:
+            if self._rows:
+                self._signatures = np.vstack(self._rows)
+            else:
+                self._signatures = np.empty((0, self.num_hashes), dtype=np.uint64)
+            self._rows = list(self._signatures)
+        return self._signatures
+
+    def _lookup(self, record):
+        if isinstance(record, int):
+            if not 0 <= record < len(self.names):
+                raise IndexError(f"Record {record} out of range (index has {len(self.names)})")
+            return record
+        try:
+            return self.names.index(record)
+        except ValueError:
+            raise KeyError(f"Record {record!r} not found")
+
+    def jaccard(self, signature):
+        """Estimated Jaccard index of ``signature`` against every indexed record."""
+        signatures = self.signatures
+        if not len(signatures):
+            return np.empty(0)
+        # empty sets share no k-mers, even though their all-max signatures are equal
+        matches = (signatures == signature) & (signature != _EMPTY)
+        return matches.mean(axis=1)
+
+    def query(self, sequence=None, record=None, top_k=10):
+        """The ``top_k`` records most similar to a sequence or to an indexed record."""
+        if record is not None:
+            exclude = self._lookup(record)
+            signature = self.signatures[exclude]
+        elif sequence is not None:
+            exclude = None
+            signature = self.hasher.signature(sequence)
+        else:
+            raise ValueError("Either a sequence or a record is required")
+
+        jaccard = self.jaccard(signature)
+        if exclude is not None:
+            jaccard[exclude] = 0
+        # records sharing no sampled k-mer are not reported
+        candidates = np.flatnonzero(jaccard > 0)
+        if top_k is not None and top_k < len(candidates):
+            chosen = np.argpartition(-jaccard[candidates], top_k - 1)[:top_k]
+            candidates = candidates[chosen]
+        order = candidates[np.lexsort((candidates, -jaccard[candidates]))]
+        distances = mash_distance(jaccard[order], self.k)
+        return [
+            {
+                'index': int(i),
+                'name': self.names[i],
+                'length': self.lengths[i],
+                'jaccard': round(float(jaccard[i]), 4),
+                'mash_distance': round(float(d), 6)
+            }
+            for i, d in zip(order.tolist(), distances)
+        ]
+
+    def pairwise(self):
+        """All-vs-all ``(jaccard, mash_distance)`` matrices, compared in row blocks."""
+        signatures = self.signatures
+        n = len(signatures)
+        jaccard = np.zeros((n, n))
+        filled = signatures != _EMPTY
+        for start in range(0, n, PAIR_BLOCK):
+            block = signatures[start:start + PAIR_BLOCK, None, :]
+            matches = (block == signatures[None, :, :]) & filled[None, :, :]
+            jaccard[start:start + PAIR_BLOCK] = matches.mean(axis=2)
+        return jaccard, mash_distance(jaccard, self.k)
+
+    def save(self, path):
+        np.savez(path, signatures=self.signatures,
+                 names=np.array(self.names, dtype=str), lengths=np.array(self.lengths, dtype=np.int64),
+                 params=np.array([self.k, self.num_hashes, self.hasher.seed], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            k, num_hashes, seed = (int(v) for v in data['params'])
+            index = cls(k, num_hashes, seed)
+            index.names = data['names'].tolist()
+            index.lengths = data['lengths'].tolist()
+            index._signatures = data['signatures']
+        index._rows = list(index._signatures)
+        return index
+
+
+def build_index(records, k=DEFAULT_K, num_hashes=DEFAULT_NUM_HASHES, seed=DEFAULT_SEED):
+    """Sketch an iterable of ``(name, sequence)`` pairs."""
+    index = SketchIndex(k, num_hashes, seed)
+    for name, sequence in records:
+        index.add(name, sequence)
+    return index
+
+
+def load_or_build(path, records, k=DEFAULT_K, num_hashes=DEFAULT_NUM_HASHES, seed=DEFAULT_SEED):
+    """Reuse ``<path>.sketch.npz`` when it is newer than ``path`` and has the same
+    parameters; otherwise sketch ``records()`` and save the result."""
+    saved = sketch_path(path)
+    if os.path.exists(saved) and os.path.getmtime(saved) >= os.path.getmtime(path):
+        try:
+            index = SketchIndex.load(saved)
+            if (index.k, index.num_hashes, index.hasher.seed) == (k, num_hashes, seed):
+                return index
+        except (OSError, KeyError, ValueError):
+            pass
+    index = build_index(records(), k, num_hashes, seed)
+    index.save(saved)
+    return index
@@ -0,0 +1,140 @@
+"""Multi-pattern motif search with an Aho–Corasick automaton.
+
+Motifs may use IUPAC degenerate codes (e.g. TATAWAW); they are expanded
+to concrete ACGT strings, and their reverse complements are added so both
+strands are searched in the same pass.  The automaton is compiled into a
+dense transition table once, so a search is one walk over the sequence
+whatever the size of the motif library.
+"""
+import itertools
+from collections import deque
+
+from encoded_sequence import INVALID, as_encoded
+
+IUPAC_CODES = {
+    'A': 'A', 'C': 'C', 'G': 'G', 'T': 'T', 'U': 'T',
+    'R': 'AG', 'Y': 'CT', 'S': 'CG', 'W': 'AT', 'K': 'GT', 'M': 'AC',
+    'B': 'CGT', 'D': 'AGT', 'H': 'ACT', 'V': 'ACG', 'N': 'ACGT',
+}
+
+# refuse motifs that expand to more concrete sequences than this
+MAX_EXPANSIONS = 4096
+
+_ALPHABET = 'ACGT'
+_COMPLEMENT = str.maketrans('ACGT', 'TGCA')
+
+
+def expand_iupac(motif):
+    """All concrete ACGT sequences matched by an IUPAC motif."""
+    motif = motif.upper()
+    try:
+        choices = [IUPAC_CODES[base] for base in motif]
+    except KeyError as e:
+        raise ValueError(f"Invalid IUPAC code {e.args[0]!r} in motif {motif!r}")
+    total = 1
+    for options in choices:
+        total *= len(options)
+    if total > MAX_EXPANSIONS:
+        raise ValueError(f"Motif {motif!r} expands to {total} sequences (max {MAX_EXPANSIONS})")
+    return [''.join(p) for p in itertools.product(*choices)]
+
+
+def reverse_complement(sequence):
+    return sequence.translate(_COMPLEMENT)[::-1]
+
+
+class MotifAutomaton:
+    """Compiled Aho–Corasick automaton for a fixed motif set."""
+
+    def __init__(self, motifs, both_strands=True):
+        self.motifs = list(dict.fromkeys(m.upper() for m in motifs))
+        self.both_strands = both_strands
+
+        # each pattern is (motif index, strand, length)
+        self._patterns = []
+        trie = [{}]
+        outputs = [[]]
+        for motif_index, motif in enumerate(self.motifs):
+            forward = expand_iupac(motif)
+            concrete = [(p, '+') for p in forward]
+            if both_strands:
+                # palindromic expansions are already found on the forward strand
+                forward_set = set(forward)
+                concrete += [(reverse_complement(p), '-') for p in forward
+                             if reverse_complement(p) not in forward_set]
+            for pattern, strand in concrete:
+                node = 0
+                for base in pattern:
+                    code = _ALPHABET.index(base)
+                    if code not in trie[node]:
+                        trie[node][code] = len(trie)
+                        trie.append({})
+                        outputs.append([])
+                    node = trie[node][code]
+                outputs[node].append(len(self._patterns))
+                self._patterns.append((motif_index, strand, len(pattern)))
+
+        self._transitions, self._outputs = self._compile(trie, outputs)
+
+    @staticmethod
+    def _compile(trie, outputs):
+        """Fold failure links into a flat table: next = table[state * 5 + code]."""
+        states = len(trie)
+        table = [0] * (states * (INVALID + 1))
+        fail = [0] * states
+        queue = deque()
+        for code in range(INVALID):
+            child = trie[0].get(code)
+            if child is not None:
+                table[code] = child
+                queue.append(child)
+
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for code in range(INVALID):
+                child = trie[state].get(code)
+                if child is None:
+                    table[state * 5 + code] = table[fail[state] * 5 + code]
+                else:
+                    fail[child] = table[fail[state] * 5 + code]
+                    table[state * 5 + code] = child
+                    queue.append(child)
+            # an invalid base resets to the root (already 0)
+
+        return table, [tuple(o) for o in outputs]
+
+    def iter_matches(self, sequence, limit=None):
+        """Yield ``(position, motif, strand)`` for each hit, in sequence order.
+
+        ``position`` is the forward-strand start of the matched span.
+        """
+        table = self._transitions
+        outputs = self._outputs
+        patterns = self._patterns
+        motifs = self.motifs
+        found = 0
+        state = 0
+        for i, code in enumerate(as_encoded(sequence).codes.tobytes()):
+            state = table[state * 5 + code]
+            if outputs[state]:
+                for pattern_index in outputs[state]:
+                    motif_index, strand, length = patterns[pattern_index]
+                    yield i - length + 1, motifs[motif_index], strand
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+
+    def find(self, sequence, max_positions=10):
+        """Per-motif hit counts with the first ``max_positions`` positions."""
+        found = {}
+        for position, motif, strand in self.iter_matches(sequence):
+            entry = found.get(motif)
+            if entry is None:
+                entry = found[motif] = {'count': 0, 'forward_count': 0, 'reverse_count': 0, 'positions': []}
+            entry['count'] += 1
+            entry['forward_count' if strand == '+' else 'reverse_count'] += 1
+            if len(entry['positions']) < max_positions:
+                entry['positions'].append(position)
+        # report motifs in library order, like the per-motif scan did
+        return {m: found[m] for m in self.motifs if m in found}
@@ -0,0 +1,120 @@
+"""Single-pass six-frame ORF scanner.
+
+Every position of the sequence is turned into a codon id once, then each
+frame is reduced to the indices of its start and stop codons.  Pairing a
+start with the next stop in the same frame is a ``searchsorted`` over the
+stop indices, so the whole scan is linear in the sequence length no matter
+how far apart the stop codons are.
+"""
+import heapq
+
+import numpy as np
+
+from encoded_sequence import EncodedSequence, encode, reverse_complement_codes
+
+STOP_CODONS = ('TAA', 'TAG', 'TGA')
+DEFAULT_START_CODONS = ('ATG',)
+ALTERNATIVE_START_CODONS = ('ATG', 'GTG', 'TTG')
+
+_COMPLEMENT = str.maketrans('ACGTacgt', 'TGCAtgca')
+
+
+def codon_id(codon):
+    """Integer id (0-63) of a three-letter codon."""
+    codes = encode(codon)
+    if len(codes) != 3 or (codes > 3).any():
+        raise ValueError(f"Invalid codon: {codon!r}")
+    return int(codes[0]) * 16 + int(codes[1]) * 4 + int(codes[2])
+
+
+def codon_ids(codes):
+    """Codon id starting at every position of an encoded sequence (-1 if it holds an invalid base)."""
+    if len(codes) < 3:
+        return np.empty(0, dtype=np.int16)
+    first, second, third = (codes[i:len(codes) - 2 + i].astype(np.int16) for i in range(3))
+    ids = first * 16 + second * 4 + third
+    ids[(first > 3) | (second > 3) | (third > 3)] = -1
+    return ids
+
+
+def _scan_frame(ids, frame, start_ids, stop_ids, nested):
+    """Return (starts, ends) of every start→stop ORF in one frame, in strand coordinates."""
+    frame_ids = ids[frame::3]
+    starts = np.flatnonzero(np.isin(frame_ids, start_ids))
+    stops = np.flatnonzero(np.isin(frame_ids, stop_ids))
+    if len(starts) == 0 or len(stops) == 0:
+        return starts[:0], starts[:0]
+
+    next_stop = np.searchsorted(stops, starts)
+    closed = next_stop < len(stops)
+    starts = starts[closed]
+    ends = stops[next_stop[closed]]
+
+    if not nested:
+        # starts are sorted, so the first start per stop is the outermost one
+        ends, first = np.unique(ends, return_index=True)
+        starts = starts[first]
+
+    return frame + 3 * starts, frame + 3 * ends + 3
+
+
+def find_orfs(sequence, min_length=90, top_n=5, start_codons=DEFAULT_START_CODONS,
+              nested=False, both_strands=True):
+    """Find open reading frames in all six (or the three forward) frames.
+
+    ``min_length`` counts nucleotides including the stop codon.  With
+    ``nested=False`` only the outermost start before each stop is reported;
+    with ``nested=True`` every in-frame start produces its own ORF.  Only the
+    ``top_n`` longest ORFs are kept (pass ``None`` to keep all of them).
+    Coordinates are always on the forward strand, half-open.  ``sequence``
+    may be a string or an EncodedSequence.
+    """
+    if top_n is not None and top_n < 0:
+        raise ValueError("top_n must not be negative")
+    if top_n == 0:
+        return []
+    codes = sequence.codes if isinstance(sequence, EncodedSequence) else encode(sequence)
+    seq_len = len(codes)
+    start_ids = [codon_id(c) for c in start_codons]
+    stop_ids = [codon_id(c) for c in STOP_CODONS]
+
+    strands = [('+', codes)]
+    if both_strands:
+        strands.append(('-', reverse_complement_codes(codes)))
+
+    heap = []
+    counter = 0
+    for strand, strand_codes in strands:
+        ids = codon_ids(strand_codes)
+        for frame in range(3):
+            starts, ends = _scan_frame(ids, frame, start_ids, stop_ids, nested)
+            lengths = ends - starts
+            keep = lengths >= min_length
+            for start, end, length in zip(starts[keep].tolist(), ends[keep].tolist(), lengths[keep].tolist()):
+                # counter keeps ties in scan order and avoids comparing strands
+                item = (length, -counter, strand, frame, start, end)
+                counter += 1
+                if top_n is None or len(heap) < top_n:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+    orfs = []
+    for length, _, strand, frame, start, end in sorted(heap, reverse=True):
+        if strand == '+':
+            preview = str(sequence[start:min(start + 60, end)])
+            orf_start, orf_end = start, end
+            frame_number = frame + 1
+        else:
+            orf_start, orf_end = seq_len - end, seq_len - start
+            preview = str(sequence[max(orf_end - 60, orf_start):orf_end]).translate(_COMPLEMENT)[::-1]
+            frame_number = -(frame + 1)
+        orfs.append({
+            'start': orf_start,
+            'end': orf_end,
+            'length': length,
+            'frame': frame_number,
+            'strand': strand,
+            'sequence': preview + '...'
+        })
+    return orfs
@@ -0,0 +1,170 @@
+"""Molecular weight and melting temperature from base and dinucleotide counts.
+
+Both only depend on how often each base and each pair of adjacent bases
+occurs, plus the two end bases.  The sequence is read once, in blocks of
+``CHUNK_BASES`` codes, into a 5 x 5 table of adjacent code pairs (code 4
+is any non-ACGT base), so memory does not grow with the sequence and the
+values are exact at any length.  With the default conditions they match
+Biopython's ``molecular_weight``, ``Tm_Wallace``, ``Tm_GC`` and ``Tm_NN``
+on ACGT sequences.  Non-ACGT bases are left out of every count.  The
+Wallace rule is only given for short oligos and the GC formula only from
+``GC_MIN_LENGTH`` bases; the nearest-neighbor Tm is given at any length.
+
+RNA values are those of the transcript (T read as U): the RNA weight table
+and the RNA nearest-neighbor parameters of Xia et al. (1998).  DNA uses
+Allawi & SantaLucia (1997) with the SantaLucia (1998) salt correction.
+"""
+import math
+
+import numpy as np
+from Bio.Data.IUPACData import unambiguous_dna_weights, unambiguous_rna_weights
+from Bio.SeqUtils.MeltingTemp import DNA_NN3, RNA_NN2
+
+from encoded_sequence import BASES, INVALID, as_encoded
+
+# codes per block when counting adjacent pairs
+CHUNK_BASES = 1 << 20
+
+MOLECULES = ('DNA', 'RNA')
+WEIGHTS = {
+    'DNA': np.array([unambiguous_dna_weights[base] for base in 'ACGT']),
+    'RNA': np.array([unambiguous_rna_weights[base] for base in 'ACGU']),
+}
+NN_TABLES = {'DNA': DNA_NN3, 'RNA': RNA_NN2}
+
+# lengths the approximate Tm formulas are meant for: the Wallace rule for
+# oligos of 14-20 nt (it grows by 2-4 C per base), the GC formula from 14 nt
+WALLACE_MAX_LENGTH = 20
+GC_MIN_LENGTH = 14
+
+# default conditions: 50 mM Na+ and 25 nM of each strand
+SODIUM_MM = 50
+STRAND_NM = 25
+
+_WATER = 18.0153
+_R = 1.987
+_A, _C, _G, _T = range(4)
+
+
+def _stack_table(table):
+    """Delta H (kcal/mol) and delta S (cal/K/mol) of each 5'-XY-3' stack, as 4 x 4 arrays."""
+    complement = dict(zip(BASES, 'TGCA'))
+    enthalpy = np.zeros((4, 4))
+    entropy = np.zeros((4, 4))
+    for i, x in enumerate(BASES):
+        for j, y in enumerate(BASES):
+            key = f'{x}{y}/{complement[x]}{complement[y]}'
+            enthalpy[i, j], entropy[i, j] = table[key] if key in table else table[key[::-1]]
+    return enthalpy, entropy
+
+
+_STACKS = {molecule: _stack_table(table) for molecule, table in NN_TABLES.items()}
+
+
+def _check_molecule(molecule):
+    if molecule not in MOLECULES:
+        raise ValueError(f"Molecule must be one of {', '.join(MOLECULES)}")
+
+
+class NucleotideCounts:
+    """Adjacent base-pair counts of a sequence with its first and last base codes."""
+
+    def __init__(self, pairs, first=INVALID, last=INVALID):
+        self.pairs = pairs
+        self.first = first
+        self.last = last
+        # every base is the left one of a pair, except the last base
+        self.bases = pairs[:4].sum(axis=1)
+        if last < INVALID:
+            self.bases[last] += 1
+        self.length = int(self.bases.sum())
+
+    @classmethod
+    def from_sequence(cls, sequence, chunk=CHUNK_BASES):
+        codes = as_encoded(sequence).codes
+        pairs = np.zeros(25, dtype=np.int64)
+        for start in range(0, len(codes) - 1, chunk):
+            block = codes[start:start + chunk + 1]
+            pairs += np.bincount(block[:-1] * 5 + block[1:], minlength=25)
+        pairs = pairs.reshape(5, 5)
+        if len(codes) == 0:
+            return cls(pairs)
+        return cls(pairs, int(codes[0]), int(codes[-1]))
+
+    @property
+    def gc(self):
+        return int(self.bases[_C] + self.bases[_G])
+
+    def molecular_weight(self, molecule='DNA', double_stranded=False, circular=False):
+        """Average molecular weight in g/mol, of one strand or of the duplex."""
+        _check_molecule(molecule)
+        if not self.length:
+            return 0.0
+        weights = WEIGHTS[molecule]
+        water = (self.length if circular else self.length - 1) * _WATER
+        weight = float(self.bases @ weights) - water
+        if double_stranded:
+            # the complement strand has the counts of A/T and of C/G swapped
+            weight += float(self.bases[::-1] @ weights) - water
+        return weight
+
+    def tm_wallace(self):
+        """Wallace rule, 4 C per G/C and 2 C per A/T (short oligos)."""
+        return 4.0 * self.gc + 2.0 * (self.length - self.gc)
+
+    def tm_gc(self, sodium_mm=SODIUM_MM):
+        """GC-content formula with a log-sodium correction (long duplexes)."""
+        return (81.5 + 0.41 * self.gc / self.length * 100 - 600 / self.length
+                + 16.6 * math.log10(sodium_mm * 1e-3))
+
+    def tm_nearest_neighbor(self, molecule='DNA', sodium_mm=SODIUM_MM, strand_nm=STRAND_NM):
+        """Two-state nearest-neighbor Tm of the perfect duplex with its complement."""
+        _check_molecule(molecule)
+        table = NN_TABLES[molecule]
+        stack_enthalpy, stack_entropy = _STACKS[molecule]
+        stacks = self.pairs[:4, :4]
+        enthalpy = float((stacks * stack_enthalpy).sum())
+        entropy = float((stacks * stack_entropy).sum())
+
+        terms = ['init', 'init_oneG/C' if self.gc else 'init_allA/T']
+        terms += ['init_5T/A'] * ((self.first == _T) + (self.last == _A))
+        terms += ['init_A/T' if end in (_A, _T) else 'init_G/C'
+                  for end in (self.first, self.last) if end < INVALID]
+        for term in terms:
+            enthalpy += table[term][0]
+            entropy += table[term][1]
+
+        entropy += 0.368 * (self.length - 1) * math.log(sodium_mm * 1e-3)
+        # both strands at strand_nm: the effective concentration is half of it
+        concentration = strand_nm / 2 * 1e-9
+        return 1000 * enthalpy / (entropy + _R * math.log(concentration)) - 273.15
+
+    def melting_temperatures(self, molecule='DNA', sodium_mm=SODIUM_MM, strand_nm=STRAND_NM):
+        """Tm (C) by each method, rounded; None for sequences under 2 bases and
+        for a method outside its length range (``WALLACE_MAX_LENGTH``, ``GC_MIN_LENGTH``)."""
+        if self.length < 2:
+            return {'wallace': None, 'gc': None, 'nearest_neighbor': None}
+        return {
+            'wallace': round(self.tm_wallace(), 1) if self.length <= WALLACE_MAX_LENGTH else None,
+            'gc': round(self.tm_gc(sodium_mm), 1) if self.length >= GC_MIN_LENGTH else None,
+            'nearest_neighbor': round(self.tm_nearest_neighbor(molecule, sodium_mm, strand_nm), 1)
+        }
+
+
+def physical_properties(sequence, molecule='DNA', double_stranded=False, circular=False,
+                        sodium_mm=SODIUM_MM, strand_nm=STRAND_NM):
+    """Molecular weight and melting temperatures of a sequence from one counting pass."""
+    _check_molecule(molecule)
+    if sodium_mm <= 0 or strand_nm <= 0:
+        raise ValueError("Sodium and strand concentrations must be positive")
+    counts = NucleotideCounts.from_sequence(sequence)
+    return {
+        'molecule': molecule,
+        'double_stranded': double_stranded,
+        'circular': circular,
+        'length': counts.length,
+        'gc_content': round(counts.gc / counts.length * 100, 2) if counts.length else 0,
+        'molecular_weight': round(counts.molecular_weight(molecule, double_stranded, circular), 2),
+        'melting_temperature': counts.melting_temperatures(molecule, sodium_mm, strand_nm),
+        'conditions': {'sodium_mm': sodium_mm, 'strand_nm': strand_nm}
+    }
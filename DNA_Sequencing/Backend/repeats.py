@@ -0,0 +1,189 @@
+"""Tandem repeats and low-complexity regions in one chunked pass.
+
+Tandem repeats (microsatellites) with a period p of 1-6 are runs where
+``base[i] == base[i + p]``; a run of r matches covers r + p bases.  Each
+period keeps its own open run across chunks, and a repeat is dropped when
+a shorter period dividing p already explains it (AAAA is reported once,
+as period 1, not again as period 2 or 4).
+
+Low-complexity regions are found DUST-style from triplet counts: the
+sequence is split into half-windows, each window of two half-windows is
+scored by the Shannon entropy of the triplets starting in it, and
+low-entropy windows are merged.  Extra memory is bounded by the chunk
+size plus the reported intervals.
+"""
+import numpy as np
+
+from encoded_sequence import INVALID, as_encoded
+
+MAX_PERIOD = 6
+MIN_REPEAT_LENGTH = 12
+MIN_COPIES = 3
+
+DUST_WINDOW = 64
+# windows whose triplet entropy (bits, out of a maximum of 6) is below this are low complexity
+ENTROPY_THRESHOLD = 3.0
+
+# at most this many repeats / intervals are listed (all are counted)
+MAX_REPORTED = 100
+
+_HALF = DUST_WINDOW // 2
+# bases per chunk, a multiple of the half window
+CHUNK_SIZE = _HALF << 15
+
+
+def _runs(mask):
+    """Start and end of each run of True in ``mask``."""
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def merge_intervals(intervals):
+    """Merge overlapping or touching ``(start, end)`` intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _explained_by_divisor(codes, start, end, period):
+    for d in range(1, period):
+        if period % d == 0 and np.array_equal(codes[start:end - d], codes[start + d:end]):
+            return True
+    return False
+
+
+# c * log2(c) for every count a window can hold
+_C_LOG_C = np.zeros(DUST_WINDOW + 1)
+_C_LOG_C[1:] = np.arange(1, DUST_WINDOW + 1) * np.log2(np.arange(1, DUST_WINDOW + 1))
+
+
+def _entropy(counts):
+    """Triplet entropy per row, as log2(T) - sum(c log2 c) / T."""
+    totals = counts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = np.log2(totals) - _C_LOG_C[counts].sum(axis=1) / totals
+    return np.where(totals > 0, entropy, 0.0), totals
+
+
+def scan(sequence, min_length=MIN_REPEAT_LENGTH, min_copies=MIN_COPIES,
+         entropy_threshold=ENTROPY_THRESHOLD, chunk_size=CHUNK_SIZE):
+    """Find tandem repeats and low-complexity intervals.
+
+    Returns ``(repeats, low_complexity)``: repeats as ``(start, end, period)``
+    tuples and low-complexity regions as merged ``[start, end]`` intervals.
+    """
+    codes = as_encoded(sequence).codes
+    n = len(codes)
+    chunk_size = max(_HALF, chunk_size // _HALF * _HALF)
+
+    candidates = []
+    open_starts = [None] * (MAX_PERIOD + 1)
+    low_windows = []
+    previous_half = None
+
+    for chunk_start in range(0, n, chunk_size):
+        chunk_end = min(n, chunk_start + chunk_size)
+        # the chunk and the two bases after it, for the last triplets
+        valid = codes[chunk_start:chunk_end + 2] < INVALID
+
+        # tandem repeats: runs of base[i] == base[i + p]
+        for period in range(1, MAX_PERIOD + 1):
+            stop = max(chunk_start, min(chunk_end, n - period))
+            ahead = codes[chunk_start + period:stop + period]
+            match = (codes[chunk_start:stop] == ahead) & valid[:stop - chunk_start]
+            carried, open_starts[period] = open_starts[period], None
+            if carried is not None and not (len(match) and match[0]):
+                candidates.append((carried, chunk_start + period, period))
+                carried = None
+            starts, ends = _runs(match)
+            # only runs long enough to report, or that may join a neighbouring chunk
+            need = max(min_length, min_copies * period) - period
+            keep = (ends - starts >= need) | (starts == 0) | (ends == len(match))
+            starts, ends = starts[keep], ends[keep]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                begin = carried if start == 0 and carried is not None else chunk_start + start
+                if end == len(match) and stop == chunk_end:
+                    # may continue into the next chunk
+                    open_starts[period] = begin
+                else:
+                    candidates.append((begin, chunk_start + end + period, period))
+
+        # low complexity: triplet counts per half window
+        stop = min(chunk_end, n - 2)
+        if stop > chunk_start:
+            window = codes[chunk_start:stop + 2].astype(np.int64)
+            triplets = window[:-2] * 16 + window[1:-1] * 4 + window[2:]
+            size = stop - chunk_start
+            ok = valid[:size] & valid[1:size + 1] & valid[2:size + 2]
+            halves = np.arange(chunk_start, stop)[ok] // _HALF
+            first = chunk_start // _HALF
+            n_halves = (stop - 1) // _HALF - first + 1
+            counts = np.bincount((halves - first) * 64 + triplets[ok],
+                                 minlength=n_halves * 64).reshape(n_halves, 64).astype(np.int16)
+            if previous_half is not None:
+                counts = np.vstack((previous_half, counts))
+                first -= 1
+            if len(counts) > 1:
+                entropy, totals = _entropy(counts[:-1] + counts[1:])
+                # windows that are mostly N are left to the cleaner's report
+                low = np.flatnonzero((entropy < entropy_threshold) & (totals >= DUST_WINDOW // 2))
+                low_windows.extend(((first + low) * _HALF).tolist())
+            previous_half = counts[-1:]
+
+    repeats = []
+    for start, end, period in sorted(candidates):
+        length = end - start
+        if length >= min_length and length >= min_copies * period \
+                and not _explained_by_divisor(codes, start, end, period):
+            repeats.append((start, end, period))
+
+    low_complexity = merge_intervals((s, min(s + DUST_WINDOW, n)) for s in low_windows)
+    return repeats, low_complexity
+
+
+def find_repeats(sequence, **options):
+    """Summary of tandem repeats and low-complexity regions for the analysis results."""
+    encoded = as_encoded(sequence)
+    repeats, low_complexity = scan(encoded, **options)
+    masked = merge_intervals([(s, e) for s, e, _ in repeats] + [tuple(i) for i in low_complexity])
+    length = len(encoded)
+    masked_bases = sum(e - s for s, e in masked)
+    return {
+        'tandem_repeats': {
+            'count': len(repeats),
+            'bases': sum(e - s for s, e in merge_intervals((s, e) for s, e, _ in repeats)),
+            'repeats': [
+                {
+                    'start': start,
+                    'end': end,
+                    'period': period,
+                    'unit': str(encoded[start:start + period]),
+                    'copies': round((end - start) / period, 1)
+                }
+                for start, end, period in repeats[:MAX_REPORTED]
+            ]
+        },
+        'low_complexity': {
+            'count': len(low_complexity),
+            'bases': sum(e - s for s, e in low_complexity),
+            'intervals': low_complexity[:MAX_REPORTED]
+        },
+        'masked_intervals': masked[:MAX_REPORTED],
+        'masked_bases': masked_bases,
+        'masked_percent': round(masked_bases / length * 100, 2) if length else 0
+    }
+
+
+def mask_sequence(sequence, hard=False, **options):
+    """The sequence with repeats and low-complexity regions in lowercase, or as N when ``hard``."""
+    encoded = as_encoded(sequence)
+    repeats, low_complexity = scan(encoded, **options)
+    masked = merge_intervals([(s, e) for s, e, _ in repeats] + [tuple(i) for i in low_complexity])
+    text = bytearray(str(encoded), 'ascii')
+    for start, end in masked:
+        text[start:end] = b'N' * (end - start) if hard else text[start:end].lower()
+    return text.decode('ascii')
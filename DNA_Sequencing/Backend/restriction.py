@@ -0,0 +1,291 @@
+"""Reverse-strand views, palindromes and restriction digest maps.
+
+The reverse complement is one lookup per base in a complement table
+(``EncodedSequence.reverse_complement``) and is kept on the sequence, so
+the palindrome scan and reverse-strand views share one buffer.  Recently
+queried sequences are kept encoded (``strands``), keyed on a digest of the
+text and bounded in total bases, so repeated queries against the same text
+skip both encoding and the reverse complement.
+
+Restriction sites (IUPAC, e.g. GANTC) are expanded to concrete sequences
+and, for non-palindromic sites, their reverse complements.  Every site
+of every enzyme is then matched against the k-mer ids of one walk over
+the sequence (``kmers.iter_kmer_windows``), whatever the number of
+enzymes, and the cut positions give the fragment sizes of each single
+digest and of the combined digest.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import kmers
+from encoded_sequence import INVALID, as_encoded
+from motif_search import expand_iupac, reverse_complement
+
+# name -> (recognition site, cut offset on the top strand from the start of the site)
+ENZYMES = {
+    'AluI': ('AGCT', 2),
+    'BamHI': ('GGATCC', 1),
+    'BglII': ('AGATCT', 1),
+    'BsaI': ('GGTCTC', 7),
+    'ClaI': ('ATCGAT', 2),
+    'DpnII': ('GATC', 0),
+    'EcoRI': ('GAATTC', 1),
+    'EcoRV': ('GATATC', 3),
+    'HaeIII': ('GGCC', 2),
+    'HindIII': ('AAGCTT', 1),
+    'HinfI': ('GANTC', 1),
+    'KpnI': ('GGTACC', 5),
+    'MspI': ('CCGG', 1),
+    'NcoI': ('CCATGG', 1),
+    'NdeI': ('CATATG', 2),
+    'NheI': ('GCTAGC', 1),
+    'NotI': ('GCGGCCGC', 2),
+    'PstI': ('CTGCAG', 5),
+    'SacI': ('GAGCTC', 5),
+    'SalI': ('GTCGAC', 1),
+    'SmaI': ('CCCGGG', 3),
+    'SpeI': ('ACTAGT', 1),
+    'TaqI': ('TCGA', 1),
+    'XbaI': ('TCTAGA', 1),
+    'XhoI': ('CTCGAG', 1),
+}
+
+# reverse-complement palindromes of these (even) lengths are reported;
+# longer ones are counted at MAX_PALINDROME
+MIN_PALINDROME = 6
+MAX_PALINDROME = 12
+# largest max_length accepted: the scan takes one pass per matching pair
+PALINDROME_LIMIT = 1000
+
+# at most this many palindromes / site positions / largest fragments are listed
+MAX_REPORTED = 100
+MAX_POSITIONS = 20
+MAX_FRAGMENTS = 10
+
+# upper bounds (exclusive) of the fragment size classes; the last class is open
+FRAGMENT_BINS = (100, 500, 1000, 5000, 10000)
+
+# recently queried sequences kept encoded with their reverse complement,
+# at most MAX_CACHED of them and MAX_CACHED_BASES bases in all
+MAX_CACHED = 8
+MAX_CACHED_BASES = 1 << 24
+
+_cached = OrderedDict()
+_cached_bases = 0
+_cached_lock = threading.Lock()
+
+
+def strands(sequence):
+    """``sequence`` encoded with non-ACGT bases removed.
+
+    For a string seen recently this is the same object as before, with the
+    reverse complement it already built.  The cache is keyed on a digest,
+    so it does not keep the strings themselves.
+    """
+    global _cached_bases
+    if not isinstance(sequence, str):
+        return as_encoded(sequence).cleaned()
+    key = hashlib.sha256(sequence.encode('utf-8', 'surrogatepass')).digest()
+    with _cached_lock:
+        encoded = _cached.get(key)
+        if encoded is not None:
+            _cached.move_to_end(key)
+            return encoded
+    encoded = as_encoded(sequence).cleaned()
+    if len(encoded) <= MAX_CACHED_BASES:
+        with _cached_lock:
+            if key not in _cached:
+                _cached[key] = encoded
+                _cached_bases += len(encoded)
+            while len(_cached) > MAX_CACHED or _cached_bases > MAX_CACHED_BASES:
+                _cached_bases -= len(_cached.popitem(last=False)[1])
+    return encoded
+
+
+def parse_enzymes(enzymes=None):
+    """Enzyme table from a list of names in ``ENZYMES``, or a dict of
+    ``{name: site}`` / ``{name: [site, cut]}`` entries (a missing cut is
+    taken as the middle of the site)."""
+    if enzymes is None:
+        return dict(ENZYMES)
+    table = {}
+    if isinstance(enzymes, dict):
+        for name, spec in enzymes.items():
+            if isinstance(spec, str):
+                site, cut = spec, None
+            elif isinstance(spec, (list, tuple)) and len(spec) == 2:
+                site, cut = spec
+            else:
+                raise ValueError(f"Enzyme {name!r} must be a site or [site, cut]")
+            site = str(site).upper()
+            if not 1 <= len(site) <= kmers.MAX_K:
+                raise ValueError(f"Site of {name!r} must have 1 to {kmers.MAX_K} bases")
+            expand_iupac(site)
+            table[str(name)] = (site, len(site) // 2 if cut is None else int(cut))
+    else:
+        by_name = {name.lower(): name for name in ENZYMES}
+        for name in enzymes:
+            known = by_name.get(str(name).lower())
+            if known is None:
+                raise ValueError(f"Unknown enzyme: {name}")
+            table[known] = ENZYMES[known]
+    if not table:
+        raise ValueError("No enzymes given")
+    return table
+
+
+def _compile(enzymes):
+    """Site ids by length: ``{k: (sorted ids, [(enzyme, strand), ...] per id)}``."""
+    by_length = {}
+    for name, (site, _) in enzymes.items():
+        forward = expand_iupac(site)
+        concrete = [(p, '+') for p in forward]
+        # palindromic expansions are already found on the forward strand
+        forward_set = set(forward)
+        concrete += [(reverse_complement(p), '-') for p in forward
+                     if reverse_complement(p) not in forward_set]
+        for pattern, strand in concrete:
+            kmer_id = 0
+            for base in pattern:
+                kmer_id = kmer_id * 4 + 'ACGT'.index(base)
+            owners = by_length.setdefault(len(pattern), {}).setdefault(kmer_id, [])
+            if (name, strand) not in owners:
+                owners.append((name, strand))
+    return {
+        k: (np.array(sorted(ids), dtype=np.int64), [ids[i] for i in sorted(ids)])
+        for k, ids in by_length.items()
+    }
+
+
+def find_sites(sequence, enzymes):
+    """``{enzyme: [(site starts, strand, site length), ...]}`` for an enzyme table."""
+    sites = {name: [] for name in enzymes}
+    tables = _compile(enzymes)
+    for k, ids, valid in kmers.iter_kmer_windows(sequence, list(tables)):
+        site_ids, owners = tables[k]
+        slots = np.minimum(np.searchsorted(site_ids, ids), len(site_ids) - 1)
+        positions = np.flatnonzero(valid & (site_ids[slots] == ids))
+        slots = slots[positions]
+        order = np.argsort(slots, kind='stable')
+        bounds = np.searchsorted(slots[order], np.arange(len(site_ids) + 1))
+        for slot, slot_owners in enumerate(owners):
+            starts = positions[order[bounds[slot]:bounds[slot + 1]]]
+            if len(starts):
+                for name, strand in slot_owners:
+                    sites[name].append((starts, strand, k))
+    return sites
+
+
+def fragment_sizes(cuts, length):
+    """Summary of the fragments left by sorted, unique cut positions."""
+    sizes = np.diff(np.concatenate(([0], cuts, [length])).astype(np.int64))
+    edges = (0,) + FRAGMENT_BINS + (max(length, FRAGMENT_BINS[-1]) + 1,)
+    histogram, _ = np.histogram(sizes, bins=edges)
+    labels = [f'<{FRAGMENT_BINS[0]}']
+    labels += [f'{lo}-{hi - 1}' for lo, hi in zip(FRAGMENT_BINS, FRAGMENT_BINS[1:])]
+    labels += [f'>={FRAGMENT_BINS[-1]}']
+    return {
+        'count': len(sizes),
+        'min': int(sizes.min()),
+        'max': int(sizes.max()),
+        'mean': round(float(sizes.mean()), 1),
+        'median': float(np.median(sizes)),
+        'largest': np.sort(sizes)[::-1][:MAX_FRAGMENTS].tolist(),
+        'distribution': dict(zip(labels, histogram.tolist()))
+    }
+
+
+def digest(sequence, enzymes=None, max_positions=MAX_POSITIONS):
+    """Sites, cut positions and fragment sizes for each enzyme and for all of them together."""
+    encoded = as_encoded(sequence)
+    length = len(encoded)
+    table = parse_enzymes(enzymes)
+    sites = find_sites(encoded, table)
+
+    cutters = {}
+    all_cuts = []
+    for name, (site, cut) in table.items():
+        found = sites[name]
+        if not found:
+            continue
+        forward = sum(len(starts) for starts, strand, _ in found if strand == '+')
+        reverse = sum(len(starts) for starts, strand, _ in found if strand == '-')
+        # the cut offset is read on the strand the site was found on
+        cuts = np.unique(np.concatenate([
+            starts + cut if strand == '+' else starts + k - cut for starts, strand, k in found
+        ]))
+        cuts = cuts[(cuts > 0) & (cuts < length)]
+        positions = np.sort(np.concatenate([starts for starts, _, _ in found]))
+        cutters[name] = {
+            'site': site,
+            'cut': cut,
+            'count': forward + reverse,
+            'forward_count': forward,
+            'reverse_count': reverse,
+            'positions': positions[:max_positions].tolist(),
+            'fragments': fragment_sizes(cuts, length)
+        }
+        all_cuts.append(cuts)
+
+    combined = np.unique(np.concatenate(all_cuts)) if all_cuts else np.zeros(0, dtype=np.int64)
+    return {
+        'enzymes_searched': len(table),
+        'cutters': cutters,
+        'non_cutters': sorted(name for name in table if name not in cutters),
+        'digest': {
+            'enzymes': list(cutters),
+            'cuts': len(combined),
+            'fragments': fragment_sizes(combined, length)
+        }
+    }
+
+
+def find_palindromes(sequence, min_length=MIN_PALINDROME, max_length=MAX_PALINDROME,
+                     max_reported=MAX_REPORTED):
+    """Reverse-complement palindromes (e.g. GAATTC), the longest one at each centre."""
+    if min_length < 2 or min_length % 2 or not min_length <= max_length <= PALINDROME_LIMIT:
+        raise ValueError("Palindrome lengths must be even, with "
+                         f"2 <= min_length <= max_length <= {PALINDROME_LIMIT}")
+    encoded = as_encoded(sequence)
+    codes = encoded.codes
+    n = len(codes)
+    # complement[i] is the base paired with codes[i]
+    complement = encoded.reverse_complement().codes[::-1]
+
+    # centre j sits between bases j and j + 1; arm[j] counts matching pairs outwards
+    centres = max(n - 1, 0)
+    arm = np.zeros(centres, dtype=np.int32)
+    alive = np.ones(centres, dtype=bool)
+    for k in range(max_length // 2):
+        span = n - 1 - 2 * k
+        if span <= 0:
+            break
+        match = np.zeros(centres, dtype=bool)
+        match[k:k + span] = (complement[:span] == codes[2 * k + 1:]) & (codes[2 * k + 1:] < INVALID)
+        alive &= match
+        arm += alive
+
+    found = np.flatnonzero(arm >= min_length // 2)
+    lengths = 2 * arm[found].astype(np.int64)
+    starts = found + 1 - lengths // 2
+    by_length = np.bincount(lengths, minlength=max_length + 1)
+    return {
+        'count': len(found),
+        'by_length': {str(size): int(by_length[size]) for size in range(min_length, max_length + 1, 2)},
+        'palindromes': [
+            {'start': start, 'end': start + size, 'length': size, 'sequence': str(encoded[start:start + size])}
+            for start, size in zip(starts[:max_reported].tolist(), lengths[:max_reported].tolist())
+        ]
+    }
+
+
+def restriction_map(sequence, enzymes=None, min_palindrome=MIN_PALINDROME,
+                    max_palindrome=MAX_PALINDROME, max_positions=MAX_POSITIONS):
+    """Digest map and palindromes of a sequence, sharing its reverse complement."""
+    encoded = as_encoded(sequence)
+    results = digest(encoded, enzymes, max_positions=max_positions)
+    results['palindromes'] = find_palindromes(encoded, min_palindrome, max_palindrome)
+    return results
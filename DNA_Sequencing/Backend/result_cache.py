@@ -0,0 +1,151 @@
+"""Content-addressed cache for analysis results.
+
+Results are keyed by a hash of the cleaned sequence and its raw length
+(or of an uploaded file's bytes) plus the analysis options.  Lookups go to an in-process LRU
+first and then, if configured, to an sqlite file that survives restarts.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from encoded_sequence import as_encoded
+
+logger = logging.getLogger(__name__)
+
+# bump when the shape of analysis results changes so old disk entries are ignored
+CACHE_VERSION = 8
+
+
+def _options_digest(options):
+    return json.dumps({'v': CACHE_VERSION, 'options': options or {}}, sort_keys=True).encode('utf-8')
+
+
+def sequence_key(sequence, options=None):
+    """Cache key for a sequence: its cleaned bases, its raw length and the analysis options.
+
+    The raw length is part of the key because results report it
+    (``sequence_info.original_length``).
+    """
+    digest = hashlib.sha256(as_encoded(sequence).cleaned().codes.tobytes())
+    digest.update(f'|{len(sequence)}|'.encode('ascii'))
+    digest.update(_options_digest(options))
+    return 'seq:' + digest.hexdigest()
+
+
+def file_key(filepath, options=None, block_size=1 << 20):
+    """Cache key for an uploaded file, hashed in blocks."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    digest.update(_options_digest(options))
+    return 'file:' + digest.hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU with TTL and an optional sqlite tier."""
+
+    def __init__(self, max_entries=256, ttl=3600, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as db:
+                db.execute('CREATE TABLE IF NOT EXISTS results '
+                           '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._stats['memory_hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['evictions'] += 1
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            self._store(key, value, time.time())
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+        self._disk_set(key, value, now)
+
+    def _store(self, key, value, created):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _disk_get(self, key):
+        if not self.path:
+            return None
+        try:
+            with self._connect() as db:
+                row = db.execute('SELECT value, created FROM results WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                if self._expired(row[1]):
+                    db.execute('DELETE FROM results WHERE key = ?', (key,))
+                    return None
+                return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Result cache read failed: {str(e)}")
+            return None
+
+    def _disk_set(self, key, value, created):
+        if not self.path:
+            return
+        try:
+            with self._connect() as db:
+                db.execute('INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)',
+                           (key, json.dumps(value), created))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Result cache write failed: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connect() as db:
+                db.execute('DELETE FROM results')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        stats['disk'] = bool(self.path)
+        return stats
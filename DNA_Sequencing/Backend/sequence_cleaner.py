@@ -0,0 +1,146 @@
+"""Single-pass, chunked cleaning and validation of raw sequence text.
+
+Chunks are stripped of whitespace with ``bytes.translate`` and encoded
+straight into a preallocated code array, so cleaning a large input never
+holds more than the input-sized output plus one chunk.  Along the way the
+cleaner reports N runs, soft-masked (lowercase) regions and any characters
+that are not nucleotides.  Coordinates are positions in the sequence with
+whitespace removed.
+"""
+import os
+
+import numpy as np
+
+from encoded_sequence import BASE_CODES, INVALID, EncodedSequence
+
+WHITESPACE = b' \t\r\n\v\f'
+NUCLEOTIDES = b'ACGTNacgtn'
+
+# at most this many N runs / masked regions are listed (all are counted)
+MAX_INTERVALS = 100
+
+_IS_N = np.zeros(256, dtype=bool)
+_IS_N[[ord('N'), ord('n')]] = True
+_IS_LOWER = np.zeros(256, dtype=bool)
+_IS_LOWER[[ord(c) for c in 'acgtn']] = True
+
+
+def _to_bytes(chunk):
+    return chunk.encode('ascii', 'replace') if isinstance(chunk, str) else bytes(chunk)
+
+
+def count_invalid(sequence):
+    """Number of characters that are neither nucleotides (ACGTN) nor whitespace."""
+    return len(_to_bytes(sequence).translate(None, NUCLEOTIDES + WHITESPACE))
+
+
+class _RunTracker:
+    """Collect runs of True in a boolean stream split across chunks."""
+
+    def __init__(self):
+        self.intervals = []
+        self.count = 0
+        self.total = 0
+        self._open_start = None
+
+    def update(self, mask, offset):
+        if not len(mask):
+            return
+        self.total += int(mask.sum())
+        # a run left open by the previous chunk continues only if this one starts inside it
+        if self._open_start is not None and not mask[0]:
+            self._close(self._open_start, offset)
+        edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if start == 0 and self._open_start is not None:
+                begin = self._open_start
+            else:
+                begin = offset + start
+            self._open_start = None
+            if end == len(mask):
+                self._open_start = begin
+            else:
+                self._close(begin, offset + end)
+
+    def _close(self, start, end):
+        self.count += 1
+        if len(self.intervals) < MAX_INTERVALS:
+            self.intervals.append([start, end])
+        self._open_start = None
+
+    def finish(self, length):
+        if self._open_start is not None:
+            self._close(self._open_start, length)
+
+    def as_dict(self):
+        return {'count': self.count, 'bases': self.total, 'intervals': self.intervals}
+
+
+class SequenceCleaner:
+    """Feed raw text chunks; get an ACGT-only EncodedSequence and a report."""
+
+    def __init__(self, size_hint=None):
+        self._codes = np.empty(size_hint, dtype=np.uint8) if size_hint else None
+        self._parts = []
+        self._kept = 0
+        self.length = 0
+        self.invalid = 0
+        self._n_runs = _RunTracker()
+        self._masked = _RunTracker()
+
+    def update(self, chunk):
+        data = _to_bytes(chunk).translate(None, WHITESPACE)
+        if not data:
+            return
+        raw = np.frombuffer(data, dtype=np.uint8)
+        self._n_runs.update(_IS_N[raw], self.length)
+        self._masked.update(_IS_LOWER[raw], self.length)
+        self.invalid += len(data.translate(None, NUCLEOTIDES))
+        self.length += len(data)
+
+        codes = BASE_CODES[raw]
+        codes = codes[codes < INVALID]
+        if self._codes is not None and self._kept + len(codes) <= len(self._codes):
+            self._codes[self._kept:self._kept + len(codes)] = codes
+        else:
+            if self._codes is not None:
+                # size hint was too small: fall back to collecting parts
+                self._parts.append(self._codes[:self._kept])
+                self._codes = None
+            self._parts.append(codes)
+        self._kept += len(codes)
+
+    def finish(self):
+        """Return ``(EncodedSequence, report)``."""
+        self._n_runs.finish(self.length)
+        self._masked.finish(self.length)
+        if self._codes is not None:
+            codes = self._codes[:self._kept]
+        elif self._parts:
+            codes = np.concatenate(self._parts)
+        else:
+            codes = np.empty(0, dtype=np.uint8)
+        report = {
+            'input_length': self.length,
+            'valid_bases': int(self._kept),
+            'invalid_characters': self.invalid,
+            'n_runs': self._n_runs.as_dict(),
+            'masked_regions': self._masked.as_dict()
+        }
+        return EncodedSequence(codes), report
+
+
+def clean_chunks(chunks, size_hint=None):
+    """Clean an iterable of text chunks in one pass; returns ``(EncodedSequence, report)``."""
+    cleaner = SequenceCleaner(size_hint)
+    for chunk in chunks:
+        cleaner.update(chunk)
+    return cleaner.finish()
+
+
+def clean_file(filepath, chunk_size=1 << 20):
+    """Clean a raw sequence file in chunks, preallocating for its size."""
+    with open(filepath, 'rb') as f:
+        return clean_chunks(iter(lambda: f.read(chunk_size), b''), size_hint=os.path.getsize(filepath))
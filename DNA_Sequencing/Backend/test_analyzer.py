@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from analyzer import (PROTEIN_PREVIEW_LENGTH, RNA_PREVIEW_LENGTH, DNAAnalyzer, SequenceSummary,
+                      get_analyzer, resolve_fields)
+
+
+def test_analyze_from_file_analyzes_first_record_and_summarizes_all(tmp_path):
+    path = tmp_path / 'records.fasta'
+    path.write_text('>first one\nATGCNNATGC\nGGCC\n>second\nATATATATATAT\n')
+
+    results = DNAAnalyzer().analyze_from_file(str(path))
+
+    assert results['file_info']['sequence_id'] == 'first'
+    assert results['sequence_info']['length'] == 12
+    assert results['sequence_info']['original_length'] == 14
+    summary = results['file_info']['summary']
+    assert results['file_info']['total_sequences'] == 2
+    assert summary['total_bases'] == 24
+    assert summary['min_length'] == 12 and summary['max_length'] == 12
+
+
+def test_iter_analyze_file_analyzes_every_record(tmp_path):
+    path = tmp_path / 'records.fasta'
+    path.write_text('>a\nATGCATGCAAGG\n>b\nNNNN\n>c\nGGGGCCCCAT\n')
+
+    summary = SequenceSummary()
+    results = list(DNAAnalyzer().iter_analyze_file(str(path), summary))
+
+    assert [r['file_info']['sequence_id'] for r in results] == ['a', 'b', 'c']
+    assert 'error' in results[1]
+    assert [r['sequence_info']['length'] for r in (results[0], results[2])] == [12, 10]
+    assert summary.count == 2 and summary.total_bases == 22
+
+
+def test_analyze_many_matches_sequential_analysis():
+    rng = random.Random(8)
+    records = [''.join(rng.choice('ACGT') for _ in range(rng.randint(50, 500))) for _ in range(20)]
+    records[7] = 'NNNN'
+    analyzer = DNAAnalyzer()
+
+    expected = [analyzer.analyze_record(record, index) for index, record in enumerate(records)]
+    ordered = list(analyzer.analyze_many(records, workers=2, chunksize=3))
+    unordered = list(analyzer.analyze_many(records, workers=2, chunksize=3, ordered=False))
+
+    assert ordered == expected
+    assert sorted(unordered, key=lambda r: r['file_info']['record_index']) == expected
+    assert 'error' in ordered[7]
+
+
+def test_requested_fields_only():
+    sequence = 'ATGGCCATTGTAATGGGCCGCTGAAAGGGTGCCCGATAG' * 5
+    analyzer = DNAAnalyzer()
+    full = analyzer.analyze_sequence(sequence)
+
+    partial = analyzer.analyze_sequence(sequence, fields=resolve_fields(['gc_content', 'statistics']))
+    assert set(partial) == {'sequence_info', 'gc_content', 'statistics'}
+    assert partial['gc_content'] == full['gc_content']
+    assert 'molecular_weight' not in partial['statistics']
+    assert 'molecular_weight' in full['statistics']
+
+    excluded = analyzer.analyze_sequence(sequence, fields=resolve_fields(exclude=['translation', 'motifs']))
+    assert set(full) - set(excluded) == {'translation', 'motifs'}
+    with pytest.raises(ValueError):
+        resolve_fields(['gc_content', 'nope'])
+
+
+def test_shared_analyzer_is_warm_and_translates_like_biopython():
+    from Bio.Seq import Seq
+
+    analyzer = get_analyzer()
+    assert get_analyzer() is analyzer
+    assert analyzer._motif_automata
+
+    rng = random.Random(9)
+    sequence = ''.join(rng.choice('ACGT') for _ in range(1000))
+    translation = analyzer.translate_sequence(sequence)
+    assert translation['protein'] == str(Seq(sequence[:PROTEIN_PREVIEW_LENGTH * 3]).translate())
+    assert translation['rna'] == sequence[:RNA_PREVIEW_LENGTH].replace('T', 'U')
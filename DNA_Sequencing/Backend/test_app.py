@@ -0,0 +1,40 @@
+import json
+
+import app as app_module
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_streams_one_line_per_item():
+    client = app_module.app.test_client()
+    response = client.post('/api/analyze/batch', json={
+        'sequences': ['ATGCATGCGGCC', {'id': 'two', 'sequence': 'GGGGCCCCAAAT'}, 42, {'id': 'empty', 'sequence': ''}],
+        'fields': ['gc_content']
+    })
+    assert response.mimetype == 'application/x-ndjson'
+    lines = _lines(response)
+    assert [line['index'] for line in lines] == [0, 1, 2, 3]
+    assert lines[0]['id'] == 'Sequence_1' and lines[1]['id'] == 'two'
+    assert set(lines[0]['result']) == {'sequence_info', 'gc_content'}
+    assert lines[1]['result']['gc_content'] == round(8 / 12 * 100, 2)
+    assert 'error' in lines[2] and 'error' in lines[3]
+
+
+def test_batch_accepts_ndjson_bodies():
+    client = app_module.app.test_client()
+    body = '{"id": "a", "sequence": "ATATATATGCGC"}\nnot json\n\n"GGCCGGCCAATT"\n'
+    response = client.post('/api/analyze/batch?fields=composition', data=body,
+                           content_type='application/x-ndjson')
+    lines = _lines(response)
+    assert len(lines) == 3
+    assert lines[0]['id'] == 'a' and set(lines[0]['result']) == {'sequence_info', 'composition'}
+    assert 'error' in lines[1]
+    assert lines[2]['result']['composition']['G'] == round(4 / 12 * 100, 2)
+
+
+def test_batch_rejects_bad_options():
+    client = app_module.app.test_client()
+    assert client.post('/api/analyze/batch', json={'sequences': 'ACGT'}).status_code == 400
+    assert client.post('/api/analyze/batch', json={'sequences': [], 'fields': ['nope']}).status_code == 400
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import benchmark
+import orf_finder
+from encoded_sequence import EncodedSequence
+
+
+def test_parse_size():
+    assert [benchmark.parse_size(s) for s in ('2500', '1k', '1.5M', '2g')] == [2500, 1000, 1500000, 2 * 10 ** 9]
+
+
+def test_synthetic_sequence_gc_and_stop_density():
+    sequence = benchmark.synthetic_sequence(200000, gc=0.6, seed=1)
+    assert (sequence.count('G') + sequence.count('C')) / len(sequence) == pytest.approx(0.6, abs=0.01)
+
+    no_stops = benchmark.synthetic_sequence(30000, stops_per_kb=0, seed=2)
+    ids = orf_finder.codon_ids(EncodedSequence.from_string(no_stops).codes)
+    stop_ids = [orf_finder.codon_id(codon) for codon in orf_finder.STOP_CODONS]
+    assert not set(ids.tolist()) & set(stop_ids)
+
+
+def _entry(name, rate, peak):
+    return {'case': 'c', 'name': name, 'bases_per_second': rate, 'peak_memory_bytes': peak}
+
+
+def test_compare_flags_only_changes_past_the_thresholds():
+    baseline = {'results': [_entry('a', 100.0, 1000), _entry('b', 100.0, 1000), _entry('c', 100.0, 1000)]}
+    results = [_entry('a', 85.0, 1100), _entry('b', 70.0, 1000), _entry('c', 100.0, 1600), _entry('new', 1.0, 1)]
+    assert [(r['name'], r['metric']) for r in benchmark.compare(results, baseline, 0.2)] == \
+        [('b', 'bases_per_second')]
+    flagged = benchmark.compare(results, baseline, 0.2, memory_threshold=0.5)
+    assert [(r['name'], r['metric']) for r in flagged] == [('b', 'bases_per_second'), ('c', 'peak_memory_bytes')]
+
+
+def test_main_writes_results_and_fails_on_a_regression(tmp_path, capsys):
+    path = tmp_path / 'baseline.json'
+    assert benchmark.main(['--sizes', '1k', '--no-data', '--repeat', '1', '--json', str(path)]) == 0
+    report = json.loads(path.read_text())
+    names = {r['name'] for r in report['results']}
+    assert {'find_orfs', 'analyze_sequence', 'analyze_from_file'} <= names
+
+    for entry in report['results']:
+        entry['bases_per_second'] *= 1000
+    path.write_text(json.dumps(report))
+    assert benchmark.main(['--sizes', '1k', '--no-data', '--repeat', '1', '--compare', str(path)]) == 1
+    assert 'regression(s)' in capsys.readouterr().out
@@ -0,0 +1,106 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqUtils.ProtParam import ProteinAnalysis
+
+import codon_usage
+from motif_search import reverse_complement
+from orf_finder import STOP_CODONS
+
+
+def _records(count=6, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        sequence = ''.join(rng.choice('ACGT') for _ in range(rng.randint(200, 3000)))
+        if i % 3 == 0:
+            sequence = sequence[:100] + 'NN' + sequence[100:]
+        records.append((f'r{i}', sequence))
+    return records
+
+
+def _brute_totals(records, min_length):
+    """Codons (stop included) of the outermost ATG..stop ORFs; invalid bases break ORFs."""
+    totals = Counter()
+    for _, sequence in records:
+        for text in (sequence, reverse_complement(sequence)):
+            for frame in range(3):
+                start = None
+                for i in range(frame, len(text) - 2, 3):
+                    codon = text[i:i + 3]
+                    if codon in STOP_CODONS or 'N' in codon:
+                        if start is not None and 'N' not in codon and i + 3 - start >= min_length:
+                            totals.update(text[j:j + 3] for j in range(start, i + 3, 3))
+                        start = None
+                    elif codon == 'ATG' and start is None:
+                        start = i
+    return totals
+
+
+def test_codon_totals_match_brute_force():
+    records = _records()
+    result = codon_usage.codon_usage(records, min_length=60)
+    counts = {codon: entry['count'] for codon, entry in result['codons'].items() if entry['count']}
+    assert counts == _brute_totals(records, 60)
+
+
+def _position(orf):
+    return orf['record'], orf['strand'], orf['start']
+
+
+def test_batching_does_not_change_the_result():
+    records = _records(seed=1)
+    batched = codon_usage.codon_usage(records, batch_bases=500, top_n=None)
+    whole = codon_usage.codon_usage(records, top_n=None)
+    # equally long ORFs are listed in scan order, which depends on the batches
+    assert sorted(batched.pop('orfs'), key=_position) == sorted(whole.pop('orfs'), key=_position)
+    assert batched == whole
+
+
+def test_protein_properties_match_biopython():
+    rng = random.Random(3)
+    orf = 'ATG' + ''.join(rng.choice([c for c in codon_usage.CODONS if c not in STOP_CODONS])
+                          for _ in range(120)) + 'TAA'
+    [found] = codon_usage.codon_usage([('orf', 'CC' + orf + 'GG')], min_length=len(orf), top_n=1)['orfs']
+    protein = ProteinAnalysis(str(Seq(orf).translate(to_stop=True)))
+    assert (found['start'], found['end']) == (2, 2 + len(orf))
+    assert found['protein']['length'] == 121
+    assert found['protein']['molecular_weight'] == pytest.approx(protein.molecular_weight(), abs=0.01)
+    assert found['protein']['isoelectric_point'] == pytest.approx(protein.isoelectric_point(), abs=0.01)
+    assert found['protein']['gravy'] == pytest.approx(protein.gravy(), abs=0.001)
+    assert found['protein']['aromaticity'] == pytest.approx(protein.aromaticity(), abs=0.0001)
+
+
+def test_rscu_and_cai():
+    counts = np.zeros(64)
+    for codon in ('GCT', 'GCC', 'GCA', 'GCG'):
+        counts[codon_usage.codon_id(codon)] = 5
+    counts[codon_usage.codon_id('AAA')] = 3
+    rscu = codon_usage.rscu(counts)
+    assert rscu[codon_usage.codon_id('GCA')] == 1.0
+    assert rscu[codon_usage.codon_id('AAA')] == 2.0 and rscu[codon_usage.codon_id('AAG')] == 0.0
+    # every codon is the most used of its family in its own reference
+    assert codon_usage.cai(counts[None, :], counts)[0] == pytest.approx(1.0)
+
+
+def test_top_n_zero_keeps_no_orfs():
+    records = _records(seed=2)
+    result = codon_usage.codon_usage(records, top_n=0)
+    assert result['orfs'] == []
+    assert result['orfs_analyzed'] == codon_usage.codon_usage(records, top_n=None)['orfs_analyzed']
+    with pytest.raises(ValueError):
+        codon_usage.CodonUsage(top_n=-1)
+
+
+def test_codon_usage_route_checks_top_n():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    sequence = 'ATG' + 'GCC' * 40 + 'TAA'
+    response = client.post('/api/codon_usage', json={'sequence': sequence, 'top_n': 0})
+    assert response.status_code == 200
+    assert response.get_json()['orfs'] == []
+    assert client.post('/api/codon_usage', json={'sequence': sequence, 'top_n': -1}).status_code == 400
@@ -0,0 +1,30 @@
+import gc
+import weakref
+
+from encoded_sequence import EncodedSequence
+
+
+def test_counts_and_cleaning_match_the_string():
+    text = 'ATGCNNatgcRYGGCC'
+    encoded = EncodedSequence.from_string(text)
+    upper = text.upper()
+    assert [int(c) for c in encoded.counts[:4]] == [upper.count(b) for b in 'ACGT']
+    assert str(encoded.cleaned()) == ''.join(b for b in upper if b in 'ACGT')
+    assert encoded.gc_content() == (upper.count('G') + upper.count('C')) / len(text) * 100
+
+
+def test_reverse_complement_is_cached_without_a_reference_cycle():
+    forward = EncodedSequence.from_string('AACGTTTG')
+    reverse = forward.reverse_complement()
+    assert str(reverse) == 'CAAACGTT'
+    assert forward.reverse_complement() is reverse
+    assert reverse.reverse_complement() is forward
+
+    gc.disable()
+    try:
+        alive = weakref.ref(forward)
+        del forward, reverse
+        # freed by reference counting alone, without the cycle collector
+        assert alive() is None
+    finally:
+        gc.enable()
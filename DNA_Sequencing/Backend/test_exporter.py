@@ -0,0 +1,102 @@
+import csv
+import io
+import re
+import zlib
+
+import exporter
+
+
+def _result(i):
+    return {
+        'id': f'r{i}',
+        'sequence_info': {'length': 100 + i},
+        'gc_content': 50.0,
+        'composition': {'A': 25.0, 'C': 25.0, 'G': 25.0, 'T': 25.0},
+        'statistics': {'at_content': 50.0, 'summary': 'ignored'},
+    }
+
+
+def test_csv_has_one_row_per_record():
+    text = ''.join(exporter.export([_result(0), _result(1)], 'csv'))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [row['sequence_id'] for row in rows] == ['r0', 'r1']
+    assert [row['length'] for row in rows] == ['100', '101']
+
+
+def test_csv_version_1_keeps_the_property_value_layout():
+    text = ''.join(exporter.export([_result(0)], 'csv', version=1))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[:3] == [['Property', 'Value'], ['Sequence Length', '100'], ['GC Content', '50.0%']]
+    assert ['At Content', '50.0'] in rows
+    assert not any(row[0] == 'Summary' for row in rows)
+
+
+def test_pdf_pages_are_yielded_before_all_results_are_read():
+    consumed = []
+
+    def results():
+        for i in range(500):
+            consumed.append(i)
+            yield _result(i)
+
+    pieces = exporter.iter_pdf(results())
+    next(pieces)
+    next(pieces)
+    assert 0 < len(consumed) < 100
+
+    b''.join(pieces)
+    assert len(consumed) == 500
+
+
+def test_pdf_cross_reference_offsets_point_at_objects():
+    data = b''.join(exporter.iter_pdf(_result(i) for i in range(120)))
+    assert data.startswith(b'%PDF-1.4') and data.endswith(b'%%EOF\n')
+    start = int(re.search(rb'startxref\n(\d+)', data).group(1))
+    assert data[start:].startswith(b'xref\n')
+    entries = re.findall(rb'(\d{10}) 00000 n ', data[start:])
+    for number, offset in enumerate(entries, 1):
+        assert data[int(offset):].startswith(b'%d 0 obj' % number)
+    assert b'/Count 3' in data
+
+
+def test_export_route_versions():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    response = client.post('/export/csv?version=1', json=_result(0))
+    assert response.headers['X-Export-Version'] == '1'
+    assert response.get_data(as_text=True).startswith('Property,Value')
+    assert client.post('/export/csv?version=9', json=_result(0)).status_code == 400
+
+
+def test_export_route_default_versions():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    # a single result keeps the layout existing clients parse
+    response = client.post('/export/csv', json=_result(0))
+    assert response.headers['X-Export-Version'] == '1'
+    assert response.get_data(as_text=True).startswith('Property,Value')
+    response = client.post('/export/csv?version=2', json=_result(0))
+    assert response.get_data(as_text=True).startswith('sequence_id,')
+    response = client.post('/export/csv', json=[_result(0), _result(1)])
+    assert response.headers['X-Export-Version'] == '2'
+    assert len(list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))) == 2
+
+
+def _pdf_text(data):
+    streams = re.findall(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', data, re.S)
+    return b''.join(zlib.decompress(stream) for stream in streams)
+
+
+def test_pdf_of_a_single_result_has_its_statistics():
+    result = _result(0)
+    result['statistics'].update({'molecular_weight': 30890.1,
+                                 'melting_temperature': {'wallace': None, 'nearest_neighbor': 61.2}})
+    text = _pdf_text(b''.join(exporter.iter_pdf([result])))
+    assert b'(Statistics)' in text
+    assert b'(At Content: 50.0)' in text
+    assert b'(Molecular Weight: 30890.1)' in text
+    assert b'(Melting Temperature \\(nearest neighbor\\): 61.2)' in text
+    assert b'Summary' not in text and b'wallace' not in text
+    assert b'Statistics' not in _pdf_text(b''.join(exporter.iter_pdf([_result(0), _result(1)])))
@@ -0,0 +1,42 @@
+import itertools
+
+import numpy as np
+
+import expression
+
+
+def _matrix(samples=12, genes=9, seed=2):
+    values = np.random.default_rng(seed).normal(size=(samples, genes)).astype(np.float32)
+    return expression.ExpressionMatrix(values, [f'g{i}' for i in range(genes)])
+
+
+def test_top_correlations_match_brute_force():
+    matrix = _matrix()
+    r = np.corrcoef(matrix.values.astype(np.float64), rowvar=False)
+    expected = sorted(itertools.combinations(range(9), 2), key=lambda pair: -abs(r[pair]))[:5]
+    top = matrix.top_correlations(5, block=2)
+    assert [(i, j) for _, i, j in top] == expected
+    assert np.allclose([value for value, _, _ in top], [r[pair] for pair in expected], atol=1e-5)
+
+
+def test_no_pairs_requested():
+    matrix = _matrix()
+    assert matrix.top_correlations(0) == []
+    assert matrix.top_correlations(-3) == []
+    assert expression.summarize(matrix, top_pairs=0)['top_correlated_pairs'] == []
+
+
+def test_expression_route_checks_top_pairs(tmp_path, monkeypatch):
+    import app as app_module
+
+    lines = ['class,' + ','.join(f'g{i}' for i in range(4))]
+    lines += [f'{i % 2},' + ','.join(str((i * 7 + g * 3) % 5) for g in range(4)) for i in range(6)]
+    (tmp_path / 'small.csv').write_text('\n'.join(lines) + '\n')
+    monkeypatch.setitem(app_module.app.config, 'DATA_FOLDER', str(tmp_path))
+
+    client = app_module.app.test_client()
+    response = client.post('/api/expression', json={'dataset': 'small.csv', 'top_pairs': 0})
+    assert response.status_code == 200
+    assert response.get_json()['top_correlated_pairs'] == []
+    response = client.post('/api/expression', json={'dataset': 'small.csv', 'top_pairs': -1})
+    assert response.status_code == 400
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from fastq_qc import fastq_qc
+
+
+def _reads(count=300, seed=0):
+    rng = random.Random(seed)
+    reads = []
+    for i in range(count):
+        if i % 10 == 9:
+            # an exact duplicate of an earlier read
+            reads.append((f'r{i}',) + reads[rng.randrange(len(reads))][1:])
+            continue
+        length = rng.randint(20, 150)
+        sequence = ''.join(rng.choice('ACGTN' if rng.random() < 0.01 else 'ACGT') for _ in range(length))
+        quality = ''.join(chr(33 + rng.randint(2, 40)) for _ in range(length))
+        reads.append((f'r{i}', sequence, quality))
+    return reads
+
+
+def _write(path, reads, newline='\n', width=None):
+    with open(path, 'w', newline='') as f:
+        for title, sequence, quality in reads:
+            if width:
+                sequence = newline.join(sequence[i:i + width] for i in range(0, len(sequence), width))
+                quality = newline.join(quality[i:i + width] for i in range(0, len(quality), width))
+            f.write(f'@{title}{newline}{sequence}{newline}+{newline}{quality}{newline}')
+    return str(path)
+
+
+def test_statistics_match_brute_force(tmp_path):
+    reads = _reads()
+    result = fastq_qc(_write(tmp_path / 'reads.fastq', reads))
+    assert result['reads'] == len(reads)
+    assert result['bases'] == sum(len(s) for _, s, _ in reads)
+    gc = sum(s.count('G') + s.count('C') for _, s, _ in reads)
+    assert result['gc_content'] == round(gc / result['bases'] * 100, 2)
+    assert (result['read_length']['min'], result['read_length']['max']) == \
+        (min(len(s) for _, s, _ in reads), max(len(s) for _, s, _ in reads))
+
+    first = [ord(q[0]) - 33 for _, _, q in reads]
+    assert result['per_position_quality'][0]['position'] == '1-2'
+    second = [ord(q[1]) - 33 for _, _, q in reads]
+    assert result['per_position_quality'][0]['mean'] == round(sum(first + second) / (2 * len(reads)), 2)
+    assert result['duplication']['distinct_estimate'] == len({s for _, s, _ in reads})
+
+
+@pytest.mark.parametrize('layout', ['small chunks', 'crlf', 'wrapped'])
+def test_layouts_give_the_same_result(tmp_path, layout):
+    reads = _reads(seed=1)
+    expected = fastq_qc(_write(tmp_path / 'plain.fastq', reads))
+    if layout == 'small chunks':
+        result = fastq_qc(_write(tmp_path / 'reads.fastq', reads), chunk_bytes=37)
+    elif layout == 'crlf':
+        result = fastq_qc(_write(tmp_path / 'reads.fastq', reads, newline='\r\n'))
+    else:
+        result = fastq_qc(_write(tmp_path / 'reads.fastq', reads, width=60))
+    assert result == expected
+
+
+def test_adapter_position(tmp_path):
+    reads = [('a', 'TTTTT' + 'AGATCGGAAGAGC' + 'TT', 'I' * 20), ('b', 'C' * 20, 'I' * 20)]
+    adapters = fastq_qc(_write(tmp_path / 'reads.fastq', reads))['adapters']
+    assert adapters['Illumina Universal']['reads'] == 1
+    assert adapters['Illumina Universal']['first_position'] == 6
+    assert adapters['PolyA']['reads'] == 0
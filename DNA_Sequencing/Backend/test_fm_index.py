@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import fm_index
+from fm_index import FMIndex
+from motif_search import reverse_complement
+
+
+def _positions(text, pattern):
+    return [i for i in range(len(text) - len(pattern) + 1) if text.startswith(pattern, i)]
+
+
+def test_count_and_locate_match_brute_force():
+    rng = random.Random(3)
+    records = [(f'r{i}', ''.join(rng.choice('ACGT') for _ in range(rng.randint(50, 400)))) for i in range(5)]
+    index = FMIndex.build(records)
+    for pattern in ('A', 'GT', 'ACG', 'TTAG', records[2][1][10:22]):
+        expected = sorted((r, p) for r, (_, seq) in enumerate(records) for p in _positions(seq, pattern))
+        result = index.search(pattern, max_positions=10 ** 6)
+        assert result['count'] == len(expected)
+        assert [(hit['record'], hit['position']) for hit in result['positions']] == expected
+
+
+@pytest.mark.parametrize('max_positions', [0, 1, 7, 500])
+def test_max_positions_are_the_first_hits(max_positions):
+    rng = random.Random(5)
+    records = [(f'r{i}', ''.join(rng.choice('ACGT') for _ in range(300))) for i in range(4)]
+    index = FMIndex.build(records)
+    result = index.search('NR', both_strands=True, max_positions=max_positions)
+    every = index.search('NR', both_strands=True, max_positions=10 ** 6)['positions']
+    assert result['count'] == len(every)
+    assert result['positions'] == every[:max_positions]
+    assert list(index.locate('A', limit=max_positions)) == list(index.locate('A'))[:max_positions]
+    with pytest.raises(ValueError):
+        index.search('A', max_positions=-1)
+
+
+def test_palindromic_pattern_is_counted_once_on_both_strands():
+    sequence = 'TT'.join(['GAATTC'] * 11)
+    result = FMIndex.build([('s', sequence)]).search('GAATTC', both_strands=True)
+    assert result['count'] == 11
+    assert result['reverse_count'] == 0
+    assert len({hit['position'] for hit in result['positions']}) == len(result['positions']) == 11
+
+
+def test_reverse_strand_hits_of_a_non_palindromic_pattern():
+    sequence = 'AAAGG' + reverse_complement('GGATCA') + 'TT'
+    result = FMIndex.build([('s', sequence)]).search('GGATCA', both_strands=True)
+    assert (result['forward_count'], result['reverse_count']) == (0, 1)
+
+
+def test_text_length_is_bounded(monkeypatch):
+    monkeypatch.setattr(fm_index, 'MAX_TEXT_LENGTH', 100)
+    with pytest.raises(ValueError):
+        FMIndex.build([('s', 'ACGT' * 30)])
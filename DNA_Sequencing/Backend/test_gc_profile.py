@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import gc_profile as gc_profile_module
+from gc_profile import gc_profile, gc_profile_from_chunks
+
+
+def _sequence(length, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGTN' if rng.random() < 0.02 else 'ACGT') for _ in range(length))
+
+
+def _brute_window(text):
+    g, c = text.count('G'), text.count('C')
+    valid = sum(text.count(base) for base in 'ACGT')
+    return (round((g + c) / valid * 100, 2) if valid else 0.0,
+            round((g - c) / (g + c), 4) if g + c else 0.0)
+
+
+@pytest.mark.parametrize('window,step', [(100, None), (60, 15), (7, 3)])
+def test_windows_match_brute_force(window, step):
+    sequence = _sequence(2000, window)
+    [profile] = gc_profile(sequence, windows=(window,), step=step, max_points=10 ** 6)['profiles']
+    step = step or window
+    starts = range(0, len(sequence) - window + 1, step)
+    assert profile['positions'] == [start + window // 2 for start in starts]
+    expected = [_brute_window(sequence[start:start + window]) for start in starts]
+    assert list(zip(profile['gc_content'], profile['gc_skew'])) == pytest.approx(expected)
+
+
+def test_chunks_give_the_same_profile():
+    sequence = _sequence(5000, 1)
+    chunks = [sequence[i:i + 777] for i in range(0, len(sequence), 777)]
+    assert gc_profile_from_chunks(chunks, windows=(100, 250), step=50) == \
+        gc_profile(sequence, windows=(100, 250), step=50)
+
+
+def test_cumulative_skew_extremes():
+    sequence = 'C' * 300 + 'G' * 500 + 'A' * 37
+    skew = gc_profile(sequence, windows=(100,))['cumulative_skew']
+    assert (skew['min_position'], skew['min_value']) == (300, -300)
+    assert (skew['max_position'], skew['max_value']) == (800, 200)
+    assert skew['positions'][-1] == len(sequence)
+
+
+def test_window_must_be_positive():
+    with pytest.raises(ValueError):
+        gc_profile('ACGT', windows=(0,))
+
+
+def test_coprime_windows_keep_their_own_bins(monkeypatch):
+    sequence = _sequence(20000, 2)
+    # a shared gcd would need a bin per base: far over the cap
+    monkeypatch.setattr(gc_profile_module, 'MAX_BINS', 100)
+    profiles = gc_profile(sequence, windows=(1000, 1001), max_points=10 ** 6)['profiles']
+    for window, profile in zip((1000, 1001), profiles):
+        starts = range(0, len(sequence) - window + 1, window)
+        expected = [_brute_window(sequence[start:start + window]) for start in starts]
+        assert list(zip(profile['gc_content'], profile['gc_skew'])) == pytest.approx(expected)
+
+
+def test_too_many_bins_are_rejected(monkeypatch):
+    monkeypatch.setattr(gc_profile_module, 'MAX_BINS', 1000)
+    with pytest.raises(ValueError):
+        gc_profile(_sequence(5000), windows=(1000,), step=1)
+    chunks = (_sequence(600, seed) for seed in range(10))
+    with pytest.raises(ValueError):
+        gc_profile_from_chunks(chunks, windows=(7,), step=3)
@@ -0,0 +1,31 @@
+import pytest
+
+from indexed_reader import IndexedReader, build_index
+
+
+def test_fetch_matches_the_record(tmp_path):
+    path = tmp_path / 'records.fa'
+    first = 'ACGTACGTAC' * 5 + 'GGA'
+    path.write_text('>one desc\n' + '\n'.join(first[i:i + 10] for i in range(0, len(first), 10))
+                    + '\n>two\nTTTT\nCC\n')
+    with IndexedReader(str(path)) as reader:
+        assert reader.names == ['one', 'two']
+        for start, end in ((0, 53), (7, 8), (9, 31), (48, 60)):
+            assert bytes(reader.fetch('one', start, end)).decode() == first[start:end]
+        assert bytes(reader.fetch(1)).decode() == 'TTTTCC'
+
+
+@pytest.mark.parametrize('body', ['ACGT\nACGTA\n', 'ACGT\nAC\nACGT\n', 'ACGT\n\nTTTT\n', '\nACGT\n'])
+def test_irregular_line_lengths_are_rejected(tmp_path, body):
+    path = tmp_path / 'bad.fa'
+    path.write_text('>bad\n' + body)
+    with pytest.raises(ValueError):
+        build_index(str(path))
+
+
+def test_blank_lines_between_records_are_allowed(tmp_path):
+    path = tmp_path / 'records.fa'
+    path.write_text('>a\nACGT\nAC\n\n>b\nTTTT\n\n')
+    with IndexedReader(str(path)) as reader:
+        assert bytes(reader.fetch('a')).decode() == 'ACGTAC'
+        assert bytes(reader.fetch('b')).decode() == 'TTTT'
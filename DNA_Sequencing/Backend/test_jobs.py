@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, JobManager, JobQueueFull
+
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.is_finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_job_result_and_progress(tmp_path):
+    upload = tmp_path / 'a.fasta'
+    upload.write_text('>a\nACGT\n')
+
+    def analyze(filepath, progress):
+        for done in range(1, 4):
+            progress(done)
+        return {'path': filepath}
+
+    manager = JobManager(analyze)
+    job = _wait(manager.submit(str(upload), 'a.fasta'))
+    data = job.to_dict(include_result=True)
+    assert data['status'] == DONE
+    assert data['progress'] == {'records_done': 3, 'bytes_total': upload.stat().st_size}
+    assert data['result'] == {'path': str(upload)}
+    assert manager.get(job.id) is job
+    manager.shutdown()
+
+
+def test_failed_job_keeps_the_error(tmp_path):
+    def analyze(filepath, progress):
+        raise ValueError('bad file')
+
+    manager = JobManager(analyze)
+    job = _wait(manager.submit(str(tmp_path / 'missing'), 'missing'))
+    assert (job.status, job.error) == (FAILED, 'bad file')
+    assert 'result' not in job.to_dict(include_result=True)
+    manager.shutdown()
+
+
+def test_pending_jobs_are_capped(tmp_path):
+    release = threading.Event()
+    manager = JobManager(lambda filepath, progress: release.wait(5), max_workers=1, max_pending=2)
+    first = manager.submit(str(tmp_path / 'a'), 'a')
+    manager.submit(str(tmp_path / 'b'), 'b')
+    with pytest.raises(JobQueueFull):
+        manager.submit(str(tmp_path / 'c'), 'c')
+    release.set()
+    _wait(first)
+    manager.shutdown()
+    assert manager.pending() == 0
+
+
+def test_cleanup_removes_expired_jobs_and_their_files(tmp_path):
+    upload = tmp_path / 'a.fasta'
+    upload.write_text('>a\nACGT\n')
+    (tmp_path / 'a.fasta.fai').write_text('a\t4\t3\t4\t5\n')
+
+    manager = JobManager(lambda filepath, progress: {}, retention=0)
+    job = _wait(manager.submit(str(upload), 'a.fasta'))
+    job.finished -= 1
+    assert manager.cleanup() == 1
+    assert manager.get(job.id) is None
+    assert not upload.exists() and not (tmp_path / 'a.fasta.fai').exists()
+    manager.shutdown()
+
+
+def test_finished_time_is_set_before_the_status(tmp_path):
+    release = threading.Event()
+    manager = JobManager(lambda filepath, progress: release.wait(5), retention=0)
+    job = manager.submit(str(tmp_path / 'a'), 'a')
+    seen = []
+
+    def watch():
+        while not job.is_finished:
+            pass
+        seen.append(job.finished)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    release.set()
+    watcher.join(5)
+    assert seen and seen[0] is not None
+
+    # a finished job without a finish time (e.g. mid-update) is kept, not compared
+    job.finished = None
+    assert manager.cleanup() == 0
+    manager.shutdown()
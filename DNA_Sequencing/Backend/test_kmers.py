@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+
+import pytest
+
+import kmers
+from motif_search import reverse_complement
+from utils import find_common_motifs
+
+
+def _sequence(length, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') for _ in range(length))
+
+
+def _brute_counts(sequence, k, canonical=False):
+    counts = Counter()
+    for i in range(len(sequence) - k + 1):
+        kmer = sequence[i:i + k]
+        if set(kmer) <= set('ACGT'):
+            counts[min(kmer, reverse_complement(kmer)) if canonical else kmer] += 1
+    return counts
+
+
+@pytest.mark.parametrize('k', [1, 3, 8, 9, 12, 31])
+@pytest.mark.parametrize('canonical', [False, True])
+def test_counts_match_brute_force(k, canonical):
+    sequence = _sequence(2000, k) + 'NACGTN' + _sequence(300, k + 1)
+    kmer_ids, counts = kmers.count_kmers(sequence, k, canonical)
+    found = {kmers.decode_kmer(int(i), k): int(c) for i, c in zip(kmer_ids, counts)}
+    assert found == _brute_counts(sequence, k, canonical)
+
+
+def test_several_k_share_one_walk():
+    sequence = _sequence(500, 3)
+    by_k = {k: dict(zip(ids.tolist(), counts.tolist()))
+            for k, ids, counts in kmers.iter_kmer_counts(sequence, [5, 2, 7])}
+    for k in (2, 5, 7):
+        ids, counts = kmers.count_kmers(sequence, k)
+        assert by_k[k] == dict(zip(ids.tolist(), counts.tolist()))
+
+
+def test_common_motifs_are_sorted_by_count():
+    sequence = 'GAATTC' * 4 + _sequence(200, 5)
+    motifs = find_common_motifs(sequence, 6, 2)
+    repeated = [(motif, count) for motif, count in _brute_counts(sequence, 6).items() if count >= 2]
+    expected = sorted(repeated, key=lambda item: (-item[1], item[0]))
+    assert motifs == expected
+
+
+def test_k_is_bounded():
+    with pytest.raises(ValueError):
+        kmers.count_kmers('ACGT', kmers.MAX_K + 1)
@@ -0,0 +1,58 @@
+import pytest
+
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.Registry()
+    latency = registry.histogram('latency_seconds', 'Latency.', ['endpoint'], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.observe(value, endpoint='a')
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP latency_seconds Latency.', '# TYPE latency_seconds histogram']
+    assert lines[2:] == [
+        'latency_seconds_bucket{endpoint="a",le="0.1"} 1',
+        'latency_seconds_bucket{endpoint="a",le="1"} 3',
+        'latency_seconds_bucket{endpoint="a",le="+Inf"} 4',
+        'latency_seconds_sum{endpoint="a"} 4.25',
+        'latency_seconds_count{endpoint="a"} 4',
+    ]
+
+
+def test_labels_are_checked_and_escaped():
+    registry = metrics.Registry()
+    requests = registry.counter('requests_total', 'Requests.', ['path'])
+    requests.inc(path='a"b\\c\n')
+    assert 'requests_total{path="a\\"b\\\\c\\n"} 1' in registry.render()
+    with pytest.raises(ValueError):
+        requests.inc(other='x')
+    assert registry.counter('requests_total', 'Requests.', ['path']) is requests
+    with pytest.raises(ValueError):
+        registry.gauge('requests_total', 'Requests.')
+
+
+def test_stage_records_time_bases_and_errors():
+    def count(metric, stage):
+        return dict(metric._values).get((stage,), 0)
+
+    with metrics.stage('test_ok', 10) as current:
+        current.bases += 5
+    assert count(metrics.STAGE_BASES, 'test_ok') == 15
+    assert metrics.STAGE_SECONDS._values[('test_ok',)][2] == 1
+
+    with pytest.raises(RuntimeError):
+        with metrics.stage('test_error'):
+            raise RuntimeError
+    assert count(metrics.STAGE_ERRORS, 'test_error') == 1
+
+
+def test_metrics_endpoint_counts_requests():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    response = client.post('/api/analyze', json={'sequence': 'ATGCATGCATGCGGCC'})
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'dna_http_requests_total{endpoint="api_analyze",method="POST",status="200"}' in text
+    assert 'dna_analysis_stage_seconds_count{stage="gc_content"}' in text
+    assert '# TYPE dna_result_cache_hit_ratio gauge' in text
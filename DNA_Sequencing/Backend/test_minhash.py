@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+import pytest
+
+import minhash
+from motif_search import reverse_complement
+
+
+def _sequence(length, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') for _ in range(length))
+
+
+def _mutate(sequence, rate, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') if rng.random() < rate else base for base in sequence)
+
+
+def _canonical_kmers(sequence, k):
+    return {min(sequence[i:i + k], reverse_complement(sequence[i:i + k])) for i in range(len(sequence) - k + 1)}
+
+
+def test_jaccard_estimate_is_close_to_the_exact_index():
+    base = _sequence(5000, 1)
+    variant = _mutate(base, 0.01, 2)
+    index = minhash.build_index([('base', base), ('variant', variant)], k=15, num_hashes=512)
+    a, b = _canonical_kmers(base, 15), _canonical_kmers(variant, 15)
+    exact = len(a & b) / len(a | b)
+    assert index.jaccard(index.signatures[0])[1] == pytest.approx(exact, abs=0.06)
+
+
+def test_reverse_complement_is_identical():
+    sequence = _sequence(2000, 3)
+    index = minhash.build_index([('forward', sequence), ('other', _sequence(2000, 4))])
+    [best] = index.query(reverse_complement(sequence), top_k=1)
+    assert (best['name'], best['jaccard'], best['mash_distance']) == ('forward', 1.0, 0.0)
+
+
+def test_signature_does_not_depend_on_the_hash_block(monkeypatch):
+    sequence = _sequence(3000, 5)
+    hasher = minhash.MinHasher(k=11, num_hashes=64)
+    whole = hasher.signature(sequence)
+    monkeypatch.setattr(minhash, 'HASH_BLOCK', 37)
+    assert (hasher.signature(sequence) == whole).all()
+
+
+def test_pairwise_matches_queries_and_survives_a_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(minhash, 'PAIR_BLOCK', 3)
+    base = _sequence(1500, 6)
+    records = [(f'r{i}', _mutate(base, 0.02 * i, i)) for i in range(8)] + [('short', 'ACG')]
+    index = minhash.build_index(records, k=13, num_hashes=96)
+    jaccard, distance = index.pairwise()
+    for row in range(len(records)):
+        assert np.array_equal(jaccard[row], index.jaccard(index.signatures[row]))
+    assert np.array_equal(jaccard, jaccard.T)
+    assert jaccard[-1].sum() == 0 and (distance[-1] == 1).all()
+
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    loaded = minhash.SketchIndex.load(path)
+    assert loaded.names == index.names and loaded.lengths == index.lengths
+    assert loaded.query(record='r0', top_k=3) == index.query(record='r0', top_k=3)
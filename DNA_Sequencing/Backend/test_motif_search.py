@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from motif_search import IUPAC_CODES, MotifAutomaton, expand_iupac, reverse_complement
+
+
+def _matches(window, motif):
+    return len(window) == len(motif) and all(base in IUPAC_CODES[code] for base, code in zip(window, motif))
+
+
+def _brute_hits(sequence, motif):
+    """(position, strand) hits; a window matching the motif itself only counts on '+'."""
+    hits = []
+    for i in range(len(sequence) - len(motif) + 1):
+        window = sequence[i:i + len(motif)]
+        if _matches(window, motif):
+            hits.append((i, '+'))
+        elif _matches(reverse_complement(window), motif):
+            hits.append((i, '-'))
+    return hits
+
+
+def test_hits_match_brute_force_on_both_strands():
+    rng = random.Random(6)
+    sequence = ''.join(rng.choice('ACGT') for _ in range(4000)) + 'NTATAAAAN' + 'GAATTC'
+    motifs = ['TATAWAW', 'GAATTC', 'CAAT', 'GANTC', 'RGATCY']
+    automaton = MotifAutomaton(motifs)
+    found = {motif: [] for motif in motifs}
+    for position, motif, strand in automaton.iter_matches(sequence):
+        found[motif].append((position, strand))
+    for motif in motifs:
+        assert sorted(found[motif]) == _brute_hits(sequence, motif)
+
+
+def test_palindromic_motif_counts_each_site_once():
+    result = MotifAutomaton(['GAATTC']).find('AA'.join(['GAATTC'] * 5))
+    assert (result['GAATTC']['count'], result['GAATTC']['reverse_count']) == (5, 0)
+
+
+def test_iupac_expansion():
+    assert sorted(expand_iupac('ANR')) == sorted('A' + n + r for n in 'ACGT' for r in 'AG')
+    with pytest.raises(ValueError):
+        expand_iupac('AXT')
+    with pytest.raises(ValueError):
+        expand_iupac('N' * 7)
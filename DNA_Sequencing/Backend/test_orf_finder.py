@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from motif_search import reverse_complement
+from orf_finder import ALTERNATIVE_START_CODONS, DEFAULT_START_CODONS, STOP_CODONS, find_orfs
+
+
+def _brute_orfs(sequence, min_length, start_codons, nested):
+    """Every start paired with the next in-frame stop, codon by codon."""
+    found = set()
+    n = len(sequence)
+    for strand, text in (('+', sequence), ('-', reverse_complement(sequence))):
+        for frame in range(3):
+            open_starts = []
+            for i in range(frame, n - 2, 3):
+                codon = text[i:i + 3]
+                if codon in start_codons:
+                    open_starts.append(i)
+                elif codon in STOP_CODONS:
+                    for start in (open_starts if nested else open_starts[:1]):
+                        end = i + 3
+                        if end - start >= min_length:
+                            found.add((strand, start, end) if strand == '+' else (strand, n - end, n - start))
+                    open_starts = []
+    return found
+
+
+@pytest.mark.parametrize('nested', [False, True])
+@pytest.mark.parametrize('start_codons', [DEFAULT_START_CODONS, ALTERNATIVE_START_CODONS])
+def test_orfs_match_brute_force(nested, start_codons):
+    rng = random.Random(11)
+    sequence = ''.join(rng.choice('ACGT') for _ in range(3000)) + 'NNATGAAATAA'
+    orfs = find_orfs(sequence, min_length=30, top_n=None, start_codons=start_codons, nested=nested)
+    assert {(o['strand'], o['start'], o['end']) for o in orfs} == _brute_orfs(sequence, 30, start_codons, nested)
+    assert len(orfs) == len({(o['strand'], o['start'], o['end']) for o in orfs})
+
+
+def test_top_orfs_are_the_longest():
+    rng = random.Random(4)
+    sequence = ''.join(rng.choice('ACGT') for _ in range(5000))
+    every = find_orfs(sequence, min_length=0, top_n=None)
+    top = find_orfs(sequence, min_length=0, top_n=5)
+    assert [o['length'] for o in top] == sorted((o['length'] for o in every), reverse=True)[:5]
+
+
+def test_reverse_strand_orf_coordinates():
+    orf = 'ATG' + 'GCC' * 40 + 'TAA'
+    sequence = 'CC' + reverse_complement(orf) + 'GG'
+    [found] = find_orfs(sequence, min_length=len(orf), both_strands=True)
+    assert (found['strand'], found['start'], found['end']) == ('-', 2, 2 + len(orf))
+    assert found['sequence'].startswith('ATGGCC')
+
+
+def test_top_n_zero_and_negative():
+    sequence = 'ATG' + 'GCC' * 40 + 'TAA'
+    assert find_orfs(sequence, min_length=0, top_n=0) == []
+    with pytest.raises(ValueError):
+        find_orfs(sequence, top_n=-1)
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+from Bio.SeqUtils import MeltingTemp, molecular_weight
+
+from physical_properties import NucleotideCounts, physical_properties
+
+
+def _random(length, seed=0):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') for _ in range(length))
+
+
+@pytest.mark.parametrize('length', [14, 17, 20])
+def test_oligo_values_match_biopython(length):
+    oligo = _random(length, length)
+    result = physical_properties(oligo)
+    tm = result['melting_temperature']
+    assert tm['wallace'] == round(MeltingTemp.Tm_Wallace(oligo), 1)
+    assert tm['gc'] == pytest.approx(MeltingTemp.Tm_GC(oligo, valueset=7), abs=0.06)
+    assert tm['nearest_neighbor'] == pytest.approx(MeltingTemp.Tm_NN(oligo), abs=0.06)
+    assert result['molecular_weight'] == pytest.approx(molecular_weight(oligo), abs=0.01)
+
+
+def test_long_sequence_has_no_wallace_tm():
+    tm = physical_properties(_random(3000))['melting_temperature']
+    assert tm['wallace'] is None
+    assert 60 < tm['gc'] < 110
+    assert 60 < tm['nearest_neighbor'] < 110
+
+
+def test_short_sequence_has_no_gc_tm():
+    tm = physical_properties('ACGTACGTAC')['melting_temperature']
+    assert tm['gc'] is None
+    assert tm['wallace'] == 30.0
+
+
+def test_counts_do_not_depend_on_the_block_size():
+    sequence = _random(5000, 1) + 'NN' + _random(300, 2)
+    whole = NucleotideCounts.from_sequence(sequence)
+    blocks = NucleotideCounts.from_sequence(sequence, chunk=97)
+    assert (whole.pairs == blocks.pairs).all()
+    assert (whole.first, whole.last, whole.length) == (blocks.first, blocks.last, 5300)
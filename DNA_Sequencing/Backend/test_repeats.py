@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+import repeats
+
+
+def _sequence(seed=0):
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(60):
+        parts.append(''.join(rng.choice('ACGT') for _ in range(rng.randint(5, 80))))
+        unit = ''.join(rng.choice('ACGT') for _ in range(rng.randint(1, 6)))
+        parts.append((unit * 20)[:rng.randint(4, 40)])
+        if rng.random() < 0.1:
+            parts.append('N' * rng.randint(1, 5))
+    return ''.join(parts)
+
+
+def _brute_repeats(sequence, min_length=repeats.MIN_REPEAT_LENGTH, min_copies=repeats.MIN_COPIES):
+    found = []
+    n = len(sequence)
+    for period in range(1, repeats.MAX_PERIOD + 1):
+        i = 0
+        while i < n - period:
+            if sequence[i] != sequence[i + period] or sequence[i] == 'N':
+                i += 1
+                continue
+            j = i
+            while j < n - period and sequence[j] == sequence[j + period] and sequence[j] != 'N':
+                j += 1
+            start, end = i, j + period
+            explained = any(period % d == 0 and sequence[start:end - d] == sequence[start + d:end]
+                            for d in range(1, period))
+            if end - start >= min_length and end - start >= min_copies * period and not explained:
+                found.append((start, end, period))
+            i = j
+    return sorted(found)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_tandem_repeats_match_brute_force(seed):
+    sequence = _sequence(seed)
+    found, _ = repeats.scan(sequence)
+    assert found == _brute_repeats(sequence)
+
+
+@pytest.mark.parametrize('chunk_size', [32, 96, 1024])
+def test_chunks_give_the_same_result(chunk_size):
+    sequence = _sequence(4) + 'ACGTTGCA' * 3 + 'AT' * 50
+    assert repeats.scan(sequence, chunk_size=chunk_size) == repeats.scan(sequence)
+
+
+def test_low_complexity_region_is_found():
+    rng = random.Random(7)
+    flank = ''.join(rng.choice('ACGT') for _ in range(500))
+    sequence = flank + 'AAAAAAAAAAAAAAAT' * 16 + flank
+    _, low = repeats.scan(sequence)
+    assert any(start <= 560 and end >= 700 for start, end in low)
+    assert all(end > 480 and start < 780 for start, end in low)
+
+
+def test_hard_masking():
+    sequence = 'GATTACAGCTTAG' + 'CA' * 10 + 'GATCCGATGCA'
+    masked = repeats.mask_sequence(sequence, hard=True)
+    assert masked == 'GATTACAGCTTAG' + 'N' * 20 + 'GATCCGATGCA'
+    assert repeats.mask_sequence(sequence).upper() == sequence
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+import restriction
+from motif_search import reverse_complement
+
+
+def _brute_palindromes(sequence, min_length, max_length):
+    found = []
+    for centre in range(len(sequence) - 1):
+        arm = 0
+        while (arm < max_length // 2 and centre - arm >= 0 and centre + arm + 1 < len(sequence)
+               and sequence[centre - arm] == reverse_complement(sequence[centre + arm + 1])):
+            arm += 1
+        if 2 * arm >= min_length:
+            found.append((centre + 1 - arm, 2 * arm))
+    return found
+
+
+def test_palindromes_match_brute_force():
+    rng = random.Random(5)
+    sequence = ''.join(rng.choice('ACGT') for _ in range(3000))
+    result = restriction.find_palindromes(sequence, 4, 10, max_reported=10 ** 6)
+    assert [(p['start'], p['length']) for p in result['palindromes']] == _brute_palindromes(sequence, 4, 10)
+
+
+def test_palindrome_longer_than_254_bases():
+    result = restriction.find_palindromes('GAATTC' * 50, max_length=400)
+    assert result['by_length']['300'] == 1
+    longest = max(result['palindromes'], key=lambda p: p['length'])
+    assert (longest['start'], longest['end'], longest['sequence']) == (0, 300, 'GAATTC' * 50)
+
+
+def test_palindrome_length_is_bounded():
+    with pytest.raises(ValueError):
+        restriction.find_palindromes('GAATTC', max_length=restriction.PALINDROME_LIMIT + 2)
+
+
+def test_palindromic_site_is_counted_once():
+    sequence = 'AA'.join(['GAATTC'] * 7)
+    cutter = restriction.digest(sequence, ['EcoRI'])['cutters']['EcoRI']
+    assert (cutter['count'], cutter['forward_count'], cutter['reverse_count']) == (7, 7, 0)
+
+
+def test_strands_cache_is_keyed_on_a_digest_and_bounded(monkeypatch):
+    monkeypatch.setattr(restriction, '_cached', type(restriction._cached)())
+    monkeypatch.setattr(restriction, '_cached_bases', 0)
+    monkeypatch.setattr(restriction, 'MAX_CACHED_BASES', 100)
+    first = restriction.strands('ACGT' * 10)
+    assert restriction.strands('ACGT' * 10) is first
+    assert all(isinstance(key, bytes) for key in restriction._cached)
+    restriction.strands('GGCC' * 10)
+    restriction.strands('TTAA' * 10)
+    assert restriction._cached_bases <= 100
+    assert restriction.strands('ACGT' * 10) is not first
+
+
+def test_restriction_route_caps_max_palindrome():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    response = client.post('/api/restriction', json={'sequence': 'GAATTC' * 10, 'max_palindrome': 100000})
+    assert response.status_code == 400
+    response = client.post('/api/restriction', json={'sequence': 'GAATTC' * 50, 'max_palindrome': 400})
+    assert response.get_json()['restriction']['palindromes']['by_length']['300'] == 1
@@ -0,0 +1,29 @@
+from result_cache import ResultCache, sequence_key
+
+SEQUENCE = 'ATGCGTACGTTAGCCGATC'
+
+
+def test_sequence_key_depends_on_raw_length_and_options():
+    assert sequence_key(SEQUENCE) == sequence_key(SEQUENCE.lower())
+    assert sequence_key(SEQUENCE) != sequence_key(SEQUENCE + 'NNNN')
+    assert sequence_key(SEQUENCE) != sequence_key(SEQUENCE, {'motifs': ['TATA']})
+
+
+def test_cache_lru_and_sqlite_tier(tmp_path):
+    cache = ResultCache(max_entries=1, path=str(tmp_path / 'cache.sqlite'))
+    cache.set('a', {'value': 1})
+    cache.set('b', {'value': 2})
+    # 'a' was evicted from memory but is still on disk
+    assert cache.get('a') == {'value': 1}
+    assert cache.get('missing') is None
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_cached_analysis_reports_the_raw_length():
+    from app import app
+
+    client = app.test_client()
+    first = client.post('/api/analyze', json={'sequence': SEQUENCE}).get_json()
+    second = client.post('/api/analyze', json={'sequence': SEQUENCE + 'NNNN'}).get_json()
+    assert first['sequence_info']['original_length'] == 19
+    assert second['sequence_info']['original_length'] == 23
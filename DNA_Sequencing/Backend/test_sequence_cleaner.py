@@ -0,0 +1,51 @@
+import random
+import re
+
+import pytest
+
+from sequence_cleaner import MAX_INTERVALS, clean_chunks, clean_file, count_invalid
+
+
+def _text(length, seed=0):
+    rng = random.Random(seed)
+    pieces = []
+    for _ in range(length):
+        roll = rng.random()
+        if roll < 0.05:
+            pieces.append(rng.choice(' \n\t'))
+        elif roll < 0.1:
+            pieces.append('N' * rng.randint(1, 6))
+        elif roll < 0.13:
+            pieces.append(''.join(rng.choice('acgtn') for _ in range(rng.randint(1, 8))))
+        elif roll < 0.14:
+            pieces.append(rng.choice('XR-*'))
+        else:
+            pieces.append(rng.choice('ACGT'))
+    return ''.join(pieces)
+
+
+def _runs(text, pattern):
+    runs = [[m.start(), m.end()] for m in re.finditer(pattern, text)]
+    return {'count': len(runs), 'bases': sum(end - start for start, end in runs), 'intervals': runs[:MAX_INTERVALS]}
+
+
+@pytest.mark.parametrize('chunk,size_hint', [(1, None), (7, None), (64, 10), (10 ** 6, 10 ** 6)])
+def test_chunked_cleaning_matches_brute_force(chunk, size_hint):
+    text = _text(3000, chunk)
+    encoded, report = clean_chunks((text[i:i + chunk] for i in range(0, len(text), chunk)), size_hint)
+    stripped = re.sub(r'\s', '', text)
+    assert str(encoded) == re.sub('[^ACGT]', '', stripped.upper())
+    assert report['input_length'] == len(stripped)
+    assert report['valid_bases'] == len(encoded)
+    assert report['invalid_characters'] == count_invalid(text) == len(re.sub('[ACGTNacgtn]', '', stripped))
+    assert report['n_runs'] == _runs(stripped, '[Nn]+')
+    assert report['masked_regions'] == _runs(stripped, '[acgtn]+')
+
+
+def test_clean_file(tmp_path):
+    path = tmp_path / 'raw.txt'
+    path.write_bytes(b'ACGTnn\r\nacgt\r\nGGCC\r\n')
+    encoded, report = clean_file(str(path), chunk_size=5)
+    assert str(encoded) == 'ACGTACGTGGCC'
+    assert report['n_runs']['intervals'] == [[4, 6]]
+    assert report['masked_regions']['intervals'] == [[4, 10]]
@@ -1,11 +1,17 @@
 from collections import Counter
 from Bio.Seq import Seq
 
+from encoded_sequence import EncodedSequence
+from kmers import count_kmers, top_kmers
+
 def get_nucleotide_composition(sequence):
     """Calculate the nucleotide composition of a DNA sequence."""
-    if not sequence:
+    if not len(sequence):
         return {}
     
+    if isinstance(sequence, EncodedSequence):
+        return sequence.composition()
+    
     # Convert to uppercase to standardize counting
     sequence = sequence.upper()
     # Count nucleotides
@@ -15,24 +21,15 @@ def get_nucleotide_composition(sequence):
     return {base: (count / total) * 100 for base, count in composition.items()}
 
 def find_common_motifs(sequence, motif_length=6, min_occurrences=2):
-    """Find common motifs in a DNA sequence."""
-    if not sequence or len(sequence) < motif_length:
+    """Find common motifs in a DNA sequence.
+
+    Motifs spanning a non-ACGT character are ignored.
+    """
+    if not len(sequence) or len(sequence) < motif_length:
         return []
     
-    # Convert to uppercase to standardize searching
-    sequence = sequence.upper()
-    motifs = {}
-    
-    # Slide through the sequence and count motifs
-    for i in range(len(sequence) - motif_length + 1):
-        motif = sequence[i:i + motif_length]
-        motifs[motif] = motifs.get(motif, 0) + 1
-    
-    # Filter motifs that appear more than once
-    common_motifs = [(motif, count) for motif, count in motifs.items() 
-                     if count >= min_occurrences]
-    
-    # Sort by frequency, highest first
-    common_motifs.sort(key=lambda x: x[1], reverse=True)
+    # Count every motif of the requested length in one vectorized pass
+    kmer_ids, counts = count_kmers(sequence, motif_length)
     
-    return common_motifs
+    # Keep motifs that appear at least min_occurrences times, highest first
+    return top_kmers(kmer_ids, counts, motif_length, min_count=min_occurrences)
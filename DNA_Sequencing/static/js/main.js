@@ -117,6 +117,57 @@ function createStatsChart(data) {
     });
 }
 
+// Create sliding-window GC content / GC skew chart
+function createGCProfileChart(data) {
+    const ctx = document.getElementById('gcProfileChart');
+    if (!ctx || !data.gc_profile) return;
+
+    const profile = data.gc_profile.profiles[0];
+
+    new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: profile.positions,
+            datasets: [{
+                label: 'محتوى GC (%)',
+                data: profile.gc_content,
+                borderColor: '#36A2EB',
+                pointRadius: 0,
+                yAxisID: 'y'
+            }, {
+                label: 'انحراف GC',
+                data: profile.gc_skew,
+                borderColor: '#FF6384',
+                pointRadius: 0,
+                yAxisID: 'skew'
+            }]
+        },
+        options: {
+            ...chartConfig.options,
+            plugins: {
+                ...chartConfig.options.plugins,
+                title: {
+                    ...chartConfig.options.plugins.title,
+                    text: `محتوى GC وانحرافه (نافذة ${profile.window})`
+                }
+            },
+            scales: {
+                y: {
+                    min: 0,
+                    max: 100,
+                    position: 'left'
+                },
+                skew: {
+                    min: -1,
+                    max: 1,
+                    position: 'right',
+                    grid: { drawOnChartArea: false }
+                }
+            }
+        }
+    });
+}
+
 // File Upload Handling
 document.addEventListener('DOMContentLoaded', function() {
     const fileInput = document.getElementById('file-input');
@@ -165,6 +216,7 @@ function initializeCharts(data) {
     createCompositionChart(data);
     createGCChart(data.gc_content);
     createStatsChart(data);
+    createGCProfileChart(data);
 }
 
 // Export results to various formats